@@ -1,10 +1,21 @@
 """
 非同期ワーカー - 重い処理を並列実行するためのワーカー
+
+処理関数は @io_bound / @cpu_bound で実行レーンを指定する。io レーンはスレッドプール、
+cpu レーンはプロセスプール（GILを共有しない）で実行する。プロセスプールのワーカーは
+起動時に numpy などの重いモジュールを読み込んでおき、タスクごとのimportを避ける。
+cpu レーンの関数に渡したジョブストアは RemoteJobStore に置き換わり、ジョブの更新は
+キュー経由で親プロセスのジョブストアに反映される。
 """
 import asyncio
+import functools
+import importlib
+import multiprocessing
+import os
+import sys
 import threading
 import concurrent.futures
-from typing import Callable, Any, Dict
+from typing import Callable, Any, Dict, List, Optional
 from pathlib import Path
 import logging
 from datetime import datetime
@@ -13,71 +24,283 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ワーカープロセスの sys.path に追加するディレクトリ（api パッケージと src のモジュールを
+# 引数の unpickle や関数の import で確実に見つけられるようにする）
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+WORKER_IMPORT_PATHS = (str(PROJECT_ROOT), str(PROJECT_ROOT / "src"))
+
+# プロセスプールのワーカー起動時に読み込むモジュール（見つからないものは無視）
+DEFAULT_PRELOAD_MODULES = "numpy,scipy.signal,scipy.io.wavfile,noisereduce,librosa,fitz,api.core.pdf_processor,api.core.video_creator"
+
+def io_bound(func: Callable) -> Callable:
+    """I/O待ちが中心の処理（スレッドプールで実行）"""
+    func.worker_lane = "io"
+    return func
+
+def cpu_bound(func: Callable) -> Callable:
+    """CPU負荷が高い処理（プロセスプールで実行）"""
+    func.worker_lane = "cpu"
+    return func
+
+# ワーカープロセス内で親プロセスにジョブの更新を送るキュー（ワーカー起動時に設定）
+_worker_updates = None
+
+class RemoteJob:
+    """ワーカープロセス内のジョブ（更新は RemoteJobStore.update_job() で親プロセスに送る）"""
+
+    def __init__(self, job_id: str, store_id: str, snapshot: Dict[str, Any]):
+        object.__setattr__(self, "_job_id", job_id)
+        object.__setattr__(self, "_store_id", store_id)
+        object.__setattr__(self, "_fields", dict(snapshot))
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._fields[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"ジョブの更新は jobs_db.update_job(job, {name}=...) で行ってください")
+
+class RemoteJobStore:
+    """cpu レーンの関数に渡すジョブストアの代わり（jobs_db[job_id] の形で使える）"""
+
+    def __init__(self, store_id: str, snapshots: Dict[str, Dict[str, Any]]):
+        self.store_id = store_id
+        self.snapshots = snapshots
+        self._jobs: Dict[str, RemoteJob] = {}
+
+    def __getitem__(self, job_id: str) -> RemoteJob:
+        if job_id not in self._jobs:
+            if job_id not in self.snapshots:
+                raise KeyError(job_id)
+            self._jobs[job_id] = RemoteJob(job_id, self.store_id, self.snapshots[job_id])
+        return self._jobs[job_id]
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self.snapshots
+
+    def update_job(self, job: RemoteJob, **fields: Any) -> None:
+        """ジョブのフィールドをまとめて更新し、親プロセスに送る"""
+        job._fields.update(fields)
+        _worker_updates.put((self.store_id, job._job_id, fields))
+
+def _init_cpu_worker(preload_modules: str, updates) -> None:
+    """プロセスプールのワーカー初期化（重いモジュールを先に読み込む）"""
+    global _worker_updates
+    _worker_updates = updates
+    for path in WORKER_IMPORT_PATHS:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    for module_name in filter(None, (name.strip() for name in preload_modules.split(","))):
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+
+def _run_cpu_task(token: str, func: Callable, args: tuple, kwargs: dict) -> Any:
+    """ワーカープロセスでタスクを実行し、最後に完了を通知する（それまでの更新が反映済みになる）"""
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _worker_updates.put((None, token, None))
+
+def _warm_up() -> int:
+    """ワーカープロセスを起動させるための空タスク"""
+    import time
+    time.sleep(0.2)
+    return os.getpid()
+
 class AsyncWorker:
     """非同期処理ワーカー"""
-    
-    def __init__(self, max_workers: int = 4):
+
+    def __init__(self, max_workers: int = 4, cpu_workers: Optional[int] = None):
         """
         Args:
-            max_workers: 並列実行する最大ワーカー数
+            max_workers: スレッドプール（io レーン）で並列実行する最大ワーカー数
+            cpu_workers: プロセスプール（cpu レーン）のワーカープロセス数
         """
         self.max_workers = max_workers
+        self.cpu_workers = cpu_workers or int(os.getenv("CPU_WORKERS", min(4, os.cpu_count() or 1)))
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.process_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
         self.running_tasks: Dict[str, asyncio.Task] = {}
-        
-    async def submit_task(self, task_id: str, func: Callable, *args, **kwargs) -> None:
+        # ワーカープロセスからのジョブ更新（store_id, job_id, 変更したフィールド）
+        self._context = multiprocessing.get_context("spawn")
+        self._updates = None
+        # タスクごとに登録するジョブストア（store_id → ジョブストア、タスクの完了後に削除）
+        self._stores: Dict[str, Any] = {}
+        # 完了通知を待っているタスク（token → (イベントループ, Future)）
+        self._pending_drains: Dict[str, tuple] = {}
+        self._relay_thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self, warm_up: bool = True) -> None:
+        """プロセスプールを起動（warm_up=True の場合は全ワーカーを先に起動しておく）"""
+        with self._start_lock:
+            if self.process_executor is not None:
+                return
+            self._updates = self._context.Queue()
+            self.process_executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.cpu_workers,
+                mp_context=self._context,
+                initializer=_init_cpu_worker,
+                initargs=(os.getenv("CPU_WORKER_PRELOAD", DEFAULT_PRELOAD_MODULES), self._updates)
+            )
+            self._relay_thread = threading.Thread(target=self._relay_updates, daemon=True)
+            self._relay_thread.start()
+
+        if warm_up:
+            futures = [self.process_executor.submit(_warm_up) for _ in range(self.cpu_workers)]
+            pids = {future.result() for future in futures}
+            logger.info(f"CPUワーカープロセスを起動しました: {len(pids)}個")
+
+    def cpu_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """cpu レーンのプロセスプール（関数を直接 submit して使う、未起動の場合は起動する）"""
+        if self.process_executor is None:
+            self.start(warm_up=False)
+        return self.process_executor
+
+    def _relay_updates(self) -> None:
+        """ワーカープロセスからのジョブ更新を親プロセスのジョブストアに反映"""
+        while True:
+            try:
+                item = self._updates.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            store_id, job_id, fields = item
+            if store_id is None:
+                # タスクの完了通知（job_id にはタスクのtokenが入る）
+                loop, drained = self._pending_drains.pop(job_id, (None, None))
+                if drained is not None:
+                    loop.call_soon_threadsafe(drained.set_result, None)
+                continue
+            store = self._stores.get(store_id)
+            job = store.get(job_id) if store is not None else None
+            if job is None:
+                continue
+            try:
+                store.update_job(job, **fields)
+            except Exception as e:
+                logger.error(f"ジョブ更新の反映エラー {job_id}: {str(e)}")
+
+    def _to_remote(self, value: Any, token: str, job_ids: List[str], store_ids: List[str]) -> Any:
+        """ジョブストアをワーカープロセスに渡せる RemoteJobStore に置き換える（登録した store_id を store_ids に追加）"""
+        from api.core.job_store import JobStore
+
+        if not isinstance(value, JobStore):
+            return value
+        store_id = f"{token}#{len(store_ids)}"
+        self._stores[store_id] = value
+        store_ids.append(store_id)
+        # 引数に含まれるジョブIDの現在の状態をワーカーに渡す
+        snapshots = {}
+        for job_id in job_ids:
+            job = value.get(job_id)
+            if job is not None:
+                snapshots[job_id] = job.model_dump()
+        return RemoteJobStore(store_id, snapshots)
+
+    async def submit_task(self, task_id: str, func: Callable, *args, lane: Optional[str] = None, **kwargs) -> None:
         """
         タスクを非同期で実行
-        
+
         Args:
             task_id: タスクの一意ID
             func: 実行する関数
             *args, **kwargs: 関数の引数
+            lane: 実行レーン（"io" / "cpu"、省略時は関数に付けたタグ、タグがなければ "io"）
         """
         logger.info(f"タスク開始: {task_id}")
-        
+
         # 既に同じIDのタスクが実行中の場合はスキップ
         if task_id in self.running_tasks:
             logger.warning(f"タスク {task_id} は既に実行中です")
             return
-            
+
+        lane = lane or getattr(func, "worker_lane", "io")
+        if lane not in ("io", "cpu"):
+            raise ValueError(f"不明な実行レーンです: {lane}")
+
         # 非同期タスクとして実行
-        task = asyncio.create_task(self._run_task(task_id, func, *args, **kwargs))
+        task = asyncio.create_task(self._run_task(task_id, lane, func, *args, **kwargs))
         self.running_tasks[task_id] = task
-        
-    async def _run_task(self, task_id: str, func: Callable, *args, **kwargs) -> Any:
+
+    async def run(self, task_id: str, func: Callable, *args, lane: Optional[str] = None, **kwargs) -> Any:
+        """タスクを実行して結果を待つ（レーンの決め方は submit_task と同じ）"""
+        lane = lane or getattr(func, "worker_lane", "io")
+        if lane not in ("io", "cpu"):
+            raise ValueError(f"不明な実行レーンです: {lane}")
+
+        task = asyncio.ensure_future(self._run_task(task_id, lane, func, *args, **kwargs))
+        self.running_tasks.setdefault(task_id, task)
+        return await task
+
+    async def _run_task(self, task_id: str, lane: str, func: Callable, *args, **kwargs) -> Any:
         """内部タスク実行メソッド"""
         try:
             loop = asyncio.get_event_loop()
-            # CPUバウンドなタスクを別スレッドで実行
-            result = await loop.run_in_executor(self.executor, func, *args, **kwargs)
-            logger.info(f"タスク完了: {task_id}")
+            if lane == "cpu":
+                if self.process_executor is None:
+                    await loop.run_in_executor(self.executor, self.start, False)
+                token = f"{task_id}:{id(asyncio.current_task())}"
+                # 文字列の引数はジョブIDの候補としてスナップショットを渡す
+                job_ids = [value for value in (*args, *kwargs.values()) if isinstance(value, str)]
+                store_ids: List[str] = []
+                remote_args = tuple(self._to_remote(arg, token, job_ids, store_ids) for arg in args)
+                remote_kwargs = {key: self._to_remote(value, token, job_ids, store_ids) for key, value in kwargs.items()}
+                drained = loop.create_future()
+                self._pending_drains[token] = (loop, drained)
+                # CPUバウンドなタスクは別プロセスで実行
+                try:
+                    result = await loop.run_in_executor(
+                        self.process_executor, _run_cpu_task, token, func, remote_args, remote_kwargs
+                    )
+                finally:
+                    # ワーカーから送られたジョブ更新がすべて反映されるまで待つ
+                    try:
+                        await asyncio.wait_for(drained, timeout=10)
+                    except asyncio.TimeoutError:
+                        self._pending_drains.pop(token, None)
+                        logger.warning(f"タスク {task_id} のジョブ更新の反映待ちがタイムアウトしました（以降の更新は反映されません）")
+                    for store_id in store_ids:
+                        self._stores.pop(store_id, None)
+            else:
+                # I/Oバウンドなタスクは別スレッドで実行
+                result = await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+            logger.info(f"タスク完了: {task_id} ({lane})")
             return result
         except Exception as e:
             logger.error(f"タスクエラー {task_id}: {str(e)}")
             raise
         finally:
-            # タスクリストから削除
-            if task_id in self.running_tasks:
+            # タスクリストから削除（同じIDで別のタスクが登録されている場合は残す）
+            if self.running_tasks.get(task_id) is asyncio.current_task():
                 del self.running_tasks[task_id]
-                
+
     def get_running_tasks(self) -> list:
         """実行中のタスク一覧を取得"""
         return list(self.running_tasks.keys())
-        
+
     def is_task_running(self, task_id: str) -> bool:
         """指定タスクが実行中かチェック"""
         return task_id in self.running_tasks
-        
+
     async def wait_for_task(self, task_id: str) -> Any:
         """指定タスクの完了を待機"""
         if task_id in self.running_tasks:
             return await self.running_tasks[task_id]
         return None
-        
+
     def cleanup(self):
         """リソースのクリーンアップ"""
         self.executor.shutdown(wait=True)
+        if self.process_executor is not None:
+            self.process_executor.shutdown(wait=True)
+            self._updates.put(None)
+            self._relay_thread.join(timeout=5)
 
 # グローバルワーカーインスタンス
-async_worker = AsyncWorker(max_workers=6)  # 6つの並列ワーカー
\ No newline at end of file
+async_worker = AsyncWorker(max_workers=6)  # 6つの並列ワーカー
@@ -1,8 +1,14 @@
 import sys
+import io
 from pathlib import Path
 import json
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import contextlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import numpy as np
 from scipy.io import wavfile
 from scipy import signal
@@ -14,30 +20,57 @@ import noisereduce as nr
 sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
 
 from voicevox_generator import VoicevoxGenerator
+from .disk_cache import DiskLRUCache, make_cache_key
+from .spectral_gate import CachedProfileSpectralGate, NoiseProfileStore
+from .scheduler import job_scheduler
+from .async_worker import async_worker
+
+# 話者ごとのノイズプロファイル（cached_gate プロファイルで使用）
+noise_profile_store = NoiseProfileStore(Path(os.getenv("NOISE_PROFILE_DIR", "data/cache/noise_profiles")))
 
 class ImprovedAudioProcessor:
     """ビーン音除去とクリック音除去の改善されたプロセッサー"""
     
-    def __init__(self, sample_rate=24000):
+    # 後処理の内容を変更した場合は上げる（合成キャッシュのキーに含まれる）
+    POSTPROCESS_VERSION = 1
+    
+    # ノイズ除去の処理プロファイル
+    # two_stage: 発話ごとにnoisereduceを2回実行（定常＋非定常）
+    # cached_gate: 話者ごとに学習済みのノイズプロファイルで1回のSTFTだけで処理
+    PROFILES = ("two_stage", "cached_gate")
+    
+    def __init__(self, sample_rate=24000, profile="two_stage"):
+        if profile not in self.PROFILES:
+            raise ValueError(f"不明な音声処理プロファイルです: {profile}")
         self.sample_rate = sample_rate
+        self.profile = profile
         # ビーン音の周波数帯域（分析結果に基づく）
         self.beep_freq_range = (800, 3500)
         
-    def remove_click_noise(self, audio_data):
-        """VOICEVOXのクリック音を除去（テンポ維持）"""
+    def remove_click_noise(self, audio_data, window=5):
+        """VOICEVOXのクリック音を除去（テンポ維持）
+        
+        急激な振幅変化を検出したサンプルを、前後 window サンプルの平均で置き換える。
+        平均は累積和から一括で計算し、補間前の値だけを参照するので処理順に依存しない。
+        """
         if len(audio_data) == 0:
             return audio_data
             
         # 1. 急激な振幅変化を検出
         audio_diff = np.diff(audio_data)
-        if len(audio_diff) > 0:
-            sudden_changes = np.abs(audio_diff) > np.std(audio_diff) * 5
-            
-            # 2. 急激な変化部分をスムージング
-            for i in np.where(sudden_changes)[0]:
-                if i > 5 and i < len(audio_data) - 5:
-                    # 前後5サンプルの平均で補間
-                    audio_data[i] = np.mean(audio_data[i-5:i+5])
+        if len(audio_diff) == 0:
+            return audio_data
+        sudden_changes = np.abs(audio_diff) > np.std(audio_diff) * 5
+        indices = np.flatnonzero(sudden_changes)
+        # 前後に window サンプル取れる位置のみ対象
+        indices = indices[(indices > window) & (indices < len(audio_data) - window)]
+        if len(indices) == 0:
+            return audio_data
+        
+        # 2. 累積和で [i-window, i+window) の移動平均を求めて補間
+        cumsum = np.concatenate(([0.0], np.cumsum(audio_data, dtype=np.float64)))
+        window_means = (cumsum[indices + window] - cumsum[indices - window]) / (2 * window)
+        audio_data[indices] = window_means
         
         return audio_data
     
@@ -84,6 +117,24 @@ class ImprovedAudioProcessor:
             # エラー時は元データをそのまま返す
             return audio_data
     
+    def apply_cached_profile_gating(self, audio_data, sr=None, speaker_id=None, engine_version=None):
+        """学習済みノイズプロファイルによる1パスのスペクトルゲーティング"""
+        if len(audio_data) == 0:
+            return audio_data
+            
+        if sr is None:
+            sr = self.sample_rate
+            
+        try:
+            gate = CachedProfileSpectralGate(noise_profile_store, sample_rate=sr, n_fft=2048)
+            reduced_noise = gate.apply(audio_data, speaker_id, engine_version or "unknown")
+            print("スペクトルゲーティング適用完了（学習済みプロファイル・1パス処理）")
+            return reduced_noise
+            
+        except Exception as e:
+            print(f"スペクトルゲーティングエラー: {e}")
+            return audio_data
+    
     def apply_beep_notch_filter_fallback(self, audio_data):
         """フォールバック用の簡易ノッチフィルタ"""
         if len(audio_data) == 0:
@@ -133,8 +184,11 @@ class ImprovedAudioProcessor:
             
         return audio_data
     
-    def process_voicevox_audio(self, input_path, output_path=None):
-        """VOICEVOXの音声を後処理（noisereduceのみ使用）"""
+    def process_voicevox_audio(self, input_path, output_path=None, speaker_id=None, engine_version=None):
+        """VOICEVOXの音声を後処理（noisereduceのみ使用）
+        
+        cached_gate プロファイルでは speaker_id と engine_version ごとにノイズプロファイルを共有する。
+        """
         try:
             # 音声を読み込み（元のサンプリングレートを維持）
             audio_data, sr = librosa.load(input_path, sr=None, mono=True)
@@ -144,7 +198,10 @@ class ImprovedAudioProcessor:
                 return input_path
             
             # noisereduceのみでビープ音除去
-            audio_data = self.apply_spectral_gating(audio_data, sr)
+            if self.profile == "cached_gate":
+                audio_data = self.apply_cached_profile_gating(audio_data, sr, speaker_id, engine_version)
+            else:
+                audio_data = self.apply_spectral_gating(audio_data, sr)
             
             # 音量正規化（クリッピング防止）
             max_val = np.max(np.abs(audio_data))
@@ -164,22 +221,118 @@ class ImprovedAudioProcessor:
         except Exception as e:
             print(f"音声後処理エラー {input_path}: {e}")
             return input_path  # エラー時は元ファイルを返す
+    
+    def decode_wav_bytes(self, wav_bytes):
+        """WAVのバイト列をモノラルのfloat32配列に変換（librosa.loadと同じ[-1, 1]のスケール）"""
+        sr, audio_data = wavfile.read(io.BytesIO(wav_bytes))
+        if audio_data.ndim > 1:
+            audio_data = audio_data.mean(axis=1)
+        if audio_data.dtype == np.int16:
+            audio_data = audio_data / 32768.0
+        elif audio_data.dtype == np.int32:
+            audio_data = audio_data / 2147483648.0
+        elif audio_data.dtype == np.uint8:
+            audio_data = (audio_data - 128.0) / 128.0
+        audio_data = audio_data.astype(np.float32)
+        if sr != self.sample_rate:
+            audio_data = signal.resample_poly(audio_data, self.sample_rate, sr).astype(np.float32)
+        return audio_data
+    
+    def process_voicevox_batch(self, items, engine_version=None):
+        """合成直後のWAVバイト列をまとめて後処理し、1ファイルずつ書き出す
+        
+        items は {"wav_bytes", "output_path", "speaker_id"} のリスト。
+        全発話をゼロ埋めした2次元配列に詰め、ノイズ除去と音量正規化を配列単位で行う。
+        合成結果を一度ディスクに書いて読み直す必要がない。
+        """
+        if not items:
+            return []
+        
+        audios = [self.decode_wav_bytes(item["wav_bytes"]) for item in items]
+        lengths = [len(audio) for audio in audios]
+        batch = np.zeros((len(audios), max(lengths)), dtype=np.float32)
+        for i, audio in enumerate(audios):
+            batch[i, :len(audio)] = audio
+        
+        # noisereduceのみでビープ音除去
+        if self.profile == "cached_gate":
+            try:
+                gate = CachedProfileSpectralGate(noise_profile_store, sample_rate=self.sample_rate, n_fft=2048)
+                speaker_ids = [item["speaker_id"] for item in items]
+                batch = gate.apply_batch(batch, lengths, speaker_ids, engine_version or "unknown")
+                print(f"スペクトルゲーティング適用完了（学習済みプロファイル・{len(items)}件まとめて処理）")
+            except Exception as e:
+                print(f"スペクトルゲーティングエラー: {e}")
+        else:
+            # 2段階処理は発話ごとにノイズを学習するため1発話ずつ処理
+            for i, length in enumerate(lengths):
+                batch[i, :length] = self.apply_spectral_gating(batch[i, :length].copy(), self.sample_rate)
+        
+        # 音量正規化（クリッピング防止）を全発話まとめて計算
+        peaks = np.max(np.abs(batch), axis=1)
+        scales = np.where(peaks > 0, 0.95 / np.maximum(peaks, np.finfo(np.float32).tiny), 1.0)
+        batch *= scales[:, np.newaxis].astype(np.float32)
+        
+        # soundfileで保存（ゼロ埋め部分は書き出さない）
+        for item, audio, length in zip(items, batch, lengths):
+            sf.write(item["output_path"], audio[:length], self.sample_rate)
+        print(f"音声後処理完了: {len(items)}件 (SR: {self.sample_rate}Hz)")
+        
+        return [item["output_path"] for item in items]
+
+# 合成済み音声のキャッシュ（後処理済みのWAVを保存）
+synthesis_cache = DiskLRUCache(
+    Path(os.getenv("SYNTHESIS_CACHE_DIR", "data/cache/synthesis")),
+    max_bytes=int(os.getenv("SYNTHESIS_CACHE_MAX_MB", "2048")) * 1024 * 1024,
+    suffix=".wav"
+)
+
+def _postprocess_audio_batch(items: List[Dict[str, Any]], sample_rate: int, profile: str = "two_stage",
+                             engine_version: Optional[str] = None) -> List[str]:
+    """CPUワーカープロセスで実行する後処理（ビープ音除去・正規化）"""
+    processor = ImprovedAudioProcessor(sample_rate=sample_rate, profile=profile)
+    return processor.process_voicevox_batch(items, engine_version=engine_version)
 
 class AudioGenerator:
-    def __init__(self, job_id: str, base_dir: Path):
+    # VOICEVOXの出力サンプリングレート
+    OUTPUT_SAMPLING_RATE = 24000
+    
+    def __init__(self, job_id: str, base_dir: Path, max_concurrency: Optional[int] = None, postprocess_workers: Optional[int] = None, postprocess_profile: Optional[str] = None):
         self.job_id = job_id
         self.base_dir = base_dir
         self.audio_dir = base_dir / "audio" / job_id
         self.audio_dir.mkdir(parents=True, exist_ok=True)
         self.voicevox_url = os.getenv("VOICEVOX_URL", "http://localhost:50021")
+        # 同時にVOICEVOXへ投げる合成リクエスト数（VOICEVOXコンテナのCPU割り当てに合わせる）
+        self.max_concurrency = max_concurrency or int(os.getenv("VOICEVOX_CONCURRENCY", "3"))
+        # 1回の音声生成で同時にノイズ除去するバッチ数（CPUワーカープロセスは async_worker のプールを共有）
+        self.postprocess_workers = postprocess_workers or int(os.getenv("AUDIO_POSTPROCESS_WORKERS", "2"))
+        # 1つのCPUワーカーでまとめて後処理する発話数
+        self.postprocess_batch_size = max(1, int(os.getenv("AUDIO_POSTPROCESS_BATCH_SIZE", "16")))
+        # ノイズ除去の処理プロファイル（two_stage / cached_gate）
+        self.postprocess_profile = postprocess_profile or os.getenv("AUDIO_POSTPROCESS_PROFILE", "two_stage")
         # 改善されたオーディオプロセッサーを初期化
-        self.audio_processor = ImprovedAudioProcessor()
+        self.audio_processor = ImprovedAudioProcessor(sample_rate=self.OUTPUT_SAMPLING_RATE, profile=self.postprocess_profile)
+        # VOICEVOXエンジンのバージョン（check_voicevox_status で取得）
+        self.engine_version = "unknown"
+        self.session = self._create_session()
+    
+    def _create_session(self) -> requests.Session:
+        """keep-aliveで接続を再利用するHTTPセッションを作成"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
         
     def check_voicevox_status(self) -> bool:
         """VOICEVOXが起動しているか確認"""
         try:
-            response = requests.get(f"{self.voicevox_url}/version")
-            return response.status_code == 200
+            response = self.session.get(f"{self.voicevox_url}/version")
+            if response.status_code != 200:
+                return False
+            self.engine_version = str(response.json())
+            return True
         except:
             return False
     
@@ -188,27 +341,120 @@ class AudioGenerator:
         speed_scale: float = 1.0,
         pitch_scale: float = 0.0,
         intonation_scale: float = 1.2,
-        volume_scale: float = 1.0
+        volume_scale: float = 1.0,
+        dialogue_data: Optional[Dict[str, List[Dict]]] = None,
+        executors: Optional[Tuple[ThreadPoolExecutor, ProcessPoolExecutor]] = None
     ) -> int:
-        """対話音声を生成"""
+        """対話音声を生成
+        
+        VOICEVOXへの合成リクエストを最大 max_concurrency 件まで同時に送り、
+        合成が終わった音声を postprocess_batch_size 件ずつメモリ上のまま
+        CPUワーカープールに渡し、まとめてノイズ除去を行う。
+        ファイル名は対話データの順序から事前に決定するため、完了順に依存しない。
+        
+        dialogue_data を指定した場合はジョブの対話ファイルの代わりにその対話（一部のスライドでもよい）を合成する。
+        executors（synthesis_executors() の戻り値）を指定した場合は呼び出しごとにプールを作らずにそれを使う
+        （キャッシュのサイズ調整は呼び出し側で行う）。
+        """
         
         # VOICEVOXチェック
         if not self.check_voicevox_status():
             raise Exception("VOICEVOXが起動していません")
         
-        # 対話データを読み込み
-        # まずジョブ固有のデータを探す
-        job_dialogue_path = self.base_dir / "data" / self.job_id / "dialogue_narration_katakana.json"
-        if job_dialogue_path.exists():
-            dialogue_data_path = job_dialogue_path
-        else:
-            # 見つからない場合はデフォルトを使用
-            dialogue_data_path = Path(__file__).parent.parent.parent / "data" / "dialogue_narration_katakana.json"
+        tasks = self._build_synthesis_tasks(speed_scale, pitch_scale, intonation_scale, volume_scale, dialogue_data)
+        
+        # キャッシュ済みの発話はコピーのみで済ませ、変更された発話だけを合成する
+        pending_tasks = []
+        for task in tasks:
+            if not synthesis_cache.get_file(task["cache_key"], task["output_path"]):
+                pending_tasks.append(task)
+        print(f"音声生成: {len(tasks)}件中{len(tasks) - len(pending_tasks)}件をキャッシュから再利用、"
+              f"{len(pending_tasks)}件を合成します（同時リクエスト数: {self.max_concurrency}）")
+        
+        if pending_tasks:
+            if executors is not None:
+                self._synthesize_tasks(pending_tasks, *executors)
+            else:
+                with self.synthesis_executors() as (synth_executor, cpu_executor):
+                    self._synthesize_tasks(pending_tasks, synth_executor, cpu_executor)
+                synthesis_cache.evict()
+        
+        return len(tasks)
+    
+    @contextlib.contextmanager
+    def synthesis_executors(self):
+        """合成スレッドプールとノイズ除去のCPUワーカープール（generate_audio_files に渡して使い回す）
+        
+        ノイズ除去は async_worker の cpu レーンのプロセスプール（spawn・起動時にnumpyなどを読み込み済み）で行う。
+        呼び出しごとにプロセスを作らないので、ワーカー起動とimportのコストはサーバー起動時の1回だけになる。
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as synth_executor:
+            yield synth_executor, async_worker.cpu_executor()
+    
+    def _synthesize_tasks(self, pending_tasks: List[Dict[str, Any]], synth_executor: ThreadPoolExecutor,
+                          cpu_executor: ProcessPoolExecutor) -> None:
+        """合成と後処理を実行し、完成した音声をキャッシュに登録"""
+        synth_futures = {synth_executor.submit(self._synthesize, task): task for task in pending_tasks}
+        postprocess_futures = {}
+        batch = []
+        # プロセスプールは全ジョブで共有するので、1回の呼び出しで同時に後処理するバッチ数を制限する
+        postprocess_slots = threading.BoundedSemaphore(self.postprocess_workers)
+        
+        def submit_batch():
+            # 合成結果をメモリ上のままCPUワーカーに渡して後処理
+            items = [
+                {"wav_bytes": wav_bytes, "output_path": str(task["output_path"]), "speaker_id": task["speaker_id"]}
+                for task, wav_bytes in batch
+            ]
+            postprocess_slots.acquire()
+            postprocess_future = cpu_executor.submit(
+                _postprocess_audio_batch, items, self.OUTPUT_SAMPLING_RATE,
+                self.postprocess_profile, self.engine_version
+            )
+            postprocess_future.add_done_callback(lambda _: postprocess_slots.release())
+            postprocess_futures[postprocess_future] = [task for task, _ in batch]
+            batch.clear()
         
-        with open(dialogue_data_path, "r", encoding="utf-8") as f:
-            dialogue_data = json.load(f)
+        try:
+            for future in as_completed(synth_futures):
+                batch.append((synth_futures[future], future.result()))
+                if len(batch) >= self.postprocess_batch_size:
+                    submit_batch()
+            if batch:
+                submit_batch()
+            for future, batch_tasks in postprocess_futures.items():
+                future.result()
+                for task in batch_tasks:
+                    synthesis_cache.put_file(task["cache_key"], task["output_path"])
+        except Exception:
+            for pending in list(synth_futures) + list(postprocess_futures):
+                pending.cancel()
+            raise
+    
+    def _build_synthesis_tasks(
+        self,
+        speed_scale: float,
+        pitch_scale: float,
+        intonation_scale: float,
+        volume_scale: float,
+        dialogue_data: Optional[Dict[str, List[Dict]]] = None
+    ) -> List[Dict[str, Any]]:
+        """対話データから合成タスクの一覧（ファイル名・話者・パラメータ）を作成"""
         
-        print(f"音声生成: 対話データを読み込みました - {dialogue_data_path}")
+        if dialogue_data is None:
+            # 対話データを読み込み
+            # まずジョブ固有のデータを探す
+            job_dialogue_path = self.base_dir / "data" / self.job_id / "dialogue_narration_katakana.json"
+            if job_dialogue_path.exists():
+                dialogue_data_path = job_dialogue_path
+            else:
+                # 見つからない場合はデフォルトを使用
+                dialogue_data_path = Path(__file__).parent.parent.parent / "data" / "dialogue_narration_katakana.json"
+            
+            with open(dialogue_data_path, "r", encoding="utf-8") as f:
+                dialogue_data = json.load(f)
+            
+            print(f"音声生成: 対話データを読み込みました - {dialogue_data_path}")
         print(f"音声生成: スライド数 = {len(dialogue_data)}")
         
         # メタデータからスピーカー設定を読み込む
@@ -232,9 +478,9 @@ class AudioGenerator:
                 "speaker2": 3     # ずんだもん
             }
         
-        audio_count = 0
+        tasks = []
         
-        # 各スライドの音声を生成
+        # 各スライドの音声タスクを作成
         for slide_key, dialogues in dialogue_data.items():
             if not dialogues:
                 continue
@@ -259,23 +505,6 @@ class AudioGenerator:
                     # 数値に変換できない場合はそのまま使用
                     audio_filename = f"slide_{slide_num}_{idx+1:03d}_{speaker_name}.wav"
                 
-                # 音声クエリの作成
-                query_data = {
-                    "text": text,
-                    "speaker": speaker_id
-                }
-                
-                query_response = requests.post(
-                    f"{self.voicevox_url}/audio_query",
-                    params=query_data
-                )
-                
-                if query_response.status_code != 200:
-                    raise Exception(f"音声クエリの作成に失敗: {query_response.status_code}")
-                
-                # 音声合成パラメータを調整
-                synthesis_data = query_response.json()
-                
                 # キャラクターごとの速度調整
                 current_speaker_info = speaker_info.get(speaker, {})
                 # メタデータに速度が設定されている場合はそれを使用
@@ -288,38 +517,74 @@ class AudioGenerator:
                         current_speed_scale = speed_scale * 1.2
                 
                 # 標準パラメータ（noisereduceに任せる）
-                synthesis_data["speedScale"] = current_speed_scale
-                synthesis_data["pitchScale"] = pitch_scale
-                synthesis_data["intonationScale"] = intonation_scale
-                synthesis_data["volumeScale"] = volume_scale
-                
-                # 音声の前後に短い無音を追加（クリック音防止）
-                synthesis_data["prePhonemeLength"] = 0.1  # 音声前の無音（秒）
-                synthesis_data["postPhonemeLength"] = 0.1  # 音声後の無音（秒）
-                
-                synthesis_response = requests.post(
-                    f"{self.voicevox_url}/synthesis",
-                    params={
-                        "speaker": speaker_id,
-                        "outputSamplingRate": 24000  # 24kHzに統一
-                    },
-                    json=synthesis_data
-                )
-                
-                if synthesis_response.status_code != 200:
-                    raise Exception(f"音声合成に失敗: {synthesis_response.status_code}")
-                
-                # ファイルに保存
-                output_path = self.audio_dir / audio_filename
-                with open(output_path, "wb") as f:
-                    f.write(synthesis_response.content)
-                
-                # 改善されたオーディオ処理を適用（ビーン音除去）
-                self.audio_processor.process_voicevox_audio(output_path)
+                params = {
+                    "speedScale": current_speed_scale,
+                    "pitchScale": pitch_scale,
+                    "intonationScale": intonation_scale,
+                    "volumeScale": volume_scale,
+                    # 音声の前後に短い無音を追加（クリック音防止）
+                    "prePhonemeLength": 0.1,  # 音声前の無音（秒）
+                    "postPhonemeLength": 0.1  # 音声後の無音（秒）
+                }
                 
-                audio_count += 1
+                tasks.append({
+                    "output_path": self.audio_dir / audio_filename,
+                    "text": text,
+                    "speaker_id": speaker_id,
+                    "params": params,
+                    # 合成結果を一意に決める要素からキャッシュキーを作成
+                    "cache_key": make_cache_key(
+                        text,
+                        speaker_id,
+                        params,
+                        self.OUTPUT_SAMPLING_RATE,
+                        ImprovedAudioProcessor.POSTPROCESS_VERSION,
+                        self.postprocess_profile,
+                        # 合成結果と cached_gate のノイズプロファイルはエンジンのバージョンで変わる
+                        self.engine_version
+                    )
+                })
+        
+        return tasks
+    
+    def _synthesize(self, task: Dict[str, Any]) -> bytes:
+        """1発話をVOICEVOXで合成してWAVのバイト列を返す（合成スレッドで実行）
+        
+        VOICEVOXへの同時リクエスト数は全ジョブ合計でジョブスケジューラーの tts キューが制限する。
+        """
+        with job_scheduler.slot("tts", self.job_id):
+            return self._request_synthesis(task)
+    
+    def _request_synthesis(self, task: Dict[str, Any]) -> bytes:
+        # 音声クエリの作成
+        query_response = self.session.post(
+            f"{self.voicevox_url}/audio_query",
+            params={
+                "text": task["text"],
+                "speaker": task["speaker_id"]
+            }
+        )
+        
+        if query_response.status_code != 200:
+            raise Exception(f"音声クエリの作成に失敗: {query_response.status_code}")
+        
+        # 音声合成パラメータを調整
+        synthesis_data = query_response.json()
+        synthesis_data.update(task["params"])
+        
+        synthesis_response = self.session.post(
+            f"{self.voicevox_url}/synthesis",
+            params={
+                "speaker": task["speaker_id"],
+                "outputSamplingRate": self.OUTPUT_SAMPLING_RATE  # 24kHzに統一
+            },
+            json=synthesis_data
+        )
+        
+        if synthesis_response.status_code != 200:
+            raise Exception(f"音声合成に失敗: {synthesis_response.status_code}")
         
-        return audio_count
+        return synthesis_response.content
     
     def apply_noise_reduction(self, audio_path: Path):
         """高周波ノイズをフィルタリングで除去"""
@@ -5,12 +5,18 @@ from typing import List, Dict, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 import asyncio
+import contextlib
+
+from .dialogue_stream import DialogueStreamParser, MalformedDialogueError
+from .progress_bus import progress_bus
 
 # 環境変数を読み込み
 load_dotenv()
 
 class DialogueGenerator:
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
+        # use_cache=False の場合はLLM応答キャッシュを参照しない（再生成時など新しい応答が必要な場合）
+        self.use_cache = use_cache
         # LLMプロバイダーシステムを使用
         from .settings_manager import SettingsManager
         from .llm_provider import LLMFactory, LLMConfig, LLMProvider
@@ -22,7 +28,7 @@ class DialogueGenerator:
         provider_name = settings.get("default_provider", "openai")
         api_key = self.settings_manager.get_api_key(provider_name)
         
-        if not api_key:
+        if not api_key and provider_name != LLMProvider.FAKE.value:
             # 後方互換性のため、OpenAI APIキーをチェック
             if provider_name == "openai":
                 api_key = os.getenv("OPENAI_API_KEY")
@@ -38,7 +44,9 @@ class DialogueGenerator:
             model_id=settings.get("default_model", {}).get(provider_name),
             temperature=settings.get("temperature", 0.7),
             max_tokens=settings.get("max_tokens", 4000),
-            region=settings.get("bedrock_region") if provider_name == "bedrock" else None
+            region=settings.get("bedrock_region") if provider_name == "bedrock" else None,
+            timeout=settings.get("timeout", 120.0),
+            max_connections=settings.get("max_connections", 20)
         )
         self.llm = LLMFactory.create(config)
         self.default_temperature = settings.get("temperature", 0.7)
@@ -76,7 +84,8 @@ class DialogueGenerator:
                 user_prompt=user_prompt,
                 temperature=0.3,  # 判断タスクなので低めの温度
                 max_tokens=500,   # 短い応答で十分
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                use_cache=self.use_cache
             )
             
             if not response_text:
@@ -134,7 +143,8 @@ JSON形式で調整係数を返してください。調整が必要ないスラ
                 user_prompt=user_prompt,
                 temperature=0.3,
                 max_tokens=500,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                use_cache=self.use_cache
             )
             
             if response_text:
@@ -184,7 +194,8 @@ JSON形式で各スライドの重要度係数を返してください。
                 user_prompt=user_prompt,
                 temperature=0.3,
                 max_tokens=1000,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                use_cache=self.use_cache
             )
             
             if response_text:
@@ -212,8 +223,64 @@ JSON形式で各スライドの重要度係数を返してください。
         
         return base_importance
     
-    async def extract_text_from_slides(self, slide_texts: List[str], additional_prompt: str = None, progress_callback=None, target_duration: int = 10, speaker_info: dict = None, additional_knowledge: str = None) -> Dict[str, List[Dict]]:
-        """スライドのテキストから対話形式のナレーションを生成（スライドごとに個別生成）"""
+    async def generate_slide_outline(self, slide_texts: List[str]) -> Dict[int, str]:
+        """全スライドの短い概要を1回のリクエストで作成（並行生成時の文脈に使う）"""
+        
+        system_prompt = """あなたはプレゼンテーション分析の専門家です。
+各スライドの内容を、話の流れがわかるように1〜2文（60文字程度）で要約してください。
+
+JSON形式でスライド番号ごとの要約を返してください。
+例: {"1": "クロードコードの紹介と今日のテーマ", "2": "エーアイによるコーディング支援の現状", ...}"""
+        
+        slides_summary = "\n".join([
+            f"スライド{i+1}: {text[:300]}..." if len(text) > 300 else f"スライド{i+1}: {text}"
+            for i, text in enumerate(slide_texts)
+        ])
+        
+        user_prompt = f"""以下のスライド内容をそれぞれ要約してください：
+
+{slides_summary}"""
+        
+        # 要約に失敗したスライドはテキストの先頭で代用する
+        outline = {
+            i+1: " ".join(text.split())[:80]
+            for i, text in enumerate(slide_texts)
+        }
+        
+        try:
+            response_text = await self.llm.generate(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                temperature=0.3,
+                max_tokens=4000,
+                response_format={"type": "json_object"},
+                use_cache=self.use_cache
+            )
+            
+            if response_text:
+                for k, v in json.loads(response_text).items():
+                    if not str(k).isdigit():
+                        continue
+                    slide_num = int(k)
+                    if slide_num in outline and isinstance(v, str) and v.strip():
+                        outline[slide_num] = v.strip()
+                        
+        except Exception as e:
+            print(f"スライド概要の作成エラー: {e}")
+        
+        return outline
+    
+    async def extract_text_from_slides(self, slide_texts: List[str], additional_prompt: str = None, progress_callback=None, target_duration: int = 10, speaker_info: dict = None, additional_knowledge: str = None, concurrency: int = None, on_slide_generated=None) -> Dict[str, List[Dict]]:
+        """スライドのテキストから対話形式のナレーションを生成（スライドごとに個別生成）
+        
+        concurrency が2以上の場合は先に全スライドの概要を作成し、前後のスライドの
+        概要だけを文脈にして最大 concurrency 枚ずつ並行して生成する。
+        1の場合は直前のスライドの対話を文脈にして順番に生成する。
+        on_slide_generated(スライド番号, 対話) は各スライドの生成が終わった時点で呼ばれる。
+        """
+        
+        if concurrency is None:
+            concurrency = int(os.getenv("DIALOGUE_CONCURRENCY", "4"))
         
         dialogue_data = {}
         
@@ -235,18 +302,95 @@ JSON形式で各スライドの重要度係数を返してください。
             
         print(f"スライド時間配分: {slide_time_allocation}")
         
+        def build_additional_prompt(slide_num: int) -> str:
+            # 重要度情報を追加プロンプトに含める
+            slide_importance = importance_map.get(slide_num, 1.0)
+            if slide_importance < 0.7:
+                importance_note = "【重要】このトピックは概要的な内容なので、簡潔にまとめてください。"
+            elif slide_importance > 1.3:
+                importance_note = "【重要】このトピックは核心的な内容なので、しっかりと詳しく説明してください。"
+            else:
+                importance_note = ""
+            
+            # 追加プロンプトと重要度情報を組み合わせる
+            if additional_prompt:
+                return f"{additional_prompt}\n\n{importance_note}".strip()
+            return importance_note
+        
+        # スライドごとの進捗（受信した発話数の割合、完了したスライドは1.0）
+        slide_progress = {}
+        
+        def report_progress(message: str):
+            if progress_callback:
+                try:
+                    progress_callback(message, (sum(slide_progress.values()) / len(slide_texts)) * 100)
+                except Exception as e:
+                    print(f"進捗コールバックエラー: {e}")
+        
+        def on_utterance(slide_num: int, count: int, expected: int):
+            progress_bus.publish("utterance", {"slide": slide_num, "count": count, "expected": expected})
+            # 受信中のスライドは最大95%として扱う（再試行で発話数が戻っても進捗は戻さない）
+            slide_progress[slide_num] = max(slide_progress.get(slide_num, 0), min(count / max(expected, 1), 0.95))
+            completed_slides = sum(1 for value in slide_progress.values() if value >= 1.0)
+            report_progress(f"スライドの対話を生成中...（{completed_slides}/{len(slide_texts)}完了、スライド{slide_num}: {count}発話）")
+        
+        def slide_generated(slide_num: int, slide_dialogue: List[Dict]):
+            slide_progress[slide_num] = 1.0
+            progress_bus.publish("slide", {"slide": slide_num, "stage": "dialogue", "utterances": len(slide_dialogue)})
+            if on_slide_generated:
+                on_slide_generated(slide_num, slide_dialogue)
+        
+        if concurrency > 1 and len(slide_texts) > 1:
+            report_progress("スライドの概要を作成中...")
+            
+            outline = await self.generate_slide_outline(slide_texts)
+            semaphore = asyncio.Semaphore(concurrency)
+            completed = 0
+            
+            async def generate_slide(i: int, slide_text: str) -> List[Dict]:
+                nonlocal completed
+                slide_num = i + 1
+                async with semaphore:
+                    slide_dialogue = await self.generate_dialogue_for_single_slide(
+                        slide_number=slide_num,
+                        slide_text=slide_text,
+                        total_slides=len(slide_texts),
+                        additional_prompt=build_additional_prompt(slide_num),
+                        target_seconds_per_slide=slide_time_allocation.get(slide_num, target_seconds / len(slide_texts)),
+                        speaker_info=speaker_info,
+                        additional_knowledge=additional_knowledge,
+                        context_outline=outline,
+                        on_utterance=on_utterance
+                    )
+                
+                # 進捗を通知（完了したスライドと受信中のスライドの発話数で計算）
+                completed += 1
+                slide_generated(slide_num, slide_dialogue)
+                report_progress(f"スライドの対話を生成中...（{completed}/{len(slide_texts)}完了）")
+                return slide_dialogue
+            
+            tasks = [asyncio.ensure_future(generate_slide(i, text)) for i, text in enumerate(slide_texts)]
+            try:
+                results = await asyncio.gather(*tasks)
+            except Exception:
+                # 1枚でも失敗したら残りの生成を中止
+                for task in tasks:
+                    task.cancel()
+                raise
+            
+            # 出力はスライド順に並べる
+            for i, slide_dialogue in enumerate(results):
+                dialogue_data[f"slide_{i+1}"] = slide_dialogue
+            
+            return dialogue_data
+        
         # 各スライドについて個別に対話を生成
         for i, slide_text in enumerate(slide_texts):
             slide_key = f"slide_{i+1}"
             slide_num = i + 1
             
             # 進捗を通知
-            if progress_callback:
-                try:
-                    progress_msg = f"スライド{i+1}/{len(slide_texts)}の対話を生成中..."
-                    progress_callback(progress_msg, (i / len(slide_texts)) * 100)
-                except Exception as e:
-                    print(f"進捗コールバックエラー: {e}")
+            report_progress(f"スライド{i+1}/{len(slide_texts)}の対話を生成中...")
             
             # 過去のスライドの対話を収集
             previous_dialogues = {}
@@ -258,32 +402,19 @@ JSON形式で各スライドの重要度係数を返してください。
             # このスライドの割り当て時間を取得
             allocated_seconds = slide_time_allocation.get(slide_num, target_seconds / len(slide_texts))
             
-            # 重要度情報を追加プロンプトに含める
-            slide_importance = importance_map.get(slide_num, 1.0)
-            if slide_importance < 0.7:
-                importance_note = "【重要】このトピックは概要的な内容なので、簡潔にまとめてください。"
-            elif slide_importance > 1.3:
-                importance_note = "【重要】このトピックは核心的な内容なので、しっかりと詳しく説明してください。"
-            else:
-                importance_note = ""
-            
-            # 追加プロンプトと重要度情報を組み合わせる
-            if additional_prompt:
-                combined_additional_prompt = f"{additional_prompt}\n\n{importance_note}".strip()
-            else:
-                combined_additional_prompt = importance_note
-            
             slide_dialogue = await self.generate_dialogue_for_single_slide(
                 slide_number=i+1,
                 slide_text=slide_text,
                 total_slides=len(slide_texts),
                 previous_dialogues=previous_dialogues,
-                additional_prompt=combined_additional_prompt,
+                additional_prompt=build_additional_prompt(slide_num),
                 target_seconds_per_slide=allocated_seconds,
                 speaker_info=speaker_info,
-                additional_knowledge=additional_knowledge
+                additional_knowledge=additional_knowledge,
+                on_utterance=on_utterance
             )
             dialogue_data[slide_key] = slide_dialogue
+            slide_generated(slide_num, slide_dialogue)
         
         return dialogue_data
     
@@ -370,8 +501,14 @@ JSON形式で各スライドの重要度係数を返してください。
         
         return dialogue_data
     
-    async def generate_dialogue_for_single_slide(self, slide_number: int, slide_text: str, total_slides: int, previous_dialogues: Dict = None, additional_prompt: str = None, target_seconds_per_slide: float = 30, max_retries: int = 3, speaker_info: dict = None, additional_knowledge: str = None) -> List[Dict]:
-        """単一スライドの対話を生成"""
+    async def generate_dialogue_for_single_slide(self, slide_number: int, slide_text: str, total_slides: int, previous_dialogues: Dict = None, additional_prompt: str = None, target_seconds_per_slide: float = 30, max_retries: int = 3, speaker_info: dict = None, additional_knowledge: str = None, context_outline: Dict[int, str] = None, on_utterance=None) -> List[Dict]:
+        """単一スライドの対話を生成
+        
+        context_outline（スライド番号→概要）を渡した場合は、過去の対話の代わりに
+        前後のスライドの概要を文脈として使う。
+        応答はストリーミングで受信し、発話を受信するたびに
+        on_utterance(スライド番号, 受信した発話数, 最小発話数) を呼ぶ。
+        """
         
         # スライドの種類を早めに判定（表紙・表題スライドかどうか）
         is_title_slide = False
@@ -462,42 +599,7 @@ JSON形式で各スライドの重要度係数を返してください。
 13. 最初のトピック以外では「こんにちは」「今日は」「今回は」などの挨拶は使わないでください
 
 音声合成用の重要なルール：
-14. 英単語は必ずカタカナで表記してください（音声合成エンジンが正しく読み上げるため）
-15. 例：
-    - Claude Code → クロードコード
-    - AI → エーアイ
-    - ChatGPT → チャットジーピーティー
-    - Anthropic → アンソロピック
-    - Constitutional AI → コンスティテューショナル エーアイ
-    - OpenAI → オープンエーアイ
-    - GPT → ジーピーティー
-    - LLM → エルエルエム
-    - Machine Learning → マシーンラーニング
-    - Deep Learning → ディープラーニング
-    - Google → グーグル
-    - Microsoft → マイクロソフト
-    - API → エーピーアイ
-    - GitHub → ギットハブ
-    - Python → パイソン
-    - JavaScript → ジャバスクリプト
-    - TypeScript → タイプスクリプト
-    - React → リアクト
-    - Node.js → ノードジェイエス
-    - Docker → ドッカー
-    - Kubernetes → クーベルネティス
-    - AWS → エーダブリューエス
-    - Azure → アジュール
-    - Firebase → ファイアベース
-    - md/MD → エムディー
-    - yaml/YAML/yml/YML → ヤムル
-    - JSON → ジェイソン
-    - HTML → エイチティーエムエル
-    - CSS → シーエスエス
-    - SQL → エスキューエル
-    - NoSQL → ノーエスキューエル
-    - REST → レスト
-    - GraphQL → グラフキューエル
-16. 固有名詞や製品名も日本語の音声として自然に聞こえるようカタカナ表記にしてください
+14. 英単語や固有名詞はカタカナで表記してください（例：AI → エーアイ）。表記の統一は生成後に辞書で行います
 
 出力形式：
 必ず以下のような有効なJSON形式で出力してください。コードブロックや余計な文字は含めないでください。
@@ -529,6 +631,18 @@ speakerは必ず"speaker1"か"speaker2"を使用してください。
                 for dialogue in prev_dialogue:
                     user_prompt += "- {}: {}\n".format(dialogue['speaker'], dialogue['text'])
             user_prompt += "\n"
+        # 並行生成時は前後のトピックの概要を文脈にする（直前2つと直後1つ）
+        elif context_outline:
+            neighbors = [
+                n for n in range(slide_number - 2, slide_number + 2)
+                if n != slide_number and n in context_outline
+            ]
+            if neighbors:
+                user_prompt += "前後のトピックの概要:\n"
+                for n in neighbors:
+                    position = "前" if n < slide_number else "次"
+                    user_prompt += "- トピック{}（{}）: {}\n".format(n, position, context_outline[n])
+                user_prompt += "\n"
         
         user_prompt += """現在扱うトピック（{}番目）の内容：
 
@@ -684,70 +798,49 @@ speakerは必ず"speaker1"か"speaker2"を使用してください。
         if additional_prompt:
             user_prompt += "\n\n追加の指示：\n{}".format(additional_prompt)
 
-        # リトライループ
+        # リトライループ（応答は受信しながら解析し、対話の形式でないと分かった時点で打ち切って再試行する）
         for attempt in range(max_retries):
+            parser = DialogueStreamParser()
             try:
-                # 新しいLLMインターフェースを使用
-                response_text = await self.llm.generate(
+                stream = self.llm.generate_stream(
                     system_prompt=system_prompt,
                     user_prompt=user_prompt,
                     temperature=0.8,
                     max_tokens=3000,  # 単一スライドなので少なめでOK
-                    response_format={"type": "json_object"}
+                    response_format={"type": "json_object"},
+                    use_cache=self.use_cache and attempt == 0
                 )
+                async with contextlib.aclosing(stream):
+                    async for chunk in stream:
+                        for _ in parser.feed(chunk):
+                            if on_utterance:
+                                on_utterance(slide_number, len(parser.utterances), min_dialogues_for_this_slide)
+                dialogue_list = parser.finish()
                 
-                # レスポンスをパース
-                if not response_text:
-                    print(f"スライド{slide_number}の応答が空です（試行{attempt+1}/{max_retries}）")
-                    if attempt < max_retries - 1:
-                        continue
-                    else:
-                        raise Exception(f"スライド{slide_number}の対話生成に失敗しました：応答が空です")
+                # 上で設定した最小対話数を使用
+                if len(dialogue_list) >= min_dialogues_for_this_slide:
+                    print(f"スライド{slide_number}の対話生成成功（{len(dialogue_list)}件の対話）")
+                    return dialogue_list
                 
-                # JSONとして解析
-                try:
-                    parsed_content = json.loads(response_text)
-                    
-                    # もし配列でなくオブジェクトで返された場合、配列を取り出す
-                    if isinstance(parsed_content, dict):
-                        # "dialogue"キーなどがある場合
-                        if "dialogue" in parsed_content:
-                            dialogue_list = parsed_content["dialogue"]
-                        # "slide_1"のようなキーがある場合
-                        elif f"slide_{slide_number}" in parsed_content:
-                            dialogue_list = parsed_content[f"slide_{slide_number}"]
-                        else:
-                            # 最初の値を取得
-                            dialogue_list = list(parsed_content.values())[0]
-                    else:
-                        dialogue_list = parsed_content
-                    
-                    # 上で設定した最小対話数を使用
-                    if isinstance(dialogue_list, list) and len(dialogue_list) >= min_dialogues_for_this_slide:
-                        print(f"スライド{slide_number}の対話生成成功（{len(dialogue_list)}件の対話）")
-                        return dialogue_list
-                    else:
-                        print(f"スライド{slide_number}の対話が不十分です（{len(dialogue_list)}件、最小{min_dialogues_for_this_slide}件必要）（試行{attempt+1}/{max_retries}）")
-                        if attempt < max_retries - 1:
-                            continue
-                        else:
-                            raise Exception(f"スライド{slide_number}の対話生成に失敗しました：対話数が不十分（{len(dialogue_list)}件、最小{min_dialogues_for_this_slide}件必要）")
-                        
-                except json.JSONDecodeError as e:
-                    print(f"スライド{slide_number}のJSON解析エラー: {e}（試行{attempt+1}/{max_retries}）")
-                    print(f"レスポンス内容: {content[:500]}...")
-                    if attempt < max_retries - 1:
-                        continue
-                    else:
-                        raise Exception(f"スライド{slide_number}の対話生成に失敗しました：JSON解析エラー - {str(e)}")
+                print(f"スライド{slide_number}の対話が不十分です（{len(dialogue_list)}件、最小{min_dialogues_for_this_slide}件必要）（試行{attempt+1}/{max_retries}）")
+                if attempt < max_retries - 1:
+                    continue
+                raise Exception(f"スライド{slide_number}の対話生成に失敗しました：対話数が不十分（{len(dialogue_list)}件、最小{min_dialogues_for_this_slide}件必要）")
+                
+            except MalformedDialogueError as e:
+                print(f"スライド{slide_number}の応答を打ち切りました: {e}（試行{attempt+1}/{max_retries}）")
+                print(f"レスポンス内容: {parser.text[:500]}...")
+                if attempt < max_retries - 1:
+                    continue
+                raise Exception(f"スライド{slide_number}の対話生成に失敗しました：{str(e)}")
                 
             except Exception as e:
                 import traceback
                 print(f"スライド{slide_number}の対話生成エラー: {e}（試行{attempt+1}/{max_retries}）")
                 print(f"エラー詳細: {traceback.format_exc()}")
                 if attempt < max_retries - 1:
-                    import time
-                    time.sleep(2)  # リトライ前に2秒待機
+                    # 並行生成中の他のスライドを止めないよう非同期で待機
+                    await asyncio.sleep(2)  # リトライ前に2秒待機
                     continue
                 else:
                     raise Exception(f"スライド{slide_number}の対話生成に失敗しました：{str(e)}")
@@ -780,9 +873,7 @@ speakerは必ず"speaker1"か"speaker2"を使用してください。
 13. 最初のトピック以外では「こんにちは」「今日は」「今回は」などの挨拶は使わないでください
 
 音声合成用の重要なルール：
-14. 英単語は必ずカタカナで表記してください（音声合成エンジンが正しく読み上げるため）
-15. 例：Claude Code → クロードコード、AI → エーアイ、ChatGPT → チャットジーピーティー、Google → グーグル、API → エーピーアイ
-16. 固有名詞や製品名も日本語の音声として自然に聞こえるようカタカナ表記にしてください
+14. 英単語や固有名詞はカタカナで表記してください（例：AI → エーアイ）。表記の統一は生成後に辞書で行います
 
 出力形式：
 必ず以下のような有効なJSON形式で出力してください。コードブロックや余計な文字は含めないでください。
@@ -833,7 +924,8 @@ speakerは必ず"speaker1"か"speaker2"を使用してください。
                 user_prompt=user_prompt,
                 temperature=0.8,  # より創造的な会話のために少し上げる
                 max_tokens=8000,  # より長い会話を許可
-                response_format={"type": "json_object"}  # JSON形式を強制
+                response_format={"type": "json_object"},  # JSON形式を強制
+                use_cache=self.use_cache
             )
             
             # レスポンスをパース
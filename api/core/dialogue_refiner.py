@@ -1,13 +1,18 @@
 """
 対話スクリプトの全体調整と英語→カタカナ変換
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 import os
 import re
+import json
 import asyncio
 
+from .katakana_dictionary import katakana_dictionary, extract_english_words
+
 class DialogueRefiner:
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
+        # use_cache=False の場合はLLM応答キャッシュを参照しない（再生成時など新しい応答が必要な場合）
+        self.use_cache = use_cache
         # LLMプロバイダーシステムを使用
         from .settings_manager import SettingsManager
         from .llm_provider import LLMFactory, LLMConfig, LLMProvider
@@ -19,7 +24,7 @@ class DialogueRefiner:
         provider_name = settings.get("default_provider", "openai")
         api_key = self.settings_manager.get_api_key(provider_name)
         
-        if not api_key:
+        if not api_key and provider_name != LLMProvider.FAKE.value:
             # 後方互換性のため、OpenAI APIキーをチェック
             if provider_name == "openai":
                 api_key = os.getenv("OPENAI_API_KEY")
@@ -35,9 +40,18 @@ class DialogueRefiner:
             model_id=settings.get("default_model", {}).get(provider_name),
             temperature=settings.get("temperature", 0.7),
             max_tokens=settings.get("max_tokens", 4000),
-            region=settings.get("bedrock_region") if provider_name == "bedrock" else None
+            region=settings.get("bedrock_region") if provider_name == "bedrock" else None,
+            timeout=settings.get("timeout", 120.0),
+            max_connections=settings.get("max_connections", 20)
         )
         self.llm = LLMFactory.create(config)
+        self.katakana_dictionary = katakana_dictionary
+        self._attempted_terms: Set[str] = set()
+        
+        # 長いスクリプトはスライド単位のチャンクに分割して並行に調整する
+        self.chunk_slides = int(os.getenv("REFINER_CHUNK_SLIDES", "6"))
+        self.chunk_overlap = int(os.getenv("REFINER_CHUNK_OVERLAP", "1"))
+        self.concurrency = int(os.getenv("REFINER_CONCURRENCY", "4"))
     
     async def refine_and_convert_to_katakana(
         self, 
@@ -47,17 +61,178 @@ class DialogueRefiner:
     ) -> Dict[str, List[Dict]]:
         """三段階処理で対話スクリプトを完全に調整"""
         
+        slide_keys = sorted(dialogue_data.keys(), key=lambda x: int(x.split('_')[1]))
+        if len(slide_keys) > self.chunk_slides:
+            return await self._refine_chunked(dialogue_data, slide_keys, speaker_info, adjustment_prompt)
+        
         print("第一段階：全体の一貫性調整を開始...")
         stage1_result = await self._stage1_consistency_adjustment(dialogue_data, speaker_info, adjustment_prompt)
         
-        print("第二段階：カタカナ変換（後半重点）を開始...")
-        stage2_result = await self._stage2_katakana_conversion(stage1_result, speaker_info)
+        print("第二段階：カタカナ変換（辞書）を開始...")
+        stage2_result = await self._stage2_katakana_conversion(stage1_result)
         
         print("第三段階：表記揺れ修正を開始...")
         stage3_result = await self._stage3_notation_consistency(stage2_result, speaker_info)
         
         return stage3_result
     
+    def split_into_windows(self, slide_keys: List[str]) -> List[Tuple[List[str], List[str]]]:
+        """スライドをチャンクに分割（担当スライドと、前後の重なりを含む入力スライドの組）"""
+        windows = []
+        for start in range(0, len(slide_keys), self.chunk_slides):
+            owned_keys = slide_keys[start:start + self.chunk_slides]
+            window_keys = slide_keys[max(0, start - self.chunk_overlap):start + self.chunk_slides + self.chunk_overlap]
+            windows.append((window_keys, owned_keys))
+        return windows
+    
+    async def _refine_chunked(
+        self,
+        dialogue_data: Dict[str, List[Dict]],
+        slide_keys: List[str],
+        speaker_info: Optional[Dict] = None,
+        adjustment_prompt: Optional[str] = None
+    ) -> Dict[str, List[Dict]]:
+        """チャンクごとに三段階処理を並行実行し、担当スライドの結果をスライドキーで結合
+        
+        前後のスライドを重ねて渡すことでチャンク境界の流れを保ち、用語集を全チャンクで
+        共有して表記を揃える。所要時間はスクリプト全体の長さではなくチャンク数で決まる。
+        """
+        windows = self.split_into_windows(slide_keys)
+        print(f"{len(slide_keys)}スライドを{len(windows)}チャンクに分割して調整します")
+        
+        # 用語集は第一段階と並行して作成し、第二段階の開始前に待ち合わせる
+        glossary_task = asyncio.ensure_future(self._build_glossary(dialogue_data))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def run_window(index: int, window_keys: List[str], owned_keys: List[str]) -> Dict[str, List[Dict]]:
+            window_data = {key: dialogue_data[key] for key in window_keys}
+            async with semaphore:
+                print(f"チャンク{index + 1}/{len(windows)}（{owned_keys[0]}〜{owned_keys[-1]}）の調整を開始...")
+                return await self.refine_window(window_data, owned_keys, speaker_info, adjustment_prompt, glossary_task)
+        
+        tasks = [
+            asyncio.ensure_future(run_window(i, window_keys, owned_keys))
+            for i, (window_keys, owned_keys) in enumerate(windows)
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            glossary_task.cancel()
+            raise
+        
+        refined_dialogue = {}
+        for result in results:
+            refined_dialogue.update(result)
+        # 元のスライド順で返す
+        return {key: refined_dialogue.get(key, dialogue_data[key]) for key in dialogue_data.keys()}
+    
+    async def refine_window(
+        self,
+        window_data: Dict[str, List[Dict]],
+        owned_keys: List[str],
+        speaker_info: Optional[Dict] = None,
+        adjustment_prompt: Optional[str] = None,
+        glossary_task: Optional["asyncio.Future"] = None
+    ) -> Dict[str, List[Dict]]:
+        """1チャンク分（前後の重なりを含む）に三段階処理を行い、担当スライドの結果を返す
+        
+        glossary_task を省略した場合はチャンク内の対話だけで用語集を作成する
+        （スクリプト全体がそろう前にチャンクを確定させるパイプライン実行用）。
+        """
+        own_glossary = glossary_task is None
+        if own_glossary:
+            glossary_task = asyncio.ensure_future(self._build_glossary(window_data))
+        try:
+            stage1_result = await self._stage1_consistency_adjustment(window_data, speaker_info, adjustment_prompt)
+            glossary = await glossary_task
+        except BaseException:
+            if own_glossary:
+                glossary_task.cancel()
+            raise
+        stage2_result = await self._stage2_katakana_conversion(stage1_result)
+        stage3_result = await self._stage3_notation_consistency(stage2_result, speaker_info, glossary)
+        return {key: stage3_result.get(key, window_data[key]) for key in owned_keys}
+    
+    async def _build_glossary(self, dialogue_data: Dict[str, List[Dict]]) -> Dict[str, str]:
+        """スクリプト中の英語表記とカタカナ表記の対応表を作成（チャンク間の表記統一用）
+        
+        辞書にない単語は先にまとめて変換して辞書に登録しておくため、
+        各チャンクの第二段階では辞書による置き換えだけで済む。
+        """
+        texts = [d['text'] for dialogues in dialogue_data.values() for d in dialogues]
+        # 辞書の走査はジョブ共有のイベントループを止めないようスレッドで行う
+        await self._transliterate_unknown(await asyncio.to_thread(self.katakana_dictionary.find_unknown, texts))
+        
+        glossary = await asyncio.to_thread(self._lookup_terms, texts)
+        print(f"用語集を作成しました（{len(glossary)}語）")
+        return glossary
+    
+    def _lookup_terms(self, texts: List[str]) -> Dict[str, str]:
+        """テキスト中の英単語のうち辞書にあるものの対応表"""
+        glossary = {}
+        for text in texts:
+            for term in extract_english_words(text):
+                kana = self.katakana_dictionary.lookup(term)
+                if kana:
+                    glossary[term] = kana
+        return glossary
+    
+    async def _transliterate_unknown(self, terms: Set[str]) -> Dict[str, str]:
+        """辞書にない英単語だけをまとめてLLMでカタカナに変換し、辞書に学習させる"""
+        # 変換できなかった単語はこのジョブ内で再度問い合わせない
+        terms = terms - self._attempted_terms
+        if not terms:
+            return {}
+        self._attempted_terms.update(terms)
+        
+        system_prompt = """あなたは英語→カタカナ変換の専門家です。
+与えられた英単語・略語それぞれについて、日本語の音声として自然に読めるカタカナ表記を決めてください。
+JSON形式で返してください。例: {"AI": "エーアイ", "Claude": "クロード", "GitHub": "ギットハブ"}"""
+        
+        async def transliterate_batch(batch: List[str]) -> Dict[str, str]:
+            user_prompt = "以下の用語のカタカナ表記を決めてください：\n" + "\n".join(batch)
+            try:
+                response_text = await self.llm.generate(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    temperature=0.1,
+                    max_tokens=4000,
+                    response_format={"type": "json_object"},
+                    use_cache=self.use_cache
+                )
+                return {
+                    term: kana for term, kana in json.loads(response_text).items()
+                    # 英字が残っている応答は変換できていないので登録しない
+                    if term in batch and isinstance(kana, str) and not re.search(r'[A-Za-z]', kana)
+                }
+            except Exception as e:
+                print(f"カタカナ変換エラー: {e}")
+                return {}
+        
+        sorted_terms = sorted(terms)
+        batch_size = 100
+        results = await asyncio.gather(*[
+            transliterate_batch(sorted_terms[i:i + batch_size])
+            for i in range(0, len(sorted_terms), batch_size)
+        ])
+        
+        learned = {}
+        for result in results:
+            learned.update(result)
+        # 辞書ファイルへの書き込みを含む
+        added = await asyncio.to_thread(self.katakana_dictionary.learn, learned)
+        print(f"辞書にない{len(terms)}語をLLMで変換し、{added}語を辞書に追加しました")
+        return learned
+    
+    def _glossary_instruction(self, glossary: Optional[Dict[str, str]]) -> str:
+        """用語集をプロンプト用のテキストに変換"""
+        if not glossary:
+            return ""
+        lines = "\n".join(f"- {term} → {kana}" for term, kana in sorted(glossary.items()))
+        return f"\n\n【用語集】以下の用語は必ずこの表記に統一してください：\n{lines}"
+    
     async def _stage1_consistency_adjustment(
         self, 
         dialogue_data: Dict[str, List[Dict]], 
@@ -111,7 +286,8 @@ class DialogueRefiner:
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.3,
-            max_tokens=4000
+            max_tokens=4000,
+            use_cache=self.use_cache
         )
         
         # 調整されたテキストを元の形式に戻す
@@ -121,102 +297,27 @@ class DialogueRefiner:
     
     async def _stage2_katakana_conversion(
         self, 
-        dialogue_data: Dict[str, List[Dict]], 
-        speaker_info: Optional[Dict] = None
+        dialogue_data: Dict[str, List[Dict]]
     ) -> Dict[str, List[Dict]]:
-        """第二段階：カタカナ変換（後半重点）"""
-        
-        # 話者名を取得
-        speaker1_name = "speaker1"
-        speaker2_name = "speaker2"
-        if speaker_info:
-            speaker1_name = speaker_info.get("speaker1", {}).get("name", "speaker1")
-            speaker2_name = speaker_info.get("speaker2", {}).get("name", "speaker2")
-        
-        # 全対話を一つのテキストにまとめる
-        full_dialogue = []
-        for slide_key in sorted(dialogue_data.keys(), key=lambda x: int(x.split('_')[1])):
-            dialogues = dialogue_data[slide_key]
-            if dialogues:
-                full_dialogue.append(f"[{slide_key}]")
-                for d in dialogues:
-                    speaker_display = speaker1_name if d['speaker'] == 'speaker1' else speaker2_name
-                    full_dialogue.append(f"{speaker_display}: {d['text']}")
-                full_dialogue.append("")
-        
-        dialogue_text = "\n".join(full_dialogue)
-        
-        # カタカナ変換専用プロンプト
-        system_prompt = f"""あなたは英語→カタカナ変換の専門家です。
-【最重要任務】対話スクリプト内のすべての英語・ローマ字を漏れなくカタカナに変換してください。
-
-【特に重要】後半のスライドほど注意深く確認してください。最後のスライドまで必ず英語が残っていないか確認すること。
-
-変換例（これらは一例で、他の英語もすべて変換してください）：
-- AI → エーアイ、API → エーピーアイ、PDF → ピーディーエフ
-- Claude → クロード、ChatGPT → チャットジーピーティー
-- Anthropic → アンソロピック、Constitutional AI → コンスティテューショナル エーアイ
-- OpenAI → オープンエーアイ、GPT → ジーピーティー
-- LLM → エルエルエム、NLP → エヌエルピー
-- Machine Learning → マシーンラーニング、Deep Learning → ディープラーニング
-- PowerPoint → パワーポイント、Excel → エクセル
-- JavaScript → ジャバスクリプト、Python → パイソン
-- TypeScript → タイプスクリプト、React → リアクト
-- Node.js → ノードジェイエス、Vue.js → ビュージェイエス
-- GitHub → ギットハブ、Docker → ドッカー
-- Kubernetes → クーベルネティス、DevOps → デブオプス
-- HTML → エイチティーエムエル、CSS → シーエスエス
-- JSON → ジェイソン、XML → エックスエムエル
-- HTTP → エイチティーティーピー、HTTPS → エイチティーティーピーエス
-- REST → レスト、GraphQL → グラフキューエル
-- USB → ユーエスビー、CLI → シーエルアイ
-- SQL → エスキューエル、NoSQL → ノーエスキューエル
-- MongoDB → モンゴディービー、PostgreSQL → ポストグレエスキューエル
-- AWS → エーダブリューエス、Azure → アジュール
-- Google → グーグル、Microsoft → マイクロソフト
-- Windows → ウィンドウズ、Mac → マック、Linux → リナックス
-- iOS → アイオーエス、Android → アンドロイド
-- Swift → スウィフト、Kotlin → コトリン
-- Firebase → ファイアベース、Stripe → ストライプ
-- WordPress → ワードプレス、Drupal → ドルーパル
-- Bootstrap → ブートストラップ、Tailwind → テイルウィンド
-- Figma → フィグマ、Sketch → スケッチ
-- Slack → スラック、Discord → ディスコード
-- Zoom → ズーム、Teams → チームズ
-- md/MD → エムディー、yaml/YAML/yml/YML → ヤムル
-- IDE → アイディーイー、SDK → エスディーケー、Framework → フレームワーク
-
-【処理手順】
-1. 最初から最後のスライドまで順番に確認
-2. 各発話で英語・ローマ字を発見したら即座にカタカナに変換
-3. 特に後半のスライドは二重チェック
-4. 変換後、全体を再度確認して英語が残っていないことを確認
-
-話者情報：
-- {speaker1_name}: speaker1として表示される話者
-- {speaker2_name}: speaker2として表示される話者
-
-出力形式は元の形式を保持してください。内容は変更せず、英語のカタカナ変換のみ行ってください。"""
-
-        user_prompt = f"以下の対話スクリプト内のすべての英語・ローマ字をカタカナに変換してください。後半のスライドまで漏れなく確認してください。\n\n対話スクリプト:\n{dialogue_text}"
-        
-        # LLMでカタカナ変換
-        refined_text = await self.llm.generate(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            temperature=0.1,  # より確実な変換のため低温度
-            max_tokens=4000
-        )
+        """第二段階：カタカナ変換（辞書で置き換え、辞書にない単語だけLLMに問い合わせる）"""
         
-        # 調整されたテキストを元の形式に戻す
-        refined_dialogue = self._parse_refined_dialogue(refined_text, dialogue_data)
+        texts = [d['text'] for dialogues in dialogue_data.values() for d in dialogues]
+        await self._transliterate_unknown(await asyncio.to_thread(self.katakana_dictionary.find_unknown, texts))
         
-        return refined_dialogue
+        return await asyncio.to_thread(self._convert_all, dialogue_data)
+    
+    def _convert_all(self, dialogue_data: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """全発話を辞書で置き換える"""
+        return {
+            slide_key: [{**d, 'text': self.katakana_dictionary.convert(d['text'])} for d in dialogues]
+            for slide_key, dialogues in dialogue_data.items()
+        }
     
     async def _stage3_notation_consistency(
         self, 
         dialogue_data: Dict[str, List[Dict]], 
-        speaker_info: Optional[Dict] = None
+        speaker_info: Optional[Dict] = None,
+        glossary: Optional[Dict[str, str]] = None
     ) -> Dict[str, List[Dict]]:
         """第三段階：表記揺れ修正"""
         
@@ -257,6 +358,7 @@ class DialogueRefiner:
 - {speaker2_name}: speaker2として表示される話者
 
 出力形式は元の形式を保持してください。"""
+        system_prompt += self._glossary_instruction(glossary)
 
         user_prompt = f"以下の対話スクリプトの表記揺れを修正し、全体で一貫した表記に統一してください。\n\n対話スクリプト:\n{dialogue_text}"
         
@@ -265,7 +367,8 @@ class DialogueRefiner:
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.1,  # より確実な統一のため低温度
-            max_tokens=4000
+            max_tokens=4000,
+            use_cache=self.use_cache
         )
         
         # 調整されたテキストを元の形式に戻す
@@ -0,0 +1,126 @@
+"""
+対話スクリプトのストリーミング解析 - {"dialogue": [...]} 形式の応答を受信しながら解析する
+
+LLMの応答を断片ごとに feed() に渡すと、配列の要素（発話）が閉じた時点で順に返す。
+応答が対話の形式になっていないことが分かった時点で MalformedDialogueError を送出するので、
+呼び出し側はそこで受信を打ち切れる（応答全体を待ってから json.loads で失敗するのを避ける）。
+"""
+import json
+from typing import Any, Dict, List
+
+class MalformedDialogueError(ValueError):
+    """応答が対話スクリプトの形式として解釈できない"""
+
+class DialogueStreamParser:
+    """{"dialogue": [...]} 形式の応答から、完成した発話を順に取り出すパーサー
+
+    最初に現れた配列を対話として扱うので、トップレベルが配列の応答や
+    "slide_1" など別のキーの配列も受け付ける（一括で解析していた従来の処理と同じ）。
+    配列の後ろの内容は読み飛ばす。
+    """
+
+    # 配列が始まるまでに許容する文字数（それまでに始まらない応答は形式が違うと判断する）
+    MAX_PREFIX_CHARS = 200
+
+    def __init__(self):
+        self.text = ""
+        self.utterances: List[Dict[str, Any]] = []
+        self.state = "prefix"  # prefix → items → item → ... → done
+        self._pos = 0
+        self._item_start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._seen_content = False
+
+    @property
+    def done(self) -> bool:
+        return self.state == "done"
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """受信した断片を追加し、新しく完成した発話のリストを返す"""
+        self.text += chunk
+        completed = []
+        while self._pos < len(self.text) and self.state != "done":
+            char = self.text[self._pos]
+            if self.state == "prefix":
+                self._scan_prefix(char)
+            elif self.state == "items":
+                self._scan_items(char)
+            else:
+                utterance = self._scan_item(char)
+                if utterance is not None:
+                    completed.append(utterance)
+            self._pos += 1
+        return completed
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """受信完了時に呼ぶ（配列が閉じていない場合は MalformedDialogueError）"""
+        if not self.text.strip():
+            raise MalformedDialogueError("応答が空です")
+        if self.state != "done":
+            raise MalformedDialogueError(f"応答が途中で終わっています（{len(self.utterances)}件の発話まで受信）")
+        return self.utterances
+
+    def _skip_string(self, char: str) -> bool:
+        """文字列リテラルの中であれば True（エスケープと終端を処理する）"""
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+            return True
+        if char == '"':
+            self._in_string = True
+            return True
+        return False
+
+    def _scan_prefix(self, char: str) -> None:
+        # 最初の文字はオブジェクト・配列・コードブロックのいずれか（説明文から始まる応答は打ち切る）
+        if not self._seen_content and not char.isspace():
+            self._seen_content = True
+            if char not in "{[`":
+                raise MalformedDialogueError(f"応答がJSONではありません: {self.text[:50]!r}")
+        if self._pos >= self.MAX_PREFIX_CHARS:
+            raise MalformedDialogueError(f"対話の配列が見つかりません: {self.text[:50]!r}")
+        if self._skip_string(char):
+            return
+        if char == "[":
+            self.state = "items"
+
+    def _scan_items(self, char: str) -> None:
+        # 配列の要素の間（区切りと空白以外は不正）
+        if char.isspace() or char == ",":
+            return
+        if char == "]":
+            self.state = "done"
+        elif char == "{":
+            self.state = "item"
+            self._item_start = self._pos
+            self._depth = 1
+        else:
+            raise MalformedDialogueError(f"対話の要素がオブジェクトではありません: {self.text[self._pos:self._pos + 50]!r}")
+
+    def _scan_item(self, char: str):
+        if self._skip_string(char):
+            return None
+        if char == "{":
+            self._depth += 1
+        elif char == "}":
+            self._depth -= 1
+            if self._depth == 0:
+                self.state = "items"
+                return self._parse_item(self.text[self._item_start:self._pos + 1])
+        return None
+
+    def _parse_item(self, item_text: str) -> Dict[str, Any]:
+        try:
+            utterance = json.loads(item_text)
+        except json.JSONDecodeError as e:
+            raise MalformedDialogueError(f"発話のJSON解析エラー: {e}")
+        if not isinstance(utterance.get("text"), str) or "speaker" not in utterance:
+            raise MalformedDialogueError(f"発話に speaker と text がありません: {item_text[:100]!r}")
+        self.utterances.append(utterance)
+        return utterance
@@ -0,0 +1,226 @@
+"""
+ディスクキャッシュ - コンテンツハッシュをキーにしたファイルキャッシュ（サイズ上限付きLRU）
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+def make_cache_key(*parts: Any) -> str:
+    """キー要素をJSONに正規化してSHA-256ハッシュを作成"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """ファイル内容のSHA-256ハッシュ（チャンク単位で読み込む）"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+class DiskLRUCache:
+    """ファイルをハッシュキーで保存するLRUキャッシュ
+
+    最終アクセス時刻はファイルのmtimeで管理し、合計サイズが上限を超えたら
+    古いものから削除する。ヒット・ミス数はプロセス内で集計する。
+    """
+
+    # 保存のたびに削除する場合（maybe_evict）でも、この間隔（秒）ごとにディレクトリを走査し直す
+    # （他のプロセスが保存した分と期限切れのエントリを反映する）
+    SCAN_INTERVAL = 600.0
+    # maybe_evict で削除する場合は上限のこの割合まで減らす（上限付近で保存のたびに走査しない）
+    EVICT_TARGET_RATIO = 0.9
+
+    def __init__(self, cache_dir: Path, max_bytes: int, suffix: str = ""):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 前回の走査で集計した合計サイズに、その後このプロセスで保存した分を足したもの
+        self._size: Optional[int] = None
+        self._scanned_at = 0.0
+
+    def path_for(self, key: str) -> Path:
+        """キーに対応するキャッシュファイルのパス"""
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """キャッシュを検索し、ヒットした場合はパスを返す（アクセス時刻を更新）"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def get_file(self, key: str, dest_path: Path) -> bool:
+        """キャッシュされたファイルを dest_path にコピー"""
+        path = self.lookup(key)
+        if path is None:
+            return False
+        try:
+            shutil.copyfile(path, dest_path)
+        except FileNotFoundError:
+            # 検索後に別スレッドで削除された場合
+            return False
+        return True
+
+    def link_file(self, key: str, dest_path: Path) -> bool:
+        """キャッシュされたファイルを dest_path にハードリンク（不可能な場合はコピー）"""
+        path = self.lookup(key)
+        if path is None:
+            return False
+        dest_path = Path(dest_path)
+        try:
+            if dest_path.exists():
+                dest_path.unlink()
+            os.link(path, dest_path)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            shutil.copyfile(path, dest_path)
+        return True
+
+    def put_file(self, key: str, src_path: Path) -> Path:
+        """ファイルをキャッシュに保存（一時ファイル経由で原子的に配置）"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self._added(path)
+        return path
+
+    def put_link(self, key: str, src_path: Path) -> Path:
+        """ファイルをハードリンクでキャッシュに登録（不可能な場合はコピー）"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.parent / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            try:
+                os.link(src_path, tmp_path)
+            except OSError:
+                shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self._added(path)
+        return path
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        """バイト列をキャッシュに保存"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self._added(path)
+        return path
+
+    def _added(self, path: Path) -> None:
+        """保存したファイルのサイズを合計に加える（上書きした場合は多めになるが次の走査で直る）"""
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+
+    def _entries(self):
+        for path in self.cache_dir.glob(f"*/*{self.suffix}"):
+            if path.name.endswith(".tmp"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat
+
+    def evict(self, max_age: Optional[float] = None, target_bytes: Optional[int] = None) -> int:
+        """合計サイズが上限（target_bytes を指定した場合はそのサイズ）を超えている場合、最終アクセスが古い順に削除
+
+        max_age を指定した場合は、最終アクセスから max_age 秒以上経過したエントリもすべて削除する
+        （最終アクセスは作成より後なので、作成からの有効期限が切れていることが確実なもの）。
+        """
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+            total = sum(stat.st_size for _, stat in entries)
+            expire_before = time.time() - max_age if max_age is not None else None
+            target_bytes = self.max_bytes if target_bytes is None else target_bytes
+            removed = 0
+            for path, stat in entries:
+                expired = expire_before is not None and stat.st_mtime < expire_before
+                if not expired and total <= target_bytes:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= stat.st_size
+                removed += 1
+            self._size = total
+            self._scanned_at = time.monotonic()
+            return removed
+
+    def maybe_evict(self, max_age: Optional[float] = None) -> int:
+        """合計サイズが上限を超えた場合か、前回の走査から SCAN_INTERVAL 経過した場合だけ evict する
+
+        保存のたびに呼んでも、通常はディレクトリを走査しない。
+        """
+        with self._lock:
+            due = (self._size is None or self._size > self.max_bytes
+                   or time.monotonic() - self._scanned_at >= self.SCAN_INTERVAL)
+        if not due:
+            return 0
+        return self.evict(max_age, target_bytes=int(self.max_bytes * self.EVICT_TARGET_RATIO))
+
+    def purge(self) -> int:
+        """キャッシュをすべて削除"""
+        with self._lock:
+            removed = 0
+            for path, _ in list(self._entries()):
+                try:
+                    path.unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報"""
+        entries = list(self._entries())
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(entries),
+            "size_bytes": sum(stat.st_size for _, stat in entries),
+            "max_bytes": self.max_bytes
+        }
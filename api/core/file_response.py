@@ -0,0 +1,161 @@
+"""
+ファイル配信 - Range リクエストと条件付きGETに対応した FileResponse
+
+starlette の FileResponse は常にファイル全体を 200 で返すため、<video> のシークや
+中断したダウンロードの再開でも先頭から送り直しになる。RangeFileResponse は
+Range（単一範囲）に 206 で、If-None-Match / If-Modified-Since が一致すれば 304 で応答する。
+ASGIサーバーが zero-copy 拡張（http.response.zerocopy）に対応している場合は
+sendfile で送信し、対応していない場合はスレッドで pread した範囲を順に送る。
+"""
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+# 1回の送信で読み込むサイズ（zero-copy 拡張がない場合）
+CHUNK_SIZE = 256 * 1024
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+class RangeFileResponse(FileResponse):
+    """Range / 条件付きGETに対応した FileResponse（引数は FileResponse と同じ）"""
+
+    def set_stat_headers(self, stat_result: os.stat_result) -> None:
+        # ETag は更新時刻とサイズから作る（再レンダリングで同じパスを上書きしても変わる）
+        self.stat_result = stat_result
+        self.headers.setdefault("content-length", str(stat_result.st_size))
+        self.headers.setdefault("last-modified", formatdate(stat_result.st_mtime, usegmt=True))
+        self.headers.setdefault("etag", f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"')
+        self.headers.setdefault("accept-ranges", "bytes")
+        # キャッシュした場合も毎回ETagで確認させる（変更がなければ304）
+        self.headers.setdefault("cache-control", "no-cache")
+
+    def _etag_matches(self, header: str) -> bool:
+        """If-None-Match / If-Range のETagが一致するか（弱いETagの接頭辞は無視する）"""
+        etag = self.headers["etag"]
+        if header.strip() == "*":
+            return True
+        return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+    def _not_modified_since(self, header: str) -> bool:
+        try:
+            since = parsedate_to_datetime(header).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(self.stat_result.st_mtime) <= since
+
+    def _is_not_modified(self, request_headers: Headers) -> bool:
+        if "if-none-match" in request_headers:
+            # If-None-Match がある場合は If-Modified-Since を使わない（RFC 9110）
+            return self._etag_matches(request_headers["if-none-match"])
+        if "if-modified-since" in request_headers:
+            return self._not_modified_since(request_headers["if-modified-since"])
+        return False
+
+    def _parse_range(self, request_headers: Headers) -> Optional[Tuple[int, int]]:
+        """送信する範囲 (開始, 終了) を返す（全体を返す場合は None、満たせない範囲は ValueError）"""
+        range_header = request_headers.get("range")
+        if not range_header:
+            return None
+        if_range = request_headers.get("if-range")
+        if if_range is not None:
+            # ファイルが変わっていたら範囲ではなく全体を返す
+            matched = self._etag_matches(if_range) if if_range.strip().startswith(('"', "W/")) \
+                else self._not_modified_since(if_range)
+            if not matched:
+                return None
+
+        match = _RANGE_PATTERN.match(range_header.strip())
+        if match is None:
+            # 複数範囲・不正な形式は Range を無視して全体を返す
+            return None
+        size = self.stat_result.st_size
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:
+            # 末尾から last バイト
+            length = int(last)
+            if length == 0 or size == 0:
+                raise ValueError("満たせない範囲です")
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            raise ValueError("満たせない範囲です")
+        return start, end
+
+    async def _send_header_only(self, send: Send, status_code: int) -> None:
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            try:
+                stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                raise RuntimeError(f"File at path {self.path} does not exist.")
+            if not stat.S_ISREG(stat_result.st_mode):
+                raise RuntimeError(f"File at path {self.path} is not a file.")
+            self.set_stat_headers(stat_result)
+
+        request_headers = Headers(scope=scope)
+        send_header_only = self.send_header_only or scope.get("method") == "HEAD"
+
+        if self._is_not_modified(request_headers):
+            del self.headers["content-length"]
+            await self._send_header_only(send, 304)
+            return
+
+        size = self.stat_result.st_size
+        try:
+            byte_range = self._parse_range(request_headers)
+        except ValueError:
+            self.headers["content-range"] = f"bytes */{size}"
+            self.headers["content-length"] = "0"
+            await self._send_header_only(send, 416)
+            return
+
+        status_code = self.status_code
+        start, end = 0, size - 1
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+        if send_header_only:
+            await self._send_header_only(send, status_code)
+            return
+
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        count = end - start + 1
+        with open(self.path, "rb") as file:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                # サーバーが sendfile でファイルから直接送信する
+                await send({"type": "http.response.zerocopy", "file": file, "offset": start,
+                            "count": count, "more_body": False})
+            else:
+                await self._send_chunks(send, file.fileno(), start, count)
+        if self.background is not None:
+            await self.background()
+
+    async def _send_chunks(self, send: Send, fd: int, offset: int, count: int) -> None:
+        """指定範囲を CHUNK_SIZE ずつ pread して送信"""
+        if count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        while count > 0:
+            chunk = await anyio.to_thread.run_sync(os.pread, fd, min(CHUNK_SIZE, count), offset)
+            if not chunk:
+                # 送信中にファイルが短くなった
+                raise RuntimeError(f"File at path {self.path} was truncated while sending.")
+            offset += len(chunk)
+            count -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": count > 0})
@@ -15,7 +15,8 @@ project_root = current_dir.parent.parent
 sys.path.append(str(project_root))
 
 from api.core.status_codes import StatusCode
-from api.core.async_worker import async_worker
+from api.core.async_worker import async_worker, cpu_bound, io_bound
+from api.core.scheduler import job_scheduler
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
@@ -25,37 +26,104 @@ class JobProcessor:
     """ジョブ処理の非同期実装"""
     
     @staticmethod
+    @cpu_bound
     def process_pdf_sync(job_id: str, pdf_path: str, jobs_db: Dict[str, Any]) -> int:
-        """PDF処理の同期版（ワーカーで実行される）"""
+        """PDF処理の同期版（CPUワーカープロセスで実行される）"""
         try:
             from api.core.pdf_processor import PDFProcessor
             
             job = jobs_db[job_id]
-            job.status_code = StatusCode.PDF_PROCESSING
-            job.progress = 10
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.PDF_PROCESSING,
+                progress=10,
+                updated_at=datetime.now()
+            )
+            
+            def update_progress(message: str, progress: float):
+                jobs_db.update_job(
+                    job,
+                    progress=10 + int(progress * 0.15),  # 10-25%の範囲で進捗表示
+                    updated_at=datetime.now()
+                )
             
             processor = PDFProcessor(job_id, Path.cwd())
-            slide_count = processor.convert_pdf_to_slides(pdf_path)
+            slide_count = processor.convert_pdf_to_slides(pdf_path, progress_callback=update_progress)
             
-            job.status_code = StatusCode.PDF_COMPLETED
-            job.progress = 25
-            job.error_code = None  # エラーコードをクリア
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.PDF_COMPLETED,
+                progress=25,
+                error_code=None,  # エラーコードをクリア
+                updated_at=datetime.now()
+            )
             
             logger.info(f"PDF処理完了: {job_id}, スライド数: {slide_count}")
             return slide_count
             
         except Exception as e:
             job = jobs_db[job_id]
-            job.status = "failed"
-            job.status_code = StatusCode.FAILED
-            job.error_code = StatusCode.PDF_PROCESSING_ERROR
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status="failed",
+                status_code=StatusCode.FAILED,
+                error_code=StatusCode.PDF_PROCESSING_ERROR,
+                updated_at=datetime.now()
+            )
             logger.error(f"PDF処理エラー {job_id}: {str(e)}")
             raise
     
     @staticmethod
+    @io_bound
+    def rasterize_slides_sync(job_id: str, pdf_path: str, jobs_db: Dict[str, Any], progress_range: tuple = (10, 15),
+                              pdf_sha256: Optional[str] = None, resolution_name: Optional[str] = None) -> int:
+        """スライド画像化（ページごとの進捗を progress_range の範囲で表示）
+        
+        ページの描画はページ範囲ごとに cpu レーンのプロセスプールで並列に行い、
+        この関数はスレッドで全体の進行とキャッシュの管理だけを行う。
+        解像度プロファイルは名前で渡す（省略時は環境変数 VIDEO_RESOLUTION）。
+        """
+        from api.core.pdf_processor import PDFProcessor
+        from resolution_profiles import get_resolution_profile
+        
+        job = jobs_db[job_id]
+        start, end = progress_range
+        
+        def update_progress(message: str, progress: float):
+            jobs_db.update_job(
+                job,
+                progress=start + int(progress * (end - start) / 100),
+                updated_at=datetime.now()
+            )
+        
+        processor = PDFProcessor(job_id, Path.cwd())
+        return processor.convert_pdf_to_slides(
+            pdf_path,
+            progress_callback=update_progress,
+            pdf_sha256=pdf_sha256,
+            resolution_profile=get_resolution_profile(resolution_name),
+            executor=async_worker.cpu_executor()
+        )
+    
+    @staticmethod
+    @cpu_bound
+    def render_video_sync(job_id: str, base_dir: str, slide_numbers: Optional[list] = None,
+                          engine: Optional[str] = None) -> str:
+        """動画作成（CPUワーカープロセスで実行、ジョブの状態は呼び出し側で更新する）"""
+        from api.core.video_creator import VideoCreator
+        
+        return VideoCreator(job_id, Path(base_dir)).create_video(slide_numbers, engine=engine)
+    
+    @staticmethod
+    @cpu_bound
+    def prerender_segment_sync(job_id: str, base_dir: str, slide_number: int, is_last: bool) -> str:
+        """1スライド分の映像セグメントを作成（CPUワーカープロセスで実行）"""
+        from api.core.video_creator import VideoCreator
+        
+        return VideoCreator(job_id, Path(base_dir)).prerender_segment(slide_number, is_last)
+    
+    @staticmethod
+    @io_bound
     def generate_dialogue_sync(job_id: str, additional_prompt: Optional[str], jobs_db: Dict[str, Any]) -> None:
         """対話生成の同期版（ワーカーで実行される）"""
         try:
@@ -64,9 +132,12 @@ class JobProcessor:
             from api.core.text_extractor import TextExtractor
             
             job = jobs_db[job_id]
-            job.status_code = StatusCode.DIALOGUE_GENERATING
-            job.progress = 30
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.DIALOGUE_GENERATING,
+                progress=30,
+                updated_at=datetime.now()
+            )
             
             # PDFファイルからテキストを抽出
             job_dir = Path.cwd() / "uploads" / job_id
@@ -80,17 +151,18 @@ class JobProcessor:
             # 対話生成を実行
             generator = DialogueGenerator()
             
-            # 非同期関数を同期で実行
+            # 非同期関数を同期で実行（LLMの呼び出しはこのジョブとしてキューに並ぶ）
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             try:
-                dialogue_data = loop.run_until_complete(
-                    generator.extract_text_from_slides(
-                        slide_texts, 
-                        additional_prompt=additional_prompt,
-                        target_duration=10  # デフォルト10分
+                with job_scheduler.job_context(job_id):
+                    dialogue_data = loop.run_until_complete(
+                        generator.extract_text_from_slides(
+                            slide_texts, 
+                            additional_prompt=additional_prompt,
+                            target_duration=10  # デフォルト10分
+                        )
                     )
-                )
                 
                 # 対話データを保存
                 data_dir = Path.cwd() / "data" / job_id
@@ -102,23 +174,30 @@ class JobProcessor:
             finally:
                 loop.close()
             
-            job.status_code = StatusCode.DIALOGUE_COMPLETED
-            job.progress = 60
-            job.error_code = None  # エラーコードをクリア
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.DIALOGUE_COMPLETED,
+                progress=60,
+                error_code=None,  # エラーコードをクリア
+                updated_at=datetime.now()
+            )
             
             logger.info(f"対話生成完了: {job_id}")
             
         except Exception as e:
             job = jobs_db[job_id]
-            job.status = "failed"
-            job.status_code = StatusCode.FAILED
-            job.error_code = StatusCode.DIALOGUE_GENERATION_ERROR
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status="failed",
+                status_code=StatusCode.FAILED,
+                error_code=StatusCode.DIALOGUE_GENERATION_ERROR,
+                updated_at=datetime.now()
+            )
             logger.error(f"対話生成エラー {job_id}: {str(e)}")
             raise
     
     @staticmethod
+    @io_bound
     def generate_audio_sync(job_id: str, speed_scale: float, pitch_scale: float, 
                           intonation_scale: float, volume_scale: float, jobs_db: Dict[str, Any]) -> None:
         """音声生成の同期版（ワーカーで実行される）"""
@@ -126,9 +205,12 @@ class JobProcessor:
             from api.core.audio_generator import AudioGenerator
             
             job = jobs_db[job_id]
-            job.status_code = StatusCode.AUDIO_GENERATING
-            job.progress = 65
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.AUDIO_GENERATING,
+                progress=65,
+                updated_at=datetime.now()
+            )
             
             generator = AudioGenerator(job_id, Path.cwd())
             generator.generate_audio_files(
@@ -138,52 +220,68 @@ class JobProcessor:
                 volume_scale=volume_scale
             )
             
-            job.status_code = StatusCode.AUDIO_COMPLETED
-            job.progress = 85
-            job.error_code = None  # エラーコードをクリア
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.AUDIO_COMPLETED,
+                progress=85,
+                error_code=None,  # エラーコードをクリア
+                updated_at=datetime.now()
+            )
             
             logger.info(f"音声生成完了: {job_id}")
             
         except Exception as e:
             job = jobs_db[job_id]
-            job.status = "failed"
-            job.status_code = StatusCode.FAILED
-            job.error_code = StatusCode.AUDIO_GENERATION_ERROR
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status="failed",
+                status_code=StatusCode.FAILED,
+                error_code=StatusCode.AUDIO_GENERATION_ERROR,
+                updated_at=datetime.now()
+            )
             logger.error(f"音声生成エラー {job_id}: {str(e)}")
             raise
     
     @staticmethod
+    @cpu_bound
     def create_video_sync(job_id: str, jobs_db: Dict[str, Any]) -> str:
-        """動画作成の同期版（ワーカーで実行される）"""
+        """動画作成の同期版（CPUワーカープロセスで実行される）"""
         try:
             from api.core.video_creator import VideoCreator
             
             job = jobs_db[job_id]
-            job.status_code = StatusCode.VIDEO_CREATING
-            job.progress = 90
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.VIDEO_CREATING,
+                progress=90,
+                updated_at=datetime.now()
+            )
             
             creator = VideoCreator(job_id, Path.cwd())
             video_path = creator.create_video()
             
-            job.status = "completed"
-            job.status_code = StatusCode.COMPLETED
-            job.progress = 100
-            job.result_url = f"/api/jobs/{job_id}/download"
-            job.error_code = None  # エラーコードをクリア
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status="completed",
+                status_code=StatusCode.COMPLETED,
+                progress=100,
+                result_url=f"/api/jobs/{job_id}/download",
+                error_code=None,  # エラーコードをクリア
+                updated_at=datetime.now()
+            )
             
             logger.info(f"動画作成完了: {job_id}, パス: {video_path}")
             return video_path
             
         except Exception as e:
             job = jobs_db[job_id]
-            job.status = "failed"
-            job.status_code = StatusCode.FAILED
-            job.error_code = StatusCode.VIDEO_CREATION_ERROR
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status="failed",
+                status_code=StatusCode.FAILED,
+                error_code=StatusCode.VIDEO_CREATION_ERROR,
+                updated_at=datetime.now()
+            )
             logger.error(f"動画作成エラー {job_id}: {str(e)}")
             raise
 
@@ -193,8 +291,7 @@ class JobProcessor:
         """完全な動画生成フローを非同期で実行"""
         try:
             job = jobs_db[job_id]
-            job.status = "processing"
-            job.updated_at = datetime.now()
+            jobs_db.update_job(job, status="processing", updated_at=datetime.now())
             
             # 1. PDFファイルパスを取得
             job_dir = Path.cwd() / "uploads" / job_id
@@ -204,13 +301,14 @@ class JobProcessor:
             
             pdf_path = str(pdf_files[0])
             
-            # 2. PDF処理（非同期）
-            await async_worker.submit_task(
-                f"pdf_{job_id}",
-                JobProcessor.process_pdf_sync,
-                job_id, pdf_path, jobs_db
-            )
-            await async_worker.wait_for_task(f"pdf_{job_id}")
+            # 2. PDF処理（非同期、ワーカープロセスで実行するので枠はここで確保する）
+            async with job_scheduler.aslot("rasterize", job_id):
+                await async_worker.submit_task(
+                    f"pdf_{job_id}",
+                    JobProcessor.process_pdf_sync,
+                    job_id, pdf_path, jobs_db
+                )
+                await async_worker.wait_for_task(f"pdf_{job_id}")
             
             # 3. 対話生成（非同期）
             await async_worker.submit_task(
@@ -229,19 +327,23 @@ class JobProcessor:
             await async_worker.wait_for_task(f"audio_{job_id}")
             
             # 5. 動画作成（非同期）
-            await async_worker.submit_task(
-                f"video_{job_id}",
-                JobProcessor.create_video_sync,
-                job_id, jobs_db
-            )
-            await async_worker.wait_for_task(f"video_{job_id}")
+            async with job_scheduler.aslot("encode", job_id):
+                await async_worker.submit_task(
+                    f"video_{job_id}",
+                    JobProcessor.create_video_sync,
+                    job_id, jobs_db
+                )
+                await async_worker.wait_for_task(f"video_{job_id}")
             
             logger.info(f"完全動画生成完了: {job_id}")
             
         except Exception as e:
             job = jobs_db[job_id]
-            job.status = "failed"
-            job.status_code = StatusCode.FAILED
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status="failed",
+                status_code=StatusCode.FAILED,
+                updated_at=datetime.now()
+            )
             logger.error(f"完全動画生成エラー {job_id}: {str(e)}")
             raise
\ No newline at end of file
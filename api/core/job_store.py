@@ -0,0 +1,453 @@
+"""
+ジョブストア - ジョブ状態の永続化
+
+jobs_db と同じ辞書ライクなインターフェースを持ち、ジョブオブジェクトは
+プロセス内でキャッシュして同じインスタンスを返す。ジョブの更新は update_job() で
+まとめて行い、書き込みはフラッシュスレッドが一定間隔でまとめて行う。更新の通知先
+（進捗配信など）は add_listener() で登録する。
+
+SQLiteJobStore はジョブを最後に書き込んだワーカー（担当ワーカー）とワーカーの生存時刻を記録する。
+再起動などで担当ワーカーが終了したジョブは実行中のタスクがなくなるので、
+find_orphaned() で見つけて失敗にする。
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Type
+
+class JobStore(ABC):
+    """ジョブストアの共通インターフェース"""
+
+    def __init__(self, model_class: Type):
+        self.model_class = model_class
+        self._listeners: List[Callable[[Any, Dict[str, Any]], None]] = []
+
+    @abstractmethod
+    def get(self, job_id: str, default: Any = None) -> Any:
+        """ジョブを取得"""
+
+    @abstractmethod
+    def put(self, job: Any) -> None:
+        """ジョブを保存（即時書き込み）"""
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        """ジョブを削除"""
+
+    @abstractmethod
+    def list(self, status: Optional[str] = None, limit: Optional[int] = None, offset: int = 0) -> List[Any]:
+        """ジョブ一覧を更新日時の新しい順に取得"""
+
+    @abstractmethod
+    def count(self, status: Optional[str] = None) -> int:
+        """ジョブ数を取得"""
+
+    def add_listener(self, listener: Callable[[Any, Dict[str, Any]], None]) -> None:
+        """ジョブ更新時に呼び出す関数を登録（引数は更新後のジョブと変更したフィールド）"""
+        self._listeners.append(listener)
+
+    def update_job(self, job: Any, **fields: Any) -> None:
+        """ジョブのフィールドをまとめて更新し、書き込み予約と通知を1回だけ行う"""
+        for name, value in fields.items():
+            setattr(job, name, value)
+        self.mark_dirty(job.job_id)
+        for listener in self._listeners:
+            try:
+                listener(job, fields)
+            except Exception as e:
+                print(f"ジョブ更新の通知エラー: {e}")
+
+    def mark_dirty(self, job_id: str) -> None:
+        """ジョブが変更されたことを記録（書き込みはまとめて行う）"""
+
+    def flush(self) -> None:
+        """未書き込みの変更を保存"""
+
+    def find_orphaned(self, statuses: Sequence[str]) -> List[Any]:
+        """指定したステータスのまま担当ワーカーが終了しているジョブを取得（プロセス内のみのストアでは対象なし）"""
+        return []
+
+    def close(self) -> None:
+        """リソースの解放"""
+        self.flush()
+
+    # 既存の jobs_db（dict）と同じ使い方ができるようにする
+    def __getitem__(self, job_id: str) -> Any:
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def __setitem__(self, job_id: str, job: Any) -> None:
+        self.put(job)
+
+    def __delitem__(self, job_id: str) -> None:
+        if self.get(job_id) is None:
+            raise KeyError(job_id)
+        self.delete(job_id)
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def values(self) -> List[Any]:
+        return self.list()
+
+class MemoryJobStore(JobStore):
+    """プロセス内のみで保持するジョブストア（再起動で消える）"""
+
+    def __init__(self, model_class: Type):
+        super().__init__(model_class)
+        self._jobs: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str, default: Any = None) -> Any:
+        return self._jobs.get(job_id, default)
+
+    def put(self, job: Any) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def list(self, status: Optional[str] = None, limit: Optional[int] = None, offset: int = 0) -> List[Any]:
+        jobs = [job for job in self._jobs.values() if status is None or job.status == status]
+        jobs.sort(key=lambda job: job.updated_at, reverse=True)
+        end = offset + limit if limit is not None else None
+        return jobs[offset:end]
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return len(self._jobs)
+        return len([job for job in self._jobs.values() if job.status == status])
+
+class SQLiteJobStore(JobStore):
+    """SQLite（WALモード）にジョブを保存するジョブストア
+
+    複数のAPIワーカーから同じデータベースを共有できる。キャッシュ済みのジョブは
+    他プロセスが書き込んでいた場合に取得時に最新状態へ更新する。一覧・件数の取得では
+    書き込みを行わず、未書き込みのジョブはメモリ上の内容で補う。
+    """
+
+    # ワーカーの生存時刻を更新する間隔（秒）
+    HEARTBEAT_INTERVAL = 10.0
+
+    def __init__(self, model_class: Type, db_path: Path, flush_interval: float = 1.0, worker_timeout: float = 60.0):
+        super().__init__(model_class)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        # 生存時刻の更新がこの秒数より古いワーカーは終了したとみなす
+        self.worker_timeout = worker_timeout
+        # 同じPIDが再利用されても区別できるよう起動ごとのIDを付ける
+        self.hostname = socket.gethostname()
+        self.worker_id = f"{self.hostname}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._cache: Dict[str, Any] = {}
+        # キャッシュしたジョブが最後に書き込まれた時刻（他プロセスの更新検知用）
+        self._versions: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+
+        self._init_schema()
+        self._heartbeat()
+
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """スレッドごとのコネクションを取得"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WALではNORMALでもコミット済みデータは失われない（チェックポイント時のみfsync）
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                written_at REAL NOT NULL,
+                data TEXT NOT NULL,
+                owner TEXT
+            )
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            # 担当ワーカーを記録する前に作成したデータベース
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                pid INTEGER NOT NULL,
+                heartbeat REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_updated ON jobs (status, updated_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated_at)")
+
+    def _row_values(self, job: Any, written_at: float) -> tuple:
+        return (
+            job.job_id,
+            job.status,
+            job.created_at.isoformat(),
+            job.updated_at.isoformat(),
+            written_at,
+            job.model_dump_json(),
+            self.worker_id
+        )
+
+    def _write(self, jobs: List[Any]) -> None:
+        """ジョブを1トランザクションでまとめて書き込む"""
+        if not jobs:
+            return
+        written_at = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO jobs (job_id, status, created_at, updated_at, written_at, data, owner) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._row_values(job, written_at) for job in jobs]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for job in jobs:
+            self._versions[job.job_id] = written_at
+
+    def _load(self, job_id: str, data: str, written_at: float) -> Any:
+        """DBの内容をキャッシュに反映（キャッシュ済みの場合は同じインスタンスを更新）"""
+        loaded = self.model_class.model_validate(json.loads(data))
+        cached = self._cache.get(job_id)
+        if cached is None:
+            self._cache[job_id] = loaded
+            cached = loaded
+        else:
+            for field in loaded.model_fields:
+                setattr(cached, field, getattr(loaded, field))
+        self._versions[job_id] = written_at
+        return cached
+
+    def get(self, job_id: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT data, written_at FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            is_dirty = self._is_dirty(job_id)
+            if row is None:
+                if is_dirty:
+                    # フラッシュ前に別プロセスで削除された場合もローカルの変更を優先
+                    return self._cache.get(job_id, default)
+                self._cache.pop(job_id, None)
+                self._versions.pop(job_id, None)
+                return default
+            data, written_at = row
+            return self._resolve(job_id, data, written_at, is_dirty)
+
+    def _is_dirty(self, job_id: str) -> bool:
+        with self._dirty_lock:
+            return job_id in self._dirty
+
+    def _dirty_jobs(self) -> Dict[str, Any]:
+        """未書き込みの変更があるキャッシュ済みジョブ"""
+        with self._dirty_lock:
+            dirty_ids = list(self._dirty)
+        return {job_id: self._cache[job_id] for job_id in dirty_ids if job_id in self._cache}
+
+    def _resolve(self, job_id: str, data: str, written_at: float, is_dirty: bool) -> Any:
+        """DBの行とキャッシュのどちらを返すか決める"""
+        cached = self._cache.get(job_id)
+        # 未書き込みの変更があるジョブは他プロセスの内容で上書きしない
+        if cached is not None and (is_dirty or written_at <= self._versions.get(job_id, 0)):
+            return cached
+        return self._load(job_id, data, written_at)
+
+    def put(self, job: Any) -> None:
+        with self._lock:
+            self._cache[job.job_id] = job
+            with self._dirty_lock:
+                self._dirty.discard(job.job_id)
+            self._write([job])
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._cache.pop(job_id, None)
+            self._versions.pop(job_id, None)
+            with self._dirty_lock:
+                self._dirty.discard(job_id)
+            self._connect().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def list(self, status: Optional[str] = None, limit: Optional[int] = None, offset: int = 0) -> List[Any]:
+        with self._lock:
+            dirty = self._dirty_jobs()
+            query = "SELECT job_id, status, data, written_at FROM jobs"
+            params: List[Any] = []
+            if status is not None:
+                query += " WHERE status = ?"
+                params.append(status)
+                if dirty:
+                    # 未書き込みのジョブはDB上のステータスが古い可能性があるので条件に関係なく取得する
+                    query += f" OR job_id IN ({', '.join('?' for _ in dirty)})"
+                    params.extend(dirty)
+            query += " ORDER BY updated_at DESC"
+            if limit is not None:
+                # 未書き込みのジョブは並び順が変わりうるので、その分を多めに取得してから切り出す
+                query += " LIMIT ?"
+                params.append(offset + limit + len(dirty))
+            rows = self._connect().execute(query, params).fetchall()
+
+            jobs = []
+            seen = set()
+            for job_id, _, data, written_at in rows:
+                seen.add(job_id)
+                job = dirty[job_id] if job_id in dirty else self._resolve(job_id, data, written_at, False)
+                if status is None or job.status == status:
+                    jobs.append(job)
+            # まだ一度も書き込まれていないジョブ
+            jobs.extend(
+                job for job_id, job in dirty.items()
+                if job_id not in seen and (status is None or job.status == status)
+            )
+            jobs.sort(key=lambda job: job.updated_at, reverse=True)
+            end = offset + limit if limit is not None else None
+            return jobs[offset:end]
+
+    def count(self, status: Optional[str] = None) -> int:
+        with self._lock:
+            dirty = self._dirty_jobs()
+            conn = self._connect()
+            if status is None:
+                total = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            else:
+                total = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+            if not dirty:
+                return total
+            # 未書き込みのジョブはDB上のステータスではなくメモリ上のステータスで数える
+            placeholders = ", ".join("?" for _ in dirty)
+            stored = dict(conn.execute(
+                f"SELECT job_id, status FROM jobs WHERE job_id IN ({placeholders})", list(dirty)
+            ).fetchall())
+            for job_id, job in dirty.items():
+                if status is None:
+                    total += 0 if job_id in stored else 1
+                else:
+                    total += (job.status == status) - (stored.get(job_id) == status)
+            return total
+
+    def mark_dirty(self, job_id: str) -> None:
+        # DB書き込み中でも待たされないよう、専用のロックで記録だけ行う
+        if job_id in self._cache:
+            with self._dirty_lock:
+                self._dirty.add(job_id)
+
+    def flush(self) -> None:
+        with self._lock:
+            with self._dirty_lock:
+                if not self._dirty:
+                    return
+                dirty_ids = list(self._dirty)
+                self._dirty = set()
+            jobs = [self._cache[job_id] for job_id in dirty_ids if job_id in self._cache]
+            try:
+                self._write(jobs)
+            except Exception:
+                with self._dirty_lock:
+                    self._dirty.update(dirty_ids)
+                raise
+
+    def _heartbeat(self) -> None:
+        """このワーカーの生存時刻を記録"""
+        self._connect().execute(
+            "INSERT OR REPLACE INTO workers (worker_id, host, pid, heartbeat) VALUES (?, ?, ?, ?)",
+            (self.worker_id, self.hostname, os.getpid(), time.time())
+        )
+
+    def _worker_alive(self, worker: Optional[tuple]) -> bool:
+        if worker is None:
+            # 正常終了したワーカー、または担当ワーカーを記録する前のジョブ
+            return False
+        host, pid, heartbeat = worker
+        if host == self.hostname and pid != os.getpid():
+            # 同じホストならプロセスの有無で判定（--reload 直後は生存時刻がまだ新しい）
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return False
+            except PermissionError:
+                pass
+        return time.time() - heartbeat <= self.worker_timeout
+
+    def find_orphaned(self, statuses: Sequence[str]) -> List[Any]:
+        self.flush()
+        conn = self._connect()
+        workers = {
+            worker_id: (host, pid, heartbeat)
+            for worker_id, host, pid, heartbeat in conn.execute("SELECT worker_id, host, pid, heartbeat FROM workers")
+        }
+        placeholders = ", ".join("?" for _ in statuses)
+        rows = conn.execute(
+            f"SELECT job_id, owner FROM jobs WHERE status IN ({placeholders})", list(statuses)
+        ).fetchall()
+        orphaned = []
+        for job_id, owner in rows:
+            if owner == self.worker_id or self._worker_alive(workers.get(owner)):
+                continue
+            job = self.get(job_id)
+            if job is not None:
+                orphaned.append(job)
+        return orphaned
+
+    def _flush_loop(self):
+        """一定間隔で未書き込みの変更をまとめて保存し、生存時刻を更新"""
+        last_heartbeat = time.monotonic()
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() - last_heartbeat >= self.HEARTBEAT_INTERVAL:
+                    self._heartbeat()
+                    last_heartbeat = time.monotonic()
+            except Exception as e:
+                print(f"ジョブストアのフラッシュエラー: {e}")
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self.flush()
+        # 正常終了したワーカーの担当ジョブは次の起動時にすぐ中断扱いにできる
+        self._connect().execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+
+def create_job_store(model_class: Type) -> JobStore:
+    """環境変数の設定に基づいてジョブストアを作成"""
+    backend = os.getenv("JOB_STORE", "sqlite")
+    if backend == "memory":
+        return MemoryJobStore(model_class)
+    if backend == "sqlite":
+        return SQLiteJobStore(
+            model_class,
+            Path(os.getenv("JOB_STORE_PATH", "data/jobs.db")),
+            flush_interval=float(os.getenv("JOB_STORE_FLUSH_INTERVAL", "1.0")),
+            worker_timeout=float(os.getenv("JOB_STORE_WORKER_TIMEOUT", "60"))
+        )
+    raise ValueError(f"不明なジョブストアです: {backend}")
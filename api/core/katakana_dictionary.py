@@ -0,0 +1,203 @@
+"""
+カタカナ辞書 - 英語表記をカタカナ表記に置き換える永続辞書
+
+辞書の見出し語からトライ木を作り、テキストを先頭から一度走査して
+最長一致した語を置き換える。辞書にない英単語だけを抽出してLLMに問い合わせ、
+結果を learn() で辞書に追加して次回以降のジョブで再利用する。
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+# srcディレクトリをパスに追加
+sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
+
+from extract_english_words import extract_english_words
+
+# 初期辞書（LLMのプロンプトに例示していた変換表）
+DEFAULT_ENTRIES = {
+    "AI": "エーアイ",
+    "API": "エーピーアイ",
+    "PDF": "ピーディーエフ",
+    "Claude": "クロード",
+    "Claude Code": "クロードコード",
+    "ChatGPT": "チャットジーピーティー",
+    "Anthropic": "アンソロピック",
+    "Constitutional AI": "コンスティテューショナル エーアイ",
+    "OpenAI": "オープンエーアイ",
+    "GPT": "ジーピーティー",
+    "LLM": "エルエルエム",
+    "NLP": "エヌエルピー",
+    "Machine Learning": "マシーンラーニング",
+    "Deep Learning": "ディープラーニング",
+    "PowerPoint": "パワーポイント",
+    "Excel": "エクセル",
+    "JavaScript": "ジャバスクリプト",
+    "Python": "パイソン",
+    "TypeScript": "タイプスクリプト",
+    "React": "リアクト",
+    "Node.js": "ノードジェイエス",
+    "Vue.js": "ビュージェイエス",
+    "GitHub": "ギットハブ",
+    "Docker": "ドッカー",
+    "Kubernetes": "クーベルネティス",
+    "DevOps": "デブオプス",
+    "HTML": "エイチティーエムエル",
+    "CSS": "シーエスエス",
+    "JSON": "ジェイソン",
+    "XML": "エックスエムエル",
+    "HTTP": "エイチティーティーピー",
+    "HTTPS": "エイチティーティーピーエス",
+    "REST": "レスト",
+    "GraphQL": "グラフキューエル",
+    "USB": "ユーエスビー",
+    "CLI": "シーエルアイ",
+    "SQL": "エスキューエル",
+    "NoSQL": "ノーエスキューエル",
+    "MongoDB": "モンゴディービー",
+    "PostgreSQL": "ポストグレエスキューエル",
+    "AWS": "エーダブリューエス",
+    "Azure": "アジュール",
+    "Google": "グーグル",
+    "Microsoft": "マイクロソフト",
+    "Windows": "ウィンドウズ",
+    "Mac": "マック",
+    "Linux": "リナックス",
+    "iOS": "アイオーエス",
+    "Android": "アンドロイド",
+    "Swift": "スウィフト",
+    "Kotlin": "コトリン",
+    "Firebase": "ファイアベース",
+    "Stripe": "ストライプ",
+    "WordPress": "ワードプレス",
+    "Drupal": "ドルーパル",
+    "Bootstrap": "ブートストラップ",
+    "Tailwind": "テイルウィンド",
+    "Figma": "フィグマ",
+    "Sketch": "スケッチ",
+    "Slack": "スラック",
+    "Discord": "ディスコード",
+    "Zoom": "ズーム",
+    "Teams": "チームズ",
+    "md": "エムディー",
+    "yaml": "ヤムル",
+    "yml": "ヤムル",
+    "IDE": "アイディーイー",
+    "SDK": "エスディーケー",
+    "Framework": "フレームワーク",
+}
+
+def _is_word_char(char: str) -> bool:
+    """英単語の一部とみなす文字（前後がこの文字の場合は語の途中なので置き換えない）"""
+    return char.isascii() and char.isalnum()
+
+class KatakanaDictionary:
+    """英語→カタカナの変換辞書（大文字・小文字は区別しない）"""
+
+    def __init__(self, dict_path: Optional[Path] = None):
+        self.dict_path = Path(dict_path) if dict_path else None
+        self._lock = threading.Lock()
+        self._entries: Dict[str, str] = dict(DEFAULT_ENTRIES)
+        if self.dict_path and self.dict_path.exists():
+            try:
+                with open(self.dict_path, "r", encoding="utf-8") as f:
+                    self._entries.update(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"カタカナ辞書の読み込みエラー: {e}")
+        self._trie = self._build_trie(self._entries)
+
+    def _build_trie(self, entries: Dict[str, str]) -> dict:
+        """見出し語（小文字）のトライ木を作成（終端ノードの "" キーに変換結果を持つ）"""
+        trie: dict = {}
+        for term, kana in entries.items():
+            node = trie
+            for char in term.lower():
+                node = node.setdefault(char, {})
+            node[""] = kana
+        return trie
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, term: str) -> bool:
+        return self.lookup(term) is not None
+
+    def lookup(self, term: str) -> Optional[str]:
+        """1語の変換結果を取得（辞書にない場合はNone）"""
+        node = self._trie
+        for char in term.lower():
+            node = node.get(char)
+            if node is None:
+                return None
+        return node.get("")
+
+    def convert(self, text: str) -> str:
+        """辞書にある語を最長一致で一度に置き換える"""
+        trie = self._trie
+        result = []
+        i = 0
+        length = len(text)
+        while i < length:
+            match_end, match_kana = -1, None
+            # 語の途中から一致させない
+            if i == 0 or not _is_word_char(text[i - 1]):
+                node = trie
+                j = i
+                while j < length:
+                    node = node.get(text[j].lower())
+                    if node is None:
+                        break
+                    j += 1
+                    if "" in node and (j == length or not _is_word_char(text[j])):
+                        match_end, match_kana = j, node[""]
+            if match_kana is not None:
+                result.append(match_kana)
+                i = match_end
+            else:
+                result.append(text[i])
+                i += 1
+        return "".join(result)
+
+    def find_unknown(self, texts: Iterable[str]) -> Set[str]:
+        """辞書で置き換えた後にも残る英単語を抽出"""
+        unknown = set()
+        for text in texts:
+            unknown.update(extract_english_words(self.convert(text)))
+        return unknown
+
+    def learn(self, entries: Dict[str, str]) -> int:
+        """変換結果を辞書に追加して保存し、追加した語数を返す"""
+        with self._lock:
+            added = {
+                term: kana for term, kana in entries.items()
+                if term and kana and self._entries.get(term) != kana
+            }
+            if not added:
+                return 0
+            self._entries.update(added)
+            # 変換中のスレッドに影響しないよう新しいトライ木に差し替える
+            self._trie = self._build_trie(self._entries)
+            self._save()
+            return len(added)
+
+    def _save(self):
+        """学習した語を含む辞書を保存（一時ファイル経由で原子的に書き込む）"""
+        if not self.dict_path:
+            return
+        self.dict_path.parent.mkdir(parents=True, exist_ok=True)
+        learned = {term: kana for term, kana in self._entries.items() if DEFAULT_ENTRIES.get(term) != kana}
+        fd, tmp_path = tempfile.mkstemp(dir=self.dict_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(learned, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.dict_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+# グローバルインスタンス
+katakana_dictionary = KatakanaDictionary(Path(os.getenv("KATAKANA_DICT_PATH", "data/katakana_dictionary.json")))
@@ -0,0 +1,102 @@
+"""
+LLM応答キャッシュ - プロンプトと生成条件のハッシュをキーにした応答の永続キャッシュ
+
+失敗したジョブのリトライや、同じ資料・同じ設定での再アップロードで
+同一のプロンプトを送る場合にLLMを呼ばずに前回の応答を返す。
+エントリは作成から ttl_seconds 経過すると無効になり、合計サイズが上限を超えたら
+最終アクセスが古い順に削除する（DiskLRUCache）。削除は保存時に合計サイズが上限を
+超えた場合と一定間隔ごとの走査時だけ行い、その際に期限切れのエントリもまとめて削除する。
+get / put はファイルを読み書きするので、イベントループからはスレッドで呼ぶ。
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .disk_cache import DiskLRUCache, make_cache_key
+
+class LLMResponseCache:
+    """LLMの応答を保存するキャッシュ（有効期限・サイズ上限付き）"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int, ttl_seconds: float, enabled: bool = True):
+        self.store = DiskLRUCache(cache_dir, max_bytes=max_bytes, suffix=".json")
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, provider: str, model: str, temperature: float, system_prompt: str,
+                 user_prompt: str, response_format: Optional[Dict], max_tokens: int) -> str:
+        """応答を決める条件（プロバイダー・モデル・温度・プロンプト・出力形式・最大トークン数）からキーを作成"""
+        return make_cache_key("llm", provider, model, temperature, system_prompt, user_prompt,
+                              response_format, max_tokens)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key: str) -> Optional[str]:
+        """有効期限内の応答を返す（見つからない・期限切れの場合は None）"""
+        path = self.store.path_for(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._count("misses")
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            self._count("expired")
+            self._count("misses")
+            return None
+
+        # 最終アクセス時刻を更新（サイズ超過時の削除順に使われる）
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self._count("hits")
+        return entry["response"]
+
+    def put(self, key: str, response: str, **metadata: Any) -> None:
+        """応答を保存（metadata はプロバイダー・モデル名など確認用の情報）"""
+        entry = {"created_at": time.time(), "response": response, **metadata}
+        self.store.put_bytes(key, json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8"))
+        self.store.maybe_evict(max_age=self.ttl_seconds)
+
+    def record_bypass(self) -> None:
+        """キャッシュを参照しなかった呼び出しを記録"""
+        self._count("bypassed")
+
+    def purge(self) -> int:
+        """キャッシュをすべて削除"""
+        return self.store.purge()
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報（ヒット率は参照した呼び出しのみで計算）"""
+        stats = self.store.stats()
+        lookups = self.hits + self.misses
+        stats.update({
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired": self.expired,
+            "bypassed": self.bypassed,
+            "ttl_seconds": self.ttl_seconds
+        })
+        return stats
+
+# LLM応答のキャッシュ（LLM_CACHE_ENABLED=false で無効）
+llm_cache = LLMResponseCache(
+    Path(os.getenv("LLM_CACHE_DIR", "data/cache/llm")),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600,
+    enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+)
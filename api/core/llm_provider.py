@@ -1,19 +1,28 @@
 """
 LLMプロバイダーの抽象化層
 OpenAI, Claude, Gemini, AWS Bedrockをサポート
+（オフライン検証用の疑似プロバイダー fake も利用可能）
 """
-from typing import Protocol, Dict, List, Optional, Any
+from typing import Protocol, Dict, List, Optional, Any, AsyncIterator, Callable
 from abc import ABC, abstractmethod
 import os
 import json
+import asyncio
+import threading
+import weakref
+import concurrent.futures
 from dataclasses import dataclass
 from enum import Enum
 
+from .scheduler import job_scheduler
+from .llm_cache import llm_cache
+
 class LLMProvider(str, Enum):
     OPENAI = "openai"
     CLAUDE = "claude"
     GEMINI = "gemini"
     BEDROCK = "bedrock"
+    FAKE = "fake"
 
 @dataclass
 class LLMConfig:
@@ -23,6 +32,28 @@ class LLMConfig:
     model_id: Optional[str] = None
     temperature: float = 0.7
     max_tokens: int = 4000
+    timeout: float = 120.0  # リクエストのタイムアウト（秒）
+    max_connections: int = 20  # プロバイダーごとの最大同時接続数
+
+# SDKクライアントはイベントループごとに共有し、接続プールを再利用する
+# （httpxの非同期接続は作成したイベントループでしか使えないため）
+_shared_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, Any]]" = weakref.WeakKeyDictionary()
+_shared_clients_lock = threading.Lock()
+
+def get_shared_client(key: tuple, factory: Callable[[], Any]) -> Any:
+    """現在のイベントループで共有するクライアントを取得（なければ作成）"""
+    loop = asyncio.get_running_loop()
+    with _shared_clients_lock:
+        clients = _shared_clients.setdefault(loop, {})
+        if key not in clients:
+            clients[key] = factory()
+        return clients[key]
+
+# 非同期クライアントがないSDK（boto3）の呼び出しを実行するスレッドプール
+_blocking_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+    thread_name_prefix="llm"
+)
 
 class LLMInterface(ABC):
     """LLMプロバイダーの共通インターフェース"""
@@ -39,32 +70,69 @@ class LLMInterface(ABC):
         """テキスト生成"""
         pass
     
+    async def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """テキスト生成（受信した断片から順に返す）
+        
+        ストリーミングに対応していないプロバイダーは応答全体を1つの断片として返す。
+        途中で打ち切る場合は呼び出し側で aclose() する（受信中のリクエストも閉じられる）。
+        """
+        yield await self.generate(system_prompt, user_prompt, temperature, max_tokens, response_format)
+    
     @abstractmethod
     def is_available(self) -> bool:
         """プロバイダーが利用可能かチェック"""
         pass
 
+def _combine_prompts(system_prompt: str, user_prompt: str, response_format: Optional[Dict]) -> str:
+    """system と user を1つのプロンプトにまとめる（JSON出力の場合は指示を追加）"""
+    combined_prompt = f"{system_prompt}\n\n{user_prompt}"
+    if response_format and response_format.get("type") == "json_object":
+        combined_prompt += "\n\nPlease respond with valid JSON only."
+    return combined_prompt
+
 class OpenAIAdapter(LLMInterface):
-    """OpenAI APIアダプター"""
+    """OpenAI APIアダプター（AsyncOpenAIによる非同期実装）"""
     
     def __init__(self, config: LLMConfig):
         self.config = config
+        self.api_key = config.api_key or os.getenv("OPENAI_API_KEY")
         try:
-            from openai import OpenAI
-            self.client = OpenAI(api_key=config.api_key or os.getenv("OPENAI_API_KEY"))
+            from openai import AsyncOpenAI
+            self.client_class = AsyncOpenAI
             self.model = config.model_id or "gpt-4o"
         except ImportError:
-            self.client = None
+            self.client_class = None
     
-    async def generate(
+    def _get_client(self):
+        import httpx
+        return get_shared_client(
+            ("openai", self.api_key, self.config.timeout, self.config.max_connections),
+            lambda: self.client_class(
+                api_key=self.api_key,
+                timeout=self.config.timeout,
+                http_client=httpx.AsyncClient(
+                    timeout=self.config.timeout,
+                    limits=httpx.Limits(max_connections=self.config.max_connections)
+                )
+            )
+        )
+    
+    def _request_kwargs(
         self,
         system_prompt: str,
         user_prompt: str,
-        temperature: float = 0.7,
-        max_tokens: int = 4000,
-        response_format: Optional[Dict] = None
-    ) -> str:
-        if not self.client:
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[Dict]
+    ) -> Dict[str, Any]:
+        if not self.client_class:
             raise Exception("OpenAI client not initialized")
         
         kwargs = {
@@ -79,26 +147,66 @@ class OpenAIAdapter(LLMInterface):
         
         if response_format:
             kwargs["response_format"] = response_format
-        
-        response = self.client.chat.completions.create(**kwargs)
+        return kwargs
+    
+    async def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None
+    ) -> str:
+        kwargs = self._request_kwargs(system_prompt, user_prompt, temperature, max_tokens, response_format)
+        response = await self._get_client().chat.completions.create(**kwargs)
         return response.choices[0].message.content
     
+    async def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        kwargs = self._request_kwargs(system_prompt, user_prompt, temperature, max_tokens, response_format)
+        stream = await self._get_client().chat.completions.create(**kwargs, stream=True)
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+    
     def is_available(self) -> bool:
-        return self.client is not None and (self.config.api_key or os.getenv("OPENAI_API_KEY"))
+        return self.client_class is not None and self.api_key
 
 class ClaudeAdapter(LLMInterface):
-    """Claude (Anthropic) APIアダプター"""
+    """Claude (Anthropic) APIアダプター（AsyncAnthropicによる非同期実装）"""
     
     def __init__(self, config: LLMConfig):
         self.config = config
+        self.api_key = config.api_key or os.getenv("ANTHROPIC_API_KEY")
         try:
             import anthropic
-            self.client = anthropic.Anthropic(
-                api_key=config.api_key or os.getenv("ANTHROPIC_API_KEY")
-            )
+            self.client_class = anthropic.AsyncAnthropic
             self.model = config.model_id or "claude-3-opus-20240229"
         except ImportError:
-            self.client = None
+            self.client_class = None
+    
+    def _get_client(self):
+        import httpx
+        return get_shared_client(
+            ("claude", self.api_key, self.config.timeout, self.config.max_connections),
+            lambda: self.client_class(
+                api_key=self.api_key,
+                timeout=self.config.timeout,
+                http_client=httpx.AsyncClient(
+                    timeout=self.config.timeout,
+                    limits=httpx.Limits(max_connections=self.config.max_connections)
+                )
+            )
+        )
     
     async def generate(
         self,
@@ -108,17 +216,13 @@ class ClaudeAdapter(LLMInterface):
         max_tokens: int = 4000,
         response_format: Optional[Dict] = None
     ) -> str:
-        if not self.client:
+        if not self.client_class:
             raise Exception("Claude client not initialized")
         
         # Claudeは system と user を組み合わせる
-        combined_prompt = f"{system_prompt}\n\n{user_prompt}"
+        combined_prompt = _combine_prompts(system_prompt, user_prompt, response_format)
         
-        # response_formatがJSONの場合、プロンプトに指示を追加
-        if response_format and response_format.get("type") == "json_object":
-            combined_prompt += "\n\nPlease respond with valid JSON only."
-        
-        message = self.client.messages.create(
+        message = await self._get_client().messages.create(
             model=self.model,
             max_tokens=max_tokens,
             temperature=temperature,
@@ -129,11 +233,34 @@ class ClaudeAdapter(LLMInterface):
         
         return message.content[0].text
     
+    async def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        if not self.client_class:
+            raise Exception("Claude client not initialized")
+        
+        combined_prompt = _combine_prompts(system_prompt, user_prompt, response_format)
+        async with self._get_client().messages.stream(
+            model=self.model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[
+                {"role": "user", "content": combined_prompt}
+            ]
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+    
     def is_available(self) -> bool:
-        return self.client is not None and (self.config.api_key or os.getenv("ANTHROPIC_API_KEY"))
+        return self.client_class is not None and self.api_key
 
 class GeminiAdapter(LLMInterface):
-    """Google Gemini APIアダプター"""
+    """Google Gemini APIアダプター（generate_content_asyncによる非同期実装）"""
     
     def __init__(self, config: LLMConfig):
         self.config = config
@@ -162,29 +289,60 @@ class GeminiAdapter(LLMInterface):
             raise Exception("Gemini model not initialized")
         
         # Geminiは system と user を組み合わせる
-        combined_prompt = f"{system_prompt}\n\n{user_prompt}"
-        
-        # response_formatがJSONの場合、プロンプトに指示を追加
-        if response_format and response_format.get("type") == "json_object":
-            combined_prompt += "\n\nPlease respond with valid JSON only."
+        combined_prompt = _combine_prompts(system_prompt, user_prompt, response_format)
         
         generation_config = {
             "temperature": temperature,
             "max_output_tokens": max_tokens,
         }
         
-        response = self.model.generate_content(
-            combined_prompt,
-            generation_config=generation_config
-        )
+        if hasattr(self.model, "generate_content_async"):
+            request = self.model.generate_content_async(
+                combined_prompt,
+                generation_config=generation_config
+            )
+        else:
+            # 非同期APIがない古いSDKではスレッドプールで実行
+            loop = asyncio.get_running_loop()
+            request = loop.run_in_executor(
+                _blocking_executor,
+                lambda: self.model.generate_content(combined_prompt, generation_config=generation_config)
+            )
+        response = await asyncio.wait_for(request, timeout=self.config.timeout)
         
         return response.text
     
+    async def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        if not hasattr(self.model, "generate_content_async"):
+            # 非同期APIがない古いSDKでは応答全体を返す
+            async for text in super().generate_stream(system_prompt, user_prompt, temperature, max_tokens, response_format):
+                yield text
+            return
+        
+        combined_prompt = _combine_prompts(system_prompt, user_prompt, response_format)
+        response = await asyncio.wait_for(
+            self.model.generate_content_async(
+                combined_prompt,
+                generation_config={"temperature": temperature, "max_output_tokens": max_tokens},
+                stream=True
+            ),
+            timeout=self.config.timeout
+        )
+        async for chunk in response:
+            yield chunk.text
+    
     def is_available(self) -> bool:
         return self.model is not None
 
 class BedrockAdapter(LLMInterface):
-    """AWS Bedrock APIアダプター"""
+    """AWS Bedrock APIアダプター（スレッドプール経由の非同期実装）"""
     
     def __init__(self, config: LLMConfig):
         self.config = config
@@ -199,16 +357,46 @@ class BedrockAdapter(LLMInterface):
                 access_key_id = config.api_key or os.getenv("AWS_ACCESS_KEY_ID")
                 secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
             
+            from botocore.config import Config
+            
+            # boto3には非同期クライアントがないため、接続プールとタイムアウトを設定して
+            # スレッドプールから呼び出す（boto3のクライアントはスレッドセーフ）
             self.client = boto3.client(
                 'bedrock-runtime',
                 region_name=config.region or os.getenv("AWS_DEFAULT_REGION", "ap-northeast-1"),
                 aws_access_key_id=access_key_id,
-                aws_secret_access_key=secret_access_key
+                aws_secret_access_key=secret_access_key,
+                config=Config(
+                    connect_timeout=10,
+                    read_timeout=config.timeout,
+                    max_pool_connections=config.max_connections
+                )
             )
             self.model_id = config.model_id or "anthropic.claude-3-opus-20240229-v1:0"
         except ImportError:
             self.client = None
     
+    def _request_body(self, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int,
+                      response_format: Optional[Dict]) -> Dict[str, Any]:
+        """Bedrockのモデルに応じてリクエストを構築"""
+        combined_prompt = _combine_prompts(system_prompt, user_prompt, response_format)
+        if "claude" in self.model_id:
+            # Claude on Bedrock
+            return {
+                "anthropic_version": "bedrock-2023-05-31",
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "messages": [
+                    {"role": "user", "content": combined_prompt}
+                ]
+            }
+        # その他のモデル（Llama, Mistral等）
+        return {
+            "prompt": combined_prompt,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+    
     async def generate(
         self,
         system_prompt: str,
@@ -220,39 +408,17 @@ class BedrockAdapter(LLMInterface):
         if not self.client:
             raise Exception("Bedrock client not initialized")
         
-        # Bedrockのモデルに応じてリクエストを構築
-        if "claude" in self.model_id:
-            # Claude on Bedrock
-            combined_prompt = f"{system_prompt}\n\n{user_prompt}"
-            if response_format and response_format.get("type") == "json_object":
-                combined_prompt += "\n\nPlease respond with valid JSON only."
-            
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "messages": [
-                    {"role": "user", "content": combined_prompt}
-                ]
-            }
-        else:
-            # その他のモデル（Llama, Mistral等）
-            combined_prompt = f"{system_prompt}\n\n{user_prompt}"
-            if response_format and response_format.get("type") == "json_object":
-                combined_prompt += "\n\nPlease respond with valid JSON only."
-            
-            request_body = {
-                "prompt": combined_prompt,
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            }
+        request_body = self._request_body(system_prompt, user_prompt, temperature, max_tokens, response_format)
         
-        response = self.client.invoke_model(
-            modelId=self.model_id,
-            body=json.dumps(request_body)
-        )
+        def invoke():
+            response = self.client.invoke_model(
+                modelId=self.model_id,
+                body=json.dumps(request_body)
+            )
+            return json.loads(response['body'].read())
         
-        response_body = json.loads(response['body'].read())
+        loop = asyncio.get_running_loop()
+        response_body = await loop.run_in_executor(_blocking_executor, invoke)
         
         # モデルに応じてレスポンスを解析
         if "claude" in self.model_id:
@@ -260,25 +426,271 @@ class BedrockAdapter(LLMInterface):
         else:
             return response_body.get('completion', response_body.get('generation', ''))
     
+    def _chunk_text(self, chunk: Dict[str, Any]) -> str:
+        """ストリーミング応答の1イベントからテキストを取り出す（テキストを含まないイベントは空文字）"""
+        if "claude" in self.model_id:
+            if chunk.get("type") == "content_block_delta":
+                return chunk.get("delta", {}).get("text", "")
+            return ""
+        return chunk.get('completion', chunk.get('generation', '')) or ""
+    
+    async def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """invoke_model_with_response_stream をスレッドプールで受信し、キュー経由で断片を返す"""
+        if not self.client:
+            raise Exception("Bedrock client not initialized")
+        
+        request_body = self._request_body(system_prompt, user_prompt, temperature, max_tokens, response_format)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        stopped = threading.Event()
+        opened: Dict[str, Any] = {}
+        
+        def put(item: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # イベントループが既に終了している
+                pass
+        
+        def receive():
+            # 受信スレッド: 断片・終了・エラーをイベントループのキューに渡す
+            try:
+                response = self.client.invoke_model_with_response_stream(
+                    modelId=self.model_id,
+                    body=json.dumps(request_body)
+                )
+                opened["stream"] = response['body']
+                for event in response['body']:
+                    if stopped.is_set():
+                        break
+                    if "chunk" not in event:
+                        continue
+                    text = self._chunk_text(json.loads(event["chunk"]["bytes"]))
+                    if text:
+                        put(text)
+                put(finished)
+            except Exception as e:
+                put(e)
+            finally:
+                if "stream" in opened:
+                    opened["stream"].close()
+        
+        loop.run_in_executor(_blocking_executor, receive)
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # 途中で打ち切った場合は受信中の接続を閉じて受信スレッドを終わらせる
+            stopped.set()
+            if "stream" in opened:
+                try:
+                    opened["stream"].close()
+                except Exception:
+                    pass
+    
     def is_available(self) -> bool:
         return self.client is not None
 
+class FakeAdapter(LLMInterface):
+    """オフライン検証用の疑似プロバイダー
+    
+    FAKE_LLM_LATENCY 秒待ってから決まった応答を返す。外部APIを呼ばずに
+    複数ジョブ同時実行時のレイテンシやイベントループの応答性を確認するために使う。
+    """
+    
+    def __init__(self, config: LLMConfig):
+        self.config = config
+        self.model = config.model_id or "fake"
+        self.latency = float(os.getenv("FAKE_LLM_LATENCY", "1.0"))
+        self.utterances = int(os.getenv("FAKE_LLM_UTTERANCES", "10"))
+    
+    async def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None
+    ) -> str:
+        await asyncio.sleep(self.latency)
+        return self._response(user_prompt, response_format)
+    
+    async def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        # 応答を小さな断片に分け、遅延を断片ごとに分散して返す
+        text = self._response(user_prompt, response_format)
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)] or [""]
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield chunk
+    
+    def _response(self, user_prompt: str, response_format: Optional[Dict]) -> str:
+        if response_format and response_format.get("type") == "json_object":
+            dialogue = [
+                {
+                    "speaker": "speaker1" if i % 2 == 0 else "speaker2",
+                    "text": f"これはテスト用の発話{i + 1}です。"
+                }
+                for i in range(self.utterances)
+            ]
+            return json.dumps({"dialogue": dialogue}, ensure_ascii=False)
+        
+        # 対話スクリプトの調整依頼には受け取ったスクリプトをそのまま返す
+        marker = "対話スクリプト:\n"
+        if marker in user_prompt:
+            return user_prompt.split(marker, 1)[1]
+        return user_prompt
+    
+    def is_available(self) -> bool:
+        return True
+
+class ScheduledLLM(LLMInterface):
+    """ジョブスケジューラーの llm キューで同時実行数を制限してアダプターを呼び出すラッパー
+    
+    同じ条件の応答が応答キャッシュにあればLLMを呼ばずに返す。
+    """
+    
+    def __init__(self, adapter: LLMInterface):
+        self.adapter = adapter
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.adapter, name)
+    
+    @property
+    def model_name(self) -> str:
+        """キャッシュのキーに使うモデル名（アダプターごとに属性名が異なる）"""
+        for value in (getattr(self.adapter, "model_id", None), getattr(self.adapter, "model", None),
+                      self.adapter.config.model_id):
+            if isinstance(value, str):
+                return value
+        return "default"
+    
+    async def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None,
+        use_cache: bool = True
+    ) -> str:
+        """テキスト生成（use_cache=False の場合はキャッシュを参照せずに生成し、結果でキャッシュを更新）"""
+        cache_key = None
+        if llm_cache.enabled:
+            cache_key = llm_cache.make_key(
+                self.adapter.config.provider.value, self.model_name, temperature,
+                system_prompt, user_prompt, response_format, max_tokens
+            )
+            if use_cache:
+                cached = await asyncio.to_thread(llm_cache.get, cache_key)
+                if cached is not None:
+                    return cached
+            else:
+                llm_cache.record_bypass()
+        
+        async with job_scheduler.aslot("llm"):
+            response = await self.adapter.generate(
+                system_prompt, user_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format=response_format
+            )
+        
+        if cache_key and response:
+            await asyncio.to_thread(
+                llm_cache.put, cache_key, response,
+                provider=self.adapter.config.provider.value, model=self.model_name
+            )
+        return response
+    
+    async def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        response_format: Optional[Dict] = None,
+        use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """ストリーミング生成（キャッシュにあれば全体を1つの断片で返す、最後まで受信した応答のみ保存）"""
+        cache_key = None
+        if llm_cache.enabled:
+            cache_key = llm_cache.make_key(
+                self.adapter.config.provider.value, self.model_name, temperature,
+                system_prompt, user_prompt, response_format, max_tokens
+            )
+            if use_cache:
+                cached = await asyncio.to_thread(llm_cache.get, cache_key)
+                if cached is not None:
+                    yield cached
+                    return
+            else:
+                llm_cache.record_bypass()
+        
+        chunks = []
+        async with job_scheduler.aslot("llm"):
+            stream = self.adapter.generate_stream(
+                system_prompt, user_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format=response_format
+            )
+            try:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            finally:
+                # 呼び出し側が途中で打ち切った場合もプロバイダーへのリクエストを閉じる
+                await stream.aclose()
+        
+        response = "".join(chunks)
+        if cache_key and response:
+            await asyncio.to_thread(
+                llm_cache.put, cache_key, response,
+                provider=self.adapter.config.provider.value, model=self.model_name
+            )
+    
+    def is_available(self) -> bool:
+        return self.adapter.is_available()
+
 class LLMFactory:
     """LLMプロバイダーのファクトリー"""
     
     @staticmethod
     def create(config: LLMConfig) -> LLMInterface:
-        """設定に基づいてLLMインスタンスを作成"""
+        """設定に基づいてLLMインスタンスを作成（呼び出しはジョブスケジューラーを通る）"""
         if config.provider == LLMProvider.OPENAI:
-            return OpenAIAdapter(config)
+            adapter = OpenAIAdapter(config)
         elif config.provider == LLMProvider.CLAUDE:
-            return ClaudeAdapter(config)
+            adapter = ClaudeAdapter(config)
         elif config.provider == LLMProvider.GEMINI:
-            return GeminiAdapter(config)
+            adapter = GeminiAdapter(config)
         elif config.provider == LLMProvider.BEDROCK:
-            return BedrockAdapter(config)
+            adapter = BedrockAdapter(config)
+        elif config.provider == LLMProvider.FAKE:
+            adapter = FakeAdapter(config)
         else:
             raise ValueError(f"Unknown provider: {config.provider}")
+        return ScheduledLLM(adapter)
     
     @staticmethod
     def get_available_providers() -> List[Dict[str, Any]]:
@@ -2,14 +2,29 @@ import sys
 from pathlib import Path
 import os
 import json
+import asyncio
+import shutil
 
 # srcディレクトリをパスに追加
 sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
 
 from pdf_converter import PDFConverter
+from resolution_profiles import THUMBNAIL_WIDTH, get_resolution_profile
 from .text_extractor import TextExtractor
 from .dialogue_generator import DialogueGenerator
 from .dialogue_refiner import DialogueRefiner
+from .disk_cache import DiskLRUCache, file_sha256, make_cache_key
+
+# ページ画像のキャッシュ（同じPDFを再アップロードした場合に描画し直さない）
+RASTER_CACHE_DIR = Path(os.getenv("RASTER_CACHE_DIR", "data/cache/raster"))
+raster_cache = DiskLRUCache(
+    RASTER_CACHE_DIR,
+    max_bytes=int(os.getenv("RASTER_CACHE_MAX_MB", "4096")) * 1024 * 1024,
+    suffix=".png"
+)
+# サムネイルとスライドのテキストのキャッシュ（すべてキャッシュにあればPDFを開かない）
+thumbnail_cache = DiskLRUCache(RASTER_CACHE_DIR / "thumbnails", max_bytes=raster_cache.max_bytes // 8, suffix=".jpg")
+slide_text_cache = DiskLRUCache(RASTER_CACHE_DIR / "texts", max_bytes=raster_cache.max_bytes // 64, suffix=".json")
 
 class PDFProcessor:
     def __init__(self, job_id: str, base_dir: Path):
@@ -19,18 +34,151 @@ class PDFProcessor:
         self.slides_dir.mkdir(parents=True, exist_ok=True)
         self.data_dir = base_dir / "data" / job_id
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.thumbnails_dir = self.slides_dir / "thumbnails"
+        
+    def convert_pdf_to_slides(self, pdf_path: str, progress_callback=None, pdf_sha256: str = None, resolution_profile=None,
+                              executor=None) -> int:
+        """PDFをスライド画像に変換（キャッシュにないページだけを描画）
         
-    def convert_pdf_to_slides(self, pdf_path: str) -> int:
-        """PDFをスライド画像に変換"""
+        解像度プロファイル（省略時は環境変数 VIDEO_RESOLUTION）のピクセルサイズで描画する。
+        描画と同じパスでスライドのテキストとサムネイルも作成する（バックエンドは PDF_RASTER_BACKEND）。
+        executor（プロセスプール）を指定するとページ範囲ごとに並列で描画する。
+        """
         converter = PDFConverter(str(self.slides_dir))
-        slide_paths = converter.convert_pdf_to_images(pdf_path)
-        return len(slide_paths)
+        profile = resolution_profile or get_resolution_profile()
+        if pdf_sha256 is None:
+            pdf_sha256 = file_sha256(pdf_path)
+        # テキストはバックエンド・解像度によらない（ページ数もテキストの数から分かる）
+        texts_key = make_cache_key(pdf_sha256, "texts")
+        slide_texts = self._cached_slide_texts(texts_key)
+        total_pages = len(slide_texts) if slide_texts is not None else converter.page_count(pdf_path)
+        
+        def on_page_rendered(completed: int, total: int):
+            if progress_callback:
+                try:
+                    progress_callback(f"スライド画像を生成中... ({completed}/{total})", (completed / total) * 100)
+                except Exception as e:
+                    print(f"進捗コールバックエラー: {e}")
+        
+        # キャッシュ済みのページはコピーするだけで済ませる（スライドを書き換えてもキャッシュは変わらない）
+        # 描画結果はバックエンドによって異なる
+        page_keys = {
+            page_num: make_cache_key(pdf_sha256, page_num, profile.dpi if profile.is_original else profile.name,
+                                     converter.backend, "png")
+            for page_num in range(1, total_pages + 1)
+        }
+        thumbnail_keys = {
+            page_num: make_cache_key(pdf_sha256, page_num, THUMBNAIL_WIDTH, "jpg")
+            for page_num in range(1, total_pages + 1)
+        }
+        missing_pages = [
+            page_num for page_num, key in page_keys.items()
+            if not raster_cache.get_file(key, self.slides_dir / f"slide_{page_num:03d}.png")
+        ]
+        self.thumbnails_dir.mkdir(exist_ok=True)
+        thumbnails_cached = all(
+            thumbnail_cache.get_file(key, self.thumbnails_dir / f"slide_{page_num:03d}.jpg")
+            for page_num, key in thumbnail_keys.items()
+        )
+        cached_count = total_pages - len(missing_pages)
+        print(f"スライド画像: {total_pages}ページ中{cached_count}ページをキャッシュから再利用"
+              f"（バックエンド: {converter.backend}）")
+        
+        if missing_pages or not thumbnails_cached or slide_texts is None:
+            # スライド一覧用のサムネイルは小さいサイズでPDFから直接描画する
+            result = converter.render_document(
+                pdf_path,
+                profile,
+                pages=missing_pages,
+                progress_callback=lambda completed, total: on_page_rendered(cached_count + completed, total_pages),
+                extract_text=slide_texts is None,
+                thumbnail_width=None if thumbnails_cached else THUMBNAIL_WIDTH,
+                thumbnail_dir=self.thumbnails_dir,
+                executor=executor
+            )
+            if slide_texts is None:
+                slide_texts = [TextExtractor().clean_text(text) for text in result["texts"]]
+                slide_text_cache.put_bytes(texts_key, json.dumps(slide_texts, ensure_ascii=False).encode("utf-8"))
+                slide_text_cache.evict()
+            if not thumbnails_cached:
+                for page_num, key in thumbnail_keys.items():
+                    thumbnail_cache.put_file(key, self.thumbnails_dir / f"slide_{page_num:03d}.jpg")
+                thumbnail_cache.evict()
+        self._save_slide_texts(slide_texts)
+        
+        if missing_pages:
+            for page_num in missing_pages:
+                raster_cache.put_file(page_keys[page_num], self.slides_dir / f"slide_{page_num:03d}.png")
+            raster_cache.evict()
+        else:
+            on_page_rendered(total_pages, total_pages)
+        return total_pages
     
-    async def generate_dialogue_from_pdf(self, pdf_path: str, additional_prompt: str = None, progress_callback=None, target_duration: int = 10, speaker_info: dict = None, additional_knowledge: str = None) -> str:
-        """PDFから対話データを生成"""
-        # 1. PDFからテキストを抽出
+    def _cached_slide_texts(self, key: str):
+        """キャッシュしたスライドのテキスト（ない場合は None）"""
+        path = slide_text_cache.lookup(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def reuse_slides(self, source_job_id: str) -> int:
+        """同じPDFを処理済みのジョブからスライド画像と抽出テキストを引き継ぐ（0の場合は再利用不可）"""
+        source_slides_dir = self.base_dir / "slides" / source_job_id
+        source_slides = sorted(source_slides_dir.glob("slide_*.png"))
+        if not source_slides:
+            return 0
+        
+        # 一方のジョブでスライドを書き換えても他方に影響しないようコピーする
+        for source_path in source_slides:
+            shutil.copyfile(source_path, self.slides_dir / source_path.name)
+        
+        source_thumbnails = sorted((source_slides_dir / "thumbnails").glob("slide_*.jpg"))
+        if source_thumbnails:
+            self.thumbnails_dir.mkdir(exist_ok=True)
+            for source_path in source_thumbnails:
+                shutil.copyfile(source_path, self.thumbnails_dir / source_path.name)
+        
+        source_texts = self.base_dir / "data" / source_job_id / "slide_texts.json"
+        if source_texts.exists():
+            shutil.copyfile(source_texts, self.data_dir / "slide_texts.json")
+        return len(source_slides)
+    
+    def reuse_dialogue(self, source_job_id: str) -> str:
+        """同じ条件で生成済みのジョブから対話データをコピー（見つからない場合は空文字）"""
+        source_data_dir = self.base_dir / "data" / source_job_id
+        # 対話データは編集される可能性があるのでリンクせずにコピーする
+        for name in ("dialogue_narration_original.json", "dialogue_narration_katakana.json"):
+            if not (source_data_dir / name).exists():
+                return ""
+        for name in ("dialogue_narration_original.json", "dialogue_narration_katakana.json"):
+            shutil.copyfile(source_data_dir / name, self.data_dir / name)
+        return str(self.data_dir / "dialogue_narration_original.json")
+    
+    def extract_slide_texts(self, pdf_path: str) -> list:
+        """PDFからスライドごとのテキストを抽出（抽出済みの場合は保存したものを使う）"""
+        texts_path = self.data_dir / "slide_texts.json"
+        if texts_path.exists():
+            with open(texts_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        
         text_extractor = TextExtractor()
         slide_texts = text_extractor.extract_text_from_pdf(pdf_path)
+        self._save_slide_texts(slide_texts)
+        return slide_texts
+    
+    def _save_slide_texts(self, slide_texts: list):
+        if slide_texts:
+            with open(self.data_dir / "slide_texts.json", 'w', encoding='utf-8') as f:
+                json.dump(slide_texts, f, ensure_ascii=False, indent=2)
+    
+    async def generate_dialogue_from_pdf(self, pdf_path: str, additional_prompt: str = None, progress_callback=None, target_duration: int = 10, speaker_info: dict = None, additional_knowledge: str = None) -> str:
+        """PDFから対話データを生成"""
+        # 1. PDFからテキストを抽出（ジョブ共有のイベントループを止めないようスレッドで実行）
+        slide_texts = await asyncio.to_thread(self.extract_slide_texts, pdf_path)
         
         # 2. 対話を生成（目安時間とスピーカー情報を渡す）
         dialogue_generator = DialogueGenerator()
@@ -54,13 +202,17 @@ class PDFProcessor:
         )
         
         # 4. データを保存
+        return await asyncio.to_thread(self.save_dialogue, refined_dialogue_data)
+    
+    def save_dialogue(self, dialogue_data: dict) -> str:
+        """調整済みの対話データを保存し、保存先のパスを返す"""
         original_dialogue_path = self.data_dir / "dialogue_narration_original.json"
         with open(original_dialogue_path, 'w', encoding='utf-8') as f:
-            json.dump(refined_dialogue_data, f, ensure_ascii=False, indent=2)
+            json.dump(dialogue_data, f, ensure_ascii=False, indent=2)
         
         # 互換性のためkatakanaファイルも同じ内容で保存
         katakana_path = self.data_dir / "dialogue_narration_katakana.json"
         with open(katakana_path, 'w', encoding='utf-8') as f:
-            json.dump(refined_dialogue_data, f, ensure_ascii=False, indent=2)
+            json.dump(dialogue_data, f, ensure_ascii=False, indent=2)
         
         return str(original_dialogue_path)
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""
+パイプライン実行 - スライドごとに対話生成・音声合成・映像セグメント作成を流す
+
+従来（staged）は対話生成 → 全体調整 → 音声合成 → 動画作成を全スライド分ずつ順に行うため、
+各工程の所要時間の合計がジョブの所要時間になる。パイプライン実行（pipelined）では
+担当スライドと前後の重なりの対話がそろったチャンクから調整（DialogueRefiner.refine_window）を始め、
+調整が終わったスライドから音声を合成し、音声がそろったスライドから映像セグメントをエンコードする。
+各工程が別のスライドを同時に処理するので、所要時間は最も遅い工程の時間に近づく。
+
+動画は segments エンジンで作成する（最後は作成済みのセグメントを結合するだけになる）。
+用語集はチャンクごとに作るので、スクリプト全体で作る staged より表記揺れが残る場合がある。
+"""
+import asyncio
+import contextlib
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from .pdf_processor import PDFProcessor
+from .dialogue_generator import DialogueGenerator
+from .dialogue_refiner import DialogueRefiner
+from .audio_generator import AudioGenerator, synthesis_cache
+from .scheduler import job_scheduler
+from .async_worker import async_worker
+from .job_processor import JobProcessor
+from .progress_bus import progress_bus
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 音声合成のパラメータ（generate_complete_video と同じ）
+AUDIO_PARAMS = {
+    "speed_scale": 1.0,
+    "pitch_scale": 0.0,
+    "intonation_scale": 1.2,
+    "volume_scale": 1.0
+}
+
+def pipeline_enabled() -> bool:
+    """JOB_EXECUTION_MODE=pipelined の場合は新規ジョブをパイプライン実行する（デフォルト: staged）"""
+    return os.getenv("JOB_EXECUTION_MODE", "staged").lower() == "pipelined"
+
+class JobPipeline:
+    """1ジョブ分の対話生成から動画作成までをスライド単位で流す"""
+
+    def __init__(self, job_id: str, base_dir: Path, progress_callback: Optional[Callable[[str, float], None]] = None):
+        self.job_id = job_id
+        self.base_dir = base_dir
+        self.progress_callback = progress_callback
+        # 調整のチャンクを小さくするほど最初のスライドが早く音声合成に進む
+        self.refine_chunk_slides = max(1, int(os.getenv("PIPELINE_REFINE_CHUNK_SLIDES", "2")))
+        self.total_slides = 0
+        self.completed = {"dialogue": 0, "audio": 0, "video": 0}
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Event] = None
+
+    def _report(self, stage: str, slide_number: int) -> None:
+        self.completed[stage] += 1
+        # dialogue は extract_text_from_slides が配信する
+        if stage != "dialogue":
+            progress_bus.publish("slide", {"slide": slide_number, "stage": stage}, job_id=self.job_id)
+        if not self.progress_callback:
+            return
+        done = sum(self.completed.values())
+        message = (f"パイプライン実行中...（対話 {self.completed['dialogue']}/{self.total_slides}、"
+                   f"音声 {self.completed['audio']}/{self.total_slides}、"
+                   f"映像 {self.completed['video']}/{self.total_slides}）")
+        try:
+            # 最後のセグメント結合の分を残して95%まで
+            self.progress_callback(message, done / (3 * self.total_slides) * 95)
+        except Exception as e:
+            print(f"進捗コールバックエラー: {e}")
+
+    def _spawn(self, coro) -> None:
+        """工程の処理を開始（完了・失敗したら run の待ち合わせを起こす）"""
+        task = asyncio.ensure_future(coro)
+        task.add_done_callback(lambda _: self._changed.set())
+        self._tasks.append(task)
+
+    async def _wait_all(self) -> None:
+        """途中で追加される処理も含めてすべての完了を待つ（どれかが失敗したらその例外を送出）"""
+        while True:
+            for task in self._tasks:
+                if task.done() and not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+            if all(task.done() for task in self._tasks):
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def run(
+        self,
+        pdf_path: str,
+        additional_prompt: Optional[str] = None,
+        target_duration: int = 10,
+        speaker_info: Optional[Dict] = None,
+        additional_knowledge: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """対話データを保存して動画を作成し、それぞれのパスを返す"""
+        processor = PDFProcessor(self.job_id, self.base_dir)
+        audio_generator = AudioGenerator(self.job_id, self.base_dir)
+        # 対話を生成してから失敗しないよう、先にVOICEVOXを確認する
+        if not await asyncio.to_thread(audio_generator.check_voicevox_status):
+            raise Exception("VOICEVOXが起動していません")
+
+        # slide_texts.json がない場合はPDF全体を解析するので、イベントループを止めないようスレッドで実行
+        slide_texts = await asyncio.to_thread(processor.extract_slide_texts, pdf_path)
+        self.total_slides = len(slide_texts)
+        if not self.total_slides:
+            raise Exception("スライドのテキストが見つかりません")
+        slide_keys = [f"slide_{i + 1}" for i in range(self.total_slides)]
+
+        dialogue_generator = DialogueGenerator()
+        dialogue_refiner = DialogueRefiner()
+        dialogue_refiner.chunk_slides = self.refine_chunk_slides
+        windows = dialogue_refiner.split_into_windows(slide_keys)
+        print(f"パイプライン実行: {self.total_slides}スライドを{len(windows)}チャンクで調整します")
+
+        generated: Dict[str, List[Dict]] = {}
+        refined: Dict[str, List[Dict]] = {}
+        started_windows = set()
+        self._changed = asyncio.Event()
+        # 合成スレッドとノイズ除去のワーカーは全スライドで共有する
+        stack = contextlib.ExitStack()
+        executors = stack.enter_context(audio_generator.synthesis_executors())
+
+        async def finalize_slide(slide_key: str) -> None:
+            slide_number = int(slide_key.split("_")[1])
+            # VOICEVOXへのリクエストは発話ごとに tts キューに並ぶ
+            await asyncio.to_thread(
+                audio_generator.generate_audio_files,
+                dialogue_data={slide_key: refined[slide_key]},
+                executors=executors,
+                **AUDIO_PARAMS
+            )
+            self._report("audio", slide_number)
+            async with job_scheduler.aslot("encode", self.job_id):
+                # エンコードは事前に起動したCPUワーカープロセスで行う
+                await async_worker.run(
+                    f"segment_{self.job_id}_{slide_number}", JobProcessor.prerender_segment_sync,
+                    self.job_id, str(self.base_dir), slide_number, slide_number == self.total_slides
+                )
+            self._report("video", slide_number)
+
+        async def refine_window(window_keys: List[str], owned_keys: List[str]) -> None:
+            window_data = {key: generated[key] for key in window_keys}
+            result = await dialogue_refiner.refine_window(window_data, owned_keys, speaker_info)
+            for key in owned_keys:
+                refined[key] = result[key]
+                self._spawn(finalize_slide(key))
+
+        def on_slide_generated(slide_num: int, slide_dialogue: List[Dict]) -> None:
+            generated[f"slide_{slide_num}"] = slide_dialogue
+            self._report("dialogue", slide_num)
+            # 重なりのスライドも含めて対話がそろったチャンクから調整を始める
+            for index, (window_keys, owned_keys) in enumerate(windows):
+                if index not in started_windows and all(key in generated for key in window_keys):
+                    started_windows.add(index)
+                    self._spawn(refine_window(window_keys, owned_keys))
+
+        try:
+            self._spawn(dialogue_generator.extract_text_from_slides(
+                slide_texts,
+                additional_prompt,
+                None,
+                target_duration,
+                speaker_info,
+                additional_knowledge,
+                on_slide_generated=on_slide_generated
+            ))
+            await self._wait_all()
+        except BaseException:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            raise
+        finally:
+            # 合成中のスレッドの終了待ちでイベントループを止めない
+            await asyncio.to_thread(stack.close)
+
+        dialogue_path = await asyncio.to_thread(processor.save_dialogue, {key: refined[key] for key in slide_keys})
+        await asyncio.to_thread(synthesis_cache.evict)
+
+        if self.progress_callback:
+            self.progress_callback("セグメントを結合中...", 95)
+        async with job_scheduler.aslot("encode", self.job_id):
+            video_path = await async_worker.run(
+                f"video_{self.job_id}", JobProcessor.render_video_sync,
+                self.job_id, str(self.base_dir), engine="segments"
+            )
+
+        return {"dialogue_path": dialogue_path, "video_path": video_path}
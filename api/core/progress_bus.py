@@ -0,0 +1,139 @@
+"""
+進捗イベントバス - ジョブの進捗をプロセス内で購読中のクライアントに配信する
+
+ジョブの状態（ステータス・進捗率）の変更と、スライド・発話ごとのイベントを
+ジョブIDごとの購読者に送る。publish はどのスレッドからでも呼べる（ジョブの更新は
+スケジューラーのイベントループやワーカースレッドから行われる）。
+
+状態の変更は購読者ごとに1件にまとめ、送信する時点の最新の状態だけを送るので、
+進捗率を細かく更新しても送信回数は増えない。スライド・発話のイベントは順番に送り、
+購読者の受信が追いつかない場合は古いものから捨てる。
+"""
+import asyncio
+import itertools
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+from .scheduler import current_job_id
+
+# 購読者ごとに保持するイベント数（状態の変更は含まない）
+DEFAULT_QUEUE_SIZE = 256
+
+class Subscription:
+    """1クライアント分の購読（イベントは購読したイベントループで受け取る）"""
+
+    def __init__(self, job_id: str, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.job_id = job_id
+        self.loop = loop
+        self.max_queue = max(2, max_queue)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Callable[[], Dict[str, Any]]] = None
+        self._state_pending = False
+
+    def _push(self, event: Dict[str, Any]) -> None:
+        # イベントループのスレッドで呼ばれる
+        while self.queue.qsize() >= self.max_queue:
+            oldest = self.queue.get_nowait()
+            if oldest["event"] == "status":
+                # 状態の通知（購読者ごとに最大1件）は捨てずに後ろに回す
+                self.queue.put_nowait(oldest)
+            else:
+                self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def push_event(self, event: Dict[str, Any]) -> None:
+        self.loop.call_soon_threadsafe(self._push, event)
+
+    def push_state(self, snapshot: Callable[[], Dict[str, Any]]) -> None:
+        """状態の変更を通知（送信待ちの変更があれば最新の状態に置き換えるだけ）"""
+        with self._lock:
+            self._snapshot = snapshot
+            if self._state_pending:
+                return
+            self._state_pending = True
+        self.loop.call_soon_threadsafe(self._push, {"event": "status"})
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """次のイベントを受け取る（timeout 秒以内になければ None）"""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event["event"] == "status":
+            # 送信する時点の最新の状態を取り出す
+            with self._lock:
+                snapshot = self._snapshot
+                self._state_pending = False
+            return {"event": "status", "data": snapshot()}
+        return event
+
+class ProgressBus:
+    """ジョブIDごとの購読者にイベントを配信するプロセス内のバス"""
+
+    def __init__(self, max_queue: int = DEFAULT_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, job_id: str) -> Subscription:
+        """ジョブのイベントを購読（イベントループ内で呼ぶ）"""
+        subscription = Subscription(job_id, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.job_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.job_id]
+
+    def _targets(self, job_id: Optional[str]) -> Set[Subscription]:
+        if job_id is None:
+            return set()
+        with self._lock:
+            return set(self._subscribers.get(job_id, ()))
+
+    def publish(self, event: str, data: Dict[str, Any], job_id: Optional[str] = None) -> None:
+        """イベントを配信（job_id を省略した場合は実行中のジョブ）"""
+        job_id = job_id or current_job_id.get()
+        targets = self._targets(job_id)
+        if not targets:
+            return
+        message = {"event": event, "id": next(self._sequence), "data": data}
+        self.published += 1
+        for subscription in targets:
+            try:
+                subscription.push_event(message)
+            except RuntimeError:
+                # 購読したイベントループが既に終了している
+                self.unsubscribe(subscription)
+
+    def publish_state(self, job_id: str, snapshot: Callable[[], Dict[str, Any]]) -> None:
+        """ジョブの状態の変更を配信（snapshot は送信時に呼ばれ、その時点の状態を返す）"""
+        for subscription in self._targets(job_id):
+            try:
+                subscription.push_state(snapshot)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = {job_id: len(subs) for job_id, subs in self._subscribers.items()}
+            dropped = sum(sub.dropped for subs in self._subscribers.values() for sub in subs)
+        return {
+            "subscribers": sum(subscribers.values()),
+            "subscribers_by_job": subscribers,
+            "published": self.published,
+            "dropped": dropped
+        }
+
+# グローバル進捗バスインスタンス
+progress_bus = ProgressBus()
@@ -0,0 +1,267 @@
+"""
+ジョブスケジューラー - リソースごとの同時実行数の制限とジョブ間の公平なキューイング
+
+LLM・TTSエンジン（VOICEVOX）・動画エンコード・スライド画像化のリソースごとに
+同時実行数の上限を持つキューを用意する。空きを待っている処理はジョブごとの列に並び、
+列の先頭を持つジョブを順番に回して割り当てる（1つのジョブが大量のリクエストを
+投げても、他のジョブの処理が後回しにならない）。
+
+ジョブの処理（コルーチン）は start_job でスケジューラー専用のイベントループに投入する。
+実行中のジョブIDは current_job_id に入っているので、LLMの呼び出しなどジョブIDを
+引数で受け取らない処理も、そのジョブの列に並ぶ。
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional
+import logging
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 実行中のジョブID（スケジューラーで実行したジョブの処理内で設定される）
+current_job_id: ContextVar[Optional[str]] = ContextVar("current_job_id", default=None)
+
+# ジョブに属さない処理（APIキーのテストなど）が並ぶ列
+DEFAULT_JOB_ID = "default"
+
+# リソース名 → (同時実行数の環境変数, デフォルト値)
+RESOURCE_LIMITS = {
+    "llm": ("LLM_CONCURRENCY", 4),
+    "tts": ("TTS_CONCURRENCY", 3),
+    "encode": ("ENCODE_CONCURRENCY", 1),
+    "rasterize": ("RASTER_CONCURRENCY", 2),
+}
+
+# 待ち時間の統計に使う直近の件数
+WAIT_SAMPLE_SIZE = 200
+
+class _Waiter:
+    """空きを待っている1件の処理（スレッドはEvent、コルーチンはFutureで起こす）"""
+
+    def __init__(self, job_id: str, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.job_id = job_id
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._set_result)
+
+    def _set_result(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+class ResourceQueue:
+    """同時実行数に上限のあるリソース（ジョブごとの列をラウンドロビンで処理する）"""
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        # ジョブID → 待っている処理の列（先頭のジョブから順に割り当て、割り当てたジョブは末尾に回す）
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._in_use = 0
+        self._acquired = 0
+        self._wait_times: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    def _enqueue(self, waiter: _Waiter) -> bool:
+        """空きがあればすぐに割り当てる（True）、なければ列に並べる（False）"""
+        with self._lock:
+            if self._in_use < self.capacity and not self._queues:
+                self._grant(waiter)
+                return True
+            self._queues.setdefault(waiter.job_id, deque()).append(waiter)
+            return False
+
+    def _grant(self, waiter: _Waiter) -> None:
+        # ロックを取得した状態で呼ぶ
+        waiter.granted = True
+        self._in_use += 1
+        self._acquired += 1
+        self._wait_times.append(time.monotonic() - waiter.enqueued_at)
+
+    def _cancel(self, waiter: _Waiter) -> bool:
+        """列から取り除く（既に割り当て済みの場合は False）"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            queue = self._queues.get(waiter.job_id)
+            if queue is not None:
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[waiter.job_id]
+            return True
+
+    def acquire(self, job_id: str) -> None:
+        """空きができるまで待つ（スレッドから呼ぶ）"""
+        waiter = _Waiter(job_id)
+        if not self._enqueue(waiter):
+            waiter.event.wait()
+
+    async def acquire_async(self, job_id: str) -> None:
+        """空きができるまで待つ（コルーチンから呼ぶ）"""
+        waiter = _Waiter(job_id, asyncio.get_running_loop())
+        if self._enqueue(waiter):
+            return
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # 起こされる直前にキャンセルされた場合は割り当て分を返す
+            if not self._cancel(waiter):
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """1件分を返し、次のジョブの先頭の処理に割り当てる"""
+        with self._lock:
+            self._in_use -= 1
+            if not self._queues:
+                return
+            job_id, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(job_id)
+            else:
+                del self._queues[job_id]
+            self._grant(waiter)
+        waiter.wake()
+
+    @contextlib.contextmanager
+    def slot(self, job_id: str):
+        self.acquire(job_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextlib.asynccontextmanager
+    async def aslot(self, job_id: str):
+        await self.acquire_async(job_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            wait_times = list(self._wait_times)
+            queued = {job_id: len(queue) for job_id, queue in self._queues.items()}
+            in_use = self._in_use
+            acquired = self._acquired
+        return {
+            "capacity": self.capacity,
+            "in_use": in_use,
+            "queue_depth": sum(queued.values()),
+            "queued_by_job": queued,
+            "acquired": acquired,
+            "avg_wait_ms": round(sum(wait_times) / len(wait_times) * 1000, 1) if wait_times else 0.0,
+            "max_wait_ms": round(max(wait_times) * 1000, 1) if wait_times else 0.0,
+        }
+
+class StageScheduler:
+    """ジョブの処理を実行し、リソースごとのキューで同時実行数を制限するスケジューラー"""
+
+    def __init__(self):
+        self.resources: Dict[str, ResourceQueue] = {
+            name: ResourceQueue(name, int(os.getenv(env_name, default)))
+            for name, (env_name, default) in RESOURCE_LIMITS.items()
+        }
+        self.running_jobs: Dict[str, concurrent.futures.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _resource(self, name: str) -> ResourceQueue:
+        if name not in self.resources:
+            raise ValueError(f"不明なリソースです: {name}")
+        return self.resources[name]
+
+    def slot(self, resource: str, job_id: Optional[str] = None):
+        """リソースの空きを待ってから処理する（with 文で使う）"""
+        return self._resource(resource).slot(job_id or current_job_id.get() or DEFAULT_JOB_ID)
+
+    def aslot(self, resource: str, job_id: Optional[str] = None):
+        """リソースの空きを待ってから処理する（async with 文で使う）"""
+        return self._resource(resource).aslot(job_id or current_job_id.get() or DEFAULT_JOB_ID)
+
+    @contextlib.contextmanager
+    def job_context(self, job_id: str):
+        """ブロック内の処理を job_id のジョブとしてキューに並べる"""
+        token = current_job_id.set(job_id)
+        try:
+            yield
+        finally:
+            current_job_id.reset(token)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="job-scheduler", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def start_job(self, job_id: str, coro_fn: Callable, *args, **kwargs) -> concurrent.futures.Future:
+        """ジョブの処理（コルーチン関数）をスケジューラーのイベントループで開始"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._run_job(job_id, coro_fn, args, kwargs), loop)
+        self.running_jobs[job_id] = future
+
+        def on_done(done: concurrent.futures.Future) -> None:
+            if self.running_jobs.get(job_id) is done:
+                del self.running_jobs[job_id]
+            if not done.cancelled() and done.exception() is not None:
+                logger.error(f"ジョブエラー {job_id}: {done.exception()}")
+
+        future.add_done_callback(on_done)
+        return future
+
+    async def _run_job(self, job_id: str, coro_fn: Callable, args: tuple, kwargs: dict) -> Any:
+        current_job_id.set(job_id)
+        logger.info(f"ジョブ開始: {job_id} ({coro_fn.__name__})")
+        return await coro_fn(*args, **kwargs)
+
+    def is_job_running(self, job_id: str) -> bool:
+        return job_id in self.running_jobs
+
+    def stats(self) -> Dict[str, Any]:
+        """リソースごとのキューの深さ・待ち時間と実行中のジョブ"""
+        return {
+            "running_jobs": list(self.running_jobs),
+            "resources": {name: resource.stats() for name, resource in self.resources.items()},
+        }
+
+    async def _cancel_all(self) -> None:
+        """イベントループ上の処理（ジョブと、ジョブが起動した処理）をキャンセルして終了を待つ"""
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def shutdown(self, timeout: float = 10.0) -> List[str]:
+        """実行中のジョブをキャンセルしてからイベントループを止め、中断したジョブのIDを返す"""
+        interrupted = list(self.running_jobs)
+        if self._loop is None:
+            return interrupted
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_all(), self._loop).result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"ジョブのキャンセルが{timeout}秒以内に完了しませんでした")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        return interrupted
+
+# グローバルスケジューラーインスタンス
+job_scheduler = StageScheduler()
@@ -63,7 +63,9 @@ class SettingsManager:
                 "bedrock": os.getenv("BEDROCK_MODEL", "anthropic.claude-3-opus-20240229-v1:0")
             },
             "temperature": float(os.getenv("LLM_TEMPERATURE", "0.7")),
-            "max_tokens": int(os.getenv("LLM_MAX_TOKENS", "4000"))
+            "max_tokens": int(os.getenv("LLM_MAX_TOKENS", "4000")),
+            "timeout": float(os.getenv("LLM_TIMEOUT", "120")),
+            "max_connections": int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
         }
         
         # AWS Bedrockのリージョン設定
@@ -205,7 +207,8 @@ class SettingsManager:
                     result = await llm.generate(
                         system_prompt="You are a helpful assistant.",
                         user_prompt="Say 'Hello' in one word.",
-                        max_tokens=10
+                        max_tokens=10,
+                        use_cache=False  # キーの有効性を確認するので必ずAPIを呼ぶ
                     )
                     return {
                         "valid": True,
@@ -0,0 +1,182 @@
+"""
+スペクトルゲート - 話者ごとに学習したノイズプロファイルを使う1パスのノイズ除去
+
+ImprovedAudioProcessor.apply_spectral_gating（noisereduceの2段階処理）と同じ
+定常ゲート＋非定常ゲートを、1回のSTFTで求めたスペクトルに続けて適用する。
+定常ゲートのノイズプロファイルは (話者ID, エンジンバージョン) ごとに最初の発話から
+学習して保存し、以降の発話では学習し直さない。
+"""
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy.signal import fftconvolve, filtfilt, stft, istft
+
+def _amp_to_db(x: np.ndarray, top_db: float = 80.0) -> np.ndarray:
+    """振幅をdBに変換（各周波数の最大値から top_db 以下は切り上げる）"""
+    x_db = 20 * np.log10(np.abs(x) + np.finfo(np.float64).eps)
+    return np.maximum(x_db, np.max(x_db, axis=-1, keepdims=True) - top_db)
+
+def _smoothing_filter(n_grad_freq: int, n_grad_time: int) -> np.ndarray:
+    """マスクを周波数・時間方向に滑らかにする三角形のフィルタ"""
+    freq_ramp = np.concatenate([
+        np.linspace(0, 1, n_grad_freq + 1, endpoint=False),
+        np.linspace(1, 0, n_grad_freq + 2)
+    ])[1:-1]
+    time_ramp = np.concatenate([
+        np.linspace(0, 1, n_grad_time + 1, endpoint=False),
+        np.linspace(1, 0, n_grad_time + 2)
+    ])[1:-1]
+    smoothing_filter = np.outer(freq_ramp, time_ramp)
+    return smoothing_filter / np.sum(smoothing_filter)
+
+class NoiseProfileStore:
+    """(話者ID, エンジンバージョン) ごとの定常ノイズプロファイルの保存先"""
+
+    def __init__(self, profile_dir: Path):
+        self.profile_dir = Path(profile_dir)
+        self._profiles: Dict[str, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, speaker_id: int, engine_version: str, n_fft: int, sample_rate: int) -> Path:
+        safe_version = "".join(c if c.isalnum() or c in ".-" else "_" for c in str(engine_version))
+        return self.profile_dir / f"{safe_version}_{speaker_id}_{sample_rate}_{n_fft}.npz"
+
+    def load(self, path: Path) -> Optional[Dict[str, np.ndarray]]:
+        """プロファイルを読み込む（プロセス内でキャッシュ）"""
+        key = str(path)
+        with self._lock:
+            if key in self._profiles:
+                return self._profiles[key]
+        try:
+            with np.load(path) as data:
+                profile = {"mean": data["mean"], "std": data["std"]}
+        except (OSError, KeyError, ValueError):
+            return None
+        with self._lock:
+            self._profiles[key] = profile
+        return profile
+
+    def save(self, path: Path, profile: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """プロファイルを保存（他のワーカーが先に保存していた場合はそちらを使う）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp.npz")
+        os.close(fd)
+        try:
+            np.savez(tmp_path, mean=profile["mean"], std=profile["std"])
+            # 既存のファイルは上書きしない（最初に学習したプロファイルを使い続ける）
+            os.link(tmp_path, path)
+        except FileExistsError:
+            return self.load(path) or profile
+        finally:
+            os.unlink(tmp_path)
+        with self._lock:
+            self._profiles[str(path)] = profile
+        return profile
+
+class CachedProfileSpectralGate:
+    """学習済みノイズプロファイルによる定常ゲートと非定常ゲートを1回のSTFTで適用
+
+    パラメータは apply_spectral_gating の2段階処理と同じ値を使う。
+    """
+
+    def __init__(self, profile_store: NoiseProfileStore, sample_rate: int = 24000, n_fft: int = 2048,
+                 n_std_thresh: float = 1.5, time_constant_s: float = 2.0,
+                 thresh_n_mult_nonstationary: float = 2.0, sigmoid_slope_nonstationary: float = 10.0):
+        self.profile_store = profile_store
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = n_fft // 4
+        self.n_std_thresh = n_std_thresh
+        self.time_constant_s = time_constant_s
+        self.thresh_n_mult_nonstationary = thresh_n_mult_nonstationary
+        self.sigmoid_slope_nonstationary = sigmoid_slope_nonstationary
+        # ステップ1: 定常ノイズ（ビープ音）を85%減衰、ステップ2: 非定常ノイズを50%減衰
+        self.stationary_prop_decrease = 0.85
+        self.stationary_filter = self._mask_filter(freq_smooth_hz=200, time_smooth_ms=50)
+        self.nonstationary_prop_decrease = 0.5
+        self.nonstationary_filter = self._mask_filter(freq_smooth_hz=800, time_smooth_ms=150)
+
+    def _mask_filter(self, freq_smooth_hz: float, time_smooth_ms: float) -> np.ndarray:
+        n_grad_freq = max(1, int(freq_smooth_hz / (self.sample_rate / (self.n_fft / 2))))
+        n_grad_time = max(1, int(time_smooth_ms / ((self.hop_length / self.sample_rate) * 1000)))
+        return _smoothing_filter(n_grad_freq, n_grad_time)
+
+    def _stft(self, audio_data: np.ndarray) -> np.ndarray:
+        """最後の軸に沿ってSTFT（1次元なら (周波数, フレーム)、2次元なら (発話, 周波数, フレーム)）"""
+        _, _, spectrum = stft(
+            audio_data,
+            nfft=self.n_fft,
+            nperseg=self.n_fft,
+            noverlap=self.n_fft - self.hop_length,
+            padded=False
+        )
+        return spectrum
+
+    def _istft(self, spectrum: np.ndarray, length: int) -> np.ndarray:
+        _, audio_data = istft(
+            spectrum,
+            nfft=self.n_fft,
+            nperseg=self.n_fft,
+            noverlap=self.n_fft - self.hop_length,
+            time_axis=-1,
+            freq_axis=-2
+        )
+        output = np.zeros(spectrum.shape[:-2] + (length,), dtype=np.float32)
+        valid = min(length, audio_data.shape[-1])
+        output[..., :valid] = audio_data[..., :valid]
+        return output
+
+    def get_profile(self, spectrum_db: np.ndarray, speaker_id: int, engine_version: str) -> Dict[str, np.ndarray]:
+        """話者のノイズプロファイルを取得（未学習の場合はこの発話から学習して保存）"""
+        path = self.profile_store.path_for(speaker_id, engine_version, self.n_fft, self.sample_rate)
+        profile = self.profile_store.load(path)
+        if profile is None:
+            profile = {"mean": np.mean(spectrum_db, axis=1), "std": np.std(spectrum_db, axis=1)}
+            profile = self.profile_store.save(path, profile)
+            print(f"ノイズプロファイルを学習しました: {path.name}")
+        return profile
+
+    def apply(self, audio_data: np.ndarray, speaker_id: int, engine_version: str) -> np.ndarray:
+        """ノイズ除去した音声を返す"""
+        return self.apply_batch(audio_data[np.newaxis, :], [len(audio_data)], [speaker_id], engine_version)[0]
+
+    def apply_batch(self, audio_batch: np.ndarray, lengths: List[int], speaker_ids: List[int],
+                    engine_version: str) -> np.ndarray:
+        """ゼロ埋めした (発話数, サンプル数) の配列をまとめてノイズ除去する
+
+        lengths は各発話の元のサンプル数。ゼロ埋め部分が時間方向の平滑化に
+        影響しないよう、非定常ゲートの平滑化だけは発話ごとの有効フレームで計算する。
+        """
+        spectrum = self._stft(audio_batch)
+        spectrum_db = _amp_to_db(spectrum)
+        frame_counts = [length // self.hop_length + 1 for length in lengths]
+        # ゼロ埋め部分のフレームはマスクの平滑化で0として扱う（1発話ずつ処理した場合と同じ結果にする）
+        valid_frames = (np.arange(spectrum.shape[-1]) < np.array(frame_counts)[:, np.newaxis])[:, np.newaxis, :]
+
+        # ステップ1: 学習済みプロファイルのしきい値を超える成分を残す定常ゲート
+        noise_thresh = np.empty(spectrum.shape[:2])
+        for i, speaker_id in enumerate(speaker_ids):
+            profile = self.get_profile(spectrum_db[i, :, :frame_counts[i]], speaker_id, engine_version)
+            noise_thresh[i] = profile["mean"] + profile["std"] * self.n_std_thresh
+        stationary_mask = spectrum_db > noise_thresh[:, :, np.newaxis]
+        stationary_gain = stationary_mask * self.stationary_prop_decrease + (1.0 - self.stationary_prop_decrease)
+        stationary_gain = fftconvolve(valid_frames * stationary_gain, self.stationary_filter[np.newaxis], mode="same", axes=(1, 2))
+
+        # ステップ2: ステップ1の出力スペクトルに対する非定常ゲート（STFTをやり直さない）
+        magnitude = np.abs(spectrum) * stationary_gain
+        t_frames = self.time_constant_s * self.sample_rate / float(self.hop_length)
+        b = (np.sqrt(1 + 4 * t_frames ** 2) - 1) / (2 * t_frames ** 2)
+        # 有効フレームより後ろは平滑値＝振幅（しきい値未満）として扱う
+        smoothed = magnitude.copy()
+        for i, frame_count in enumerate(frame_counts):
+            smoothed[i, :, :frame_count] = filtfilt([b], [1, b - 1], magnitude[i, :, :frame_count], axis=-1, padtype=None)
+        above_thresh = (magnitude - smoothed) / (smoothed + np.finfo(np.float64).eps)
+        nonstationary_mask = 1 / (1 + np.exp(-(above_thresh - self.thresh_n_mult_nonstationary) * self.sigmoid_slope_nonstationary))
+        nonstationary_mask = fftconvolve(valid_frames * nonstationary_mask, self.nonstationary_filter[np.newaxis], mode="same", axes=(1, 2))
+        nonstationary_gain = nonstationary_mask * self.nonstationary_prop_decrease + (1.0 - self.nonstationary_prop_decrease)
+
+        return self._istft(spectrum * stationary_gain * nonstationary_gain, audio_batch.shape[-1])
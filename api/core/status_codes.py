@@ -30,6 +30,7 @@ class StatusCode:
     AUDIO_GENERATION_ERROR = "AUDIO_GENERATION_ERROR"
     VIDEO_CREATION_ERROR = "VIDEO_CREATION_ERROR"
     UNKNOWN_ERROR = "UNKNOWN_ERROR"
+    JOB_INTERRUPTED = "JOB_INTERRUPTED"
     NO_TEXT_EXTRACTED = "NO_TEXT_EXTRACTED"
     NO_SLIDES_EXTRACTED = "NO_SLIDES_EXTRACTED"
     INVALID_TARGET_DURATION = "INVALID_TARGET_DURATION"
@@ -19,7 +19,7 @@ class TextExtractor:
                 text = page.get_text()
                 
                 # テキストをクリーンアップ
-                text = self._clean_text(text)
+                text = self.clean_text(text)
                 slide_texts.append(text)
             
             pdf_document.close()
@@ -31,7 +31,7 @@ class TextExtractor:
         
         return slide_texts
     
-    def _clean_text(self, text: str) -> str:
+    def clean_text(self, text: str) -> str:
         """テキストのクリーンアップ"""
         # 余分な空白や改行を整理
         lines = text.strip().split('\n')
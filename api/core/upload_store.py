@@ -0,0 +1,109 @@
+"""
+アップロードストア - アップロードファイルのストリーミング保存と成果物の再利用インデックス
+
+アップロードはチャンク単位でディスクに書き込みながらSHA-256を計算する。
+同じ内容のPDF・ナレッジファイルが以前のジョブで処理済みの場合は、
+インデックスからそのジョブを探してスライド画像・抽出テキスト・対話データを再利用する。
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE_KB", "1024")) * 1024
+
+class UploadTooLargeError(Exception):
+    """アップロードサイズが上限を超えた"""
+
+async def save_upload_streaming(upload, dest_path: Path, max_bytes: Optional[int] = None,
+                                chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[str, int]:
+    """UploadFileをチャンク単位で保存し、(SHA-256, バイト数) を返す
+
+    上限を超えた場合は書きかけのファイルを削除して UploadTooLargeError を送出する。
+    """
+    dest_path = Path(dest_path)
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest_path, "wb") as buffer:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(f"{dest_path.name}: {size} バイト以上")
+                sha256.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        dest_path.unlink(missing_ok=True)
+        raise
+    return sha256.hexdigest(), size
+
+class UploadIndex:
+    """成果物の種類とコンテンツキーから、それを生成済みのジョブを引くインデックス
+
+    kind は "pdf"（スライド画像と抽出テキスト）、"dialogue"（対話データ）、
+    "knowledge"（ナレッジファイルの抽出テキスト）。ジョブストアと同じく
+    SQLite（WALモード）に保存し、複数のAPIワーカーから共有できる。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                kind TEXT NOT NULL,
+                content_key TEXT NOT NULL,
+                job_id TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (kind, content_key, job_id)
+            )
+        """)
+        self._connect().execute("CREATE INDEX IF NOT EXISTS idx_artifacts_job ON artifacts (job_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """スレッドごとのコネクションを取得"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def register(self, kind: str, content_key: str, job_id: str) -> None:
+        """job_id が content_key の成果物を持っていることを登録"""
+        self._connect().execute(
+            "INSERT OR REPLACE INTO artifacts (kind, content_key, job_id, created_at) VALUES (?, ?, ?, ?)",
+            (kind, content_key, job_id, time.time())
+        )
+
+    def candidates(self, kind: str, content_key: str, exclude_job_id: Optional[str] = None) -> List[str]:
+        """成果物を持つジョブIDを新しい順に取得"""
+        rows = self._connect().execute(
+            "SELECT job_id FROM artifacts WHERE kind = ? AND content_key = ? ORDER BY created_at DESC",
+            (kind, content_key)
+        ).fetchall()
+        return [job_id for (job_id,) in rows if job_id != exclude_job_id]
+
+    def remove(self, kind: str, content_key: str, job_id: str) -> None:
+        """成果物が見つからなくなったジョブを登録から外す"""
+        self._connect().execute(
+            "DELETE FROM artifacts WHERE kind = ? AND content_key = ? AND job_id = ?",
+            (kind, content_key, job_id)
+        )
+
+    def remove_job(self, job_id: str, kind: Optional[str] = None) -> None:
+        """ジョブの登録を削除（kind を指定した場合はその種類のみ）"""
+        if kind is None:
+            self._connect().execute("DELETE FROM artifacts WHERE job_id = ?", (job_id,))
+        else:
+            self._connect().execute("DELETE FROM artifacts WHERE job_id = ? AND kind = ?", (job_id, kind))
+
+# グローバルインスタンス
+upload_index = UploadIndex(Path(os.getenv("UPLOAD_INDEX_PATH", "data/uploads.db")))
@@ -1,4 +1,5 @@
 import sys
+import os
 from pathlib import Path
 from typing import List, Optional
 
@@ -6,8 +7,20 @@ from typing import List, Optional
 sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
 
 from dialogue_video_creator import DialogueVideoCreator
+from slideshow_renderer import FFmpegSlideshowRenderer
+from segment_renderer import SegmentedSlideshowRenderer
+from resolution_profiles import get_resolution_profile
 
 class VideoCreator:
+    # 動画レンダリングエンジン（ffmpeg: 静止画を直接エンコード, segments: スライドごとのセグメントを再利用して結合,
+    # moviepy: 従来のクリップ合成）
+    RENDER_ENGINES = {
+        "ffmpeg": FFmpegSlideshowRenderer,
+        "segments": SegmentedSlideshowRenderer,
+        "moviepy": DialogueVideoCreator
+    }
+    
+
     def __init__(self, job_id: str, base_dir: Path):
         self.job_id = job_id
         self.base_dir = base_dir
@@ -15,9 +28,17 @@ class VideoCreator:
         self.audio_dir = base_dir / "audio" / job_id
         self.output_dir = base_dir / "output"
         self.output_dir.mkdir(exist_ok=True)
+        # segmentsエンジンのスライドごとの映像セグメント
+        self.segment_dir = base_dir / "data" / job_id / "segments"
+        
+    def create_video(self, slide_numbers: Optional[List[int]] = None, engine: Optional[str] = None) -> str:
+        """動画を作成
         
-    def create_video(self, slide_numbers: Optional[List[int]] = None) -> str:
-        """動画を作成"""
+        engine を省略した場合は環境変数 VIDEO_RENDER_ENGINE（デフォルト: ffmpeg）を使用する。
+        """
+        engine = engine or os.getenv("VIDEO_RENDER_ENGINE", "ffmpeg")
+        if engine not in self.RENDER_ENGINES:
+            raise ValueError(f"不明なレンダリングエンジンです: {engine}")
         
         # スライド画像のパスを取得
         image_paths = []
@@ -39,29 +60,17 @@ class VideoCreator:
         # 音声ファイル情報を構築
         dialogue_audio_info = {}
         
-        for i, image_path in enumerate(image_paths):
+        for image_path in image_paths:
             slide_num = int(Path(image_path).stem.split("_")[1])
-            slide_key = f"slide_{slide_num}"
-            dialogue_audio_info[slide_key] = []
-            
-            # 該当するスライドの音声ファイルを探す
-            audio_files = sorted(self.audio_dir.glob(f"slide_{slide_num:03d}_*_*.wav"))
-            
-            print(f"スライド {slide_num} ({slide_key}): 音声ファイル {len(audio_files)} 個見つかりました")
-            
-            for audio_file in audio_files:
-                # ファイル名から話者を特定
-                parts = audio_file.stem.split("_")
-                if len(parts) >= 4:
-                    speaker = parts[3]
-                    dialogue_audio_info[slide_key].append({
-                        "speaker": speaker,
-                        "audio_path": str(audio_file)
-                    })
-                    print(f"  - {audio_file.name}: speaker={speaker}")
+            dialogue_audio_info[f"slide_{slide_num}"] = self._slide_audio_info(slide_num)
         
         # 動画作成
-        creator = DialogueVideoCreator()
+        resolution_profile = get_resolution_profile()
+        print(f"レンダリングエンジン: {engine}, 解像度: {resolution_profile.name}")
+        if engine == "segments":
+            creator = SegmentedSlideshowRenderer(resolution_profile=resolution_profile, segment_dir=self.segment_dir)
+        else:
+            creator = self.RENDER_ENGINES[engine](resolution_profile=resolution_profile)
         output_path = self.output_dir / f"{self.job_id}.mp4"
         
         creator.create_dialogue_video(
@@ -70,4 +79,36 @@ class VideoCreator:
             str(output_path)
         )
         
-        return str(output_path)
\ No newline at end of file
+        return str(output_path)
+    
+    def _slide_audio_info(self, slide_num: int) -> List[dict]:
+        """スライドの音声ファイル情報（ファイル名から話者を特定）"""
+        slide_key = f"slide_{slide_num}"
+        audio_info = []
+        
+        # 該当するスライドの音声ファイルを探す
+        audio_files = sorted(self.audio_dir.glob(f"slide_{slide_num:03d}_*_*.wav"))
+        
+        print(f"スライド {slide_num} ({slide_key}): 音声ファイル {len(audio_files)} 個見つかりました")
+        
+        for audio_file in audio_files:
+            # ファイル名から話者を特定
+            parts = audio_file.stem.split("_")
+            if len(parts) >= 4:
+                speaker = parts[3]
+                audio_info.append({
+                    "speaker": speaker,
+                    "audio_path": str(audio_file)
+                })
+                print(f"  - {audio_file.name}: speaker={speaker}")
+        
+        return audio_info
+    
+    def prerender_segment(self, slide_number: int, is_last: bool = False) -> str:
+        """スライドの音声が揃った時点で、segmentsエンジンの映像セグメントを先にエンコード"""
+        image_path = self.slides_dir / f"slide_{slide_number:03d}.png"
+        if not image_path.exists():
+            raise Exception(f"スライド画像が見つかりません: {image_path}")
+        
+        creator = SegmentedSlideshowRenderer(resolution_profile=get_resolution_profile(), segment_dir=self.segment_dir)
+        return str(creator.render_slide_segment(str(image_path), self._slide_audio_info(slide_number), is_last=is_last))
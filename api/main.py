@@ -1,10 +1,9 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Response, Request, status
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Response, Request, Query, status
 import asyncio
-import threading
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 import uuid
 import json
@@ -16,6 +15,10 @@ import io
 from api.core.status_codes import StatusCode
 from api.core.job_processor import JobProcessor
 from api.core.async_worker import async_worker
+from api.core.scheduler import job_scheduler
+from api.core.progress_bus import progress_bus
+from api.core.file_response import RangeFileResponse
+from api.core.job_store import create_job_store
 
 # モデル定義
 class JobStatus(BaseModel):
@@ -70,6 +73,10 @@ async def startup_event():
     # SettingsManagerを初期化することで.envファイルのチェックとコピーが実行される
     settings = SettingsManager()
     print("設定マネージャーを初期化しました")
+    # 再起動などで中断されたジョブを失敗にする（他のワーカーが実行中のジョブはそのまま）
+    fail_interrupted_jobs(jobs_db.find_orphaned(IN_FLIGHT_STATUSES))
+    # CPUワーカープロセスを先に起動しておく（numpyなどのimportをタスク実行時に払わない）
+    await asyncio.get_event_loop().run_in_executor(None, async_worker.start)
 
 # CORS設定（開発用）
 app.add_middleware(
@@ -80,8 +87,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 仮のジョブストレージ（本番ではDynamoDBやRedis使用）
-jobs_db = {}
+# ジョブストレージ（SQLiteに永続化、JOB_STORE=memoryでプロセス内のみ）
+# 実行中のタスクがあるステータス（担当ワーカーが終了すると再開できないので起動時に失敗にする）
+IN_FLIGHT_STATUSES = ("pending", "processing", "generating_dialogue", "generating_audio", "creating_video")
+jobs_db = create_job_store(JobStatus)
+
+def publish_job_update(job: JobStatus, fields: Dict[str, Any]) -> None:
+    """ジョブの更新を購読中のクライアントに配信（状態は送信時の最新のものにまとめられる）"""
+    if "status_code" in fields:
+        progress_bus.publish("stage", {"status_code": fields["status_code"]}, job_id=job.job_id)
+    progress_bus.publish_state(job.job_id, lambda: job.model_dump(mode="json"))
+
+jobs_db.add_listener(publish_job_update)
+
+def fail_interrupted_jobs(jobs: List[JobStatus]) -> None:
+    """実行中のまま処理が中断されたジョブを失敗にする"""
+    interrupted = [job for job in jobs if job.status in IN_FLIGHT_STATUSES]
+    for job in interrupted:
+        jobs_db.update_job(
+            job,
+            status="failed",
+            status_code=StatusCode.FAILED,
+            error_code=StatusCode.JOB_INTERRUPTED,
+            updated_at=datetime.now()
+        )
+    if interrupted:
+        jobs_db.flush()
+        print(f"中断されたジョブを失敗にしました: {len(interrupted)}件")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """アプリケーション終了時に実行中のジョブを中断し、未保存のジョブ状態を書き込む"""
+    interrupted = await asyncio.to_thread(job_scheduler.shutdown)
+    fail_interrupted_jobs([job for job in (jobs_db.get(job_id) for job_id in interrupted) if job is not None])
+    async_worker.cleanup()
+    jobs_db.close()
 
 # ファイルストレージパス（本番ではS3使用）
 UPLOAD_DIR = Path("uploads")
@@ -125,9 +165,31 @@ async def login(login_request: LoginRequest):
 
 from fastapi import Form
 
+# アップロードサイズの上限（100MB）
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+
+def load_knowledge_text(knowledge_path: Path, knowledge_sha256: str, job_id: str) -> str:
+    """ナレッジファイルからテキストを抽出（同じ内容のファイルを抽出済みのジョブがあれば再利用）"""
+    for source_job_id in upload_index.candidates("knowledge", knowledge_sha256, exclude_job_id=job_id):
+        source_metadata = UPLOAD_DIR / source_job_id / "metadata.json"
+        try:
+            with open(source_metadata, "r", encoding="utf-8") as f:
+                knowledge_text = json.load(f).get("additional_knowledge", "")
+        except (OSError, json.JSONDecodeError):
+            upload_index.remove("knowledge", knowledge_sha256, source_job_id)
+            continue
+        if knowledge_text:
+            print(f"ナレッジテキストを再利用します: {source_job_id}")
+            return knowledge_text
+    
+    try:
+        return extract_text_from_knowledge_file(str(knowledge_path))
+    except Exception as e:
+        print(f"ナレッジファイルの処理エラー: {e}")
+        return ""
+
 @app.post("/api/jobs/upload", response_model=JobCreateResponse)
 async def upload_pdf(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     target_duration: int = Form(10),  # デフォルト10分
     speaker1_id: int = Form(2),
@@ -147,7 +209,7 @@ async def upload_pdf(
         raise HTTPException(status_code=400, detail="PDFファイルのみ対応しています")
     
     # ファイルサイズ検証（100MB）
-    if file.size and file.size > 100 * 1024 * 1024:
+    if file.size and file.size > MAX_UPLOAD_BYTES:
         raise HTTPException(status_code=413, detail="ファイルサイズが大きすぎます（最大100MB）")
     
     # ジョブID生成
@@ -157,24 +219,22 @@ async def upload_pdf(
     job_dir = UPLOAD_DIR / job_id
     job_dir.mkdir(exist_ok=True)
     
+    # チャンク単位で書き込みながらハッシュを計算（同じPDFの処理結果を再利用するため）
     pdf_path = job_dir / file.filename
-    with open(pdf_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # ナレッジファイルの処理
-    knowledge_text = ""
-    if knowledge_file and knowledge_file.filename:
-        # ナレッジファイルを保存
-        knowledge_path = job_dir / knowledge_file.filename
-        with open(knowledge_path, "wb") as buffer:
-            shutil.copyfileobj(knowledge_file.file, buffer)
+    try:
+        pdf_sha256, _ = await save_upload_streaming(file, pdf_path, max_bytes=MAX_UPLOAD_BYTES)
         
-        # ナレッジファイルからテキストを抽出
-        try:
-            knowledge_text = extract_text_from_knowledge_file(str(knowledge_path))
-        except Exception as e:
-            print(f"ナレッジファイルの処理エラー: {e}")
-            knowledge_text = ""
+        # ナレッジファイルの処理
+        knowledge_text = ""
+        knowledge_sha256 = None
+        if knowledge_file and knowledge_file.filename:
+            # ナレッジファイルを保存
+            knowledge_path = job_dir / knowledge_file.filename
+            knowledge_sha256, _ = await save_upload_streaming(knowledge_file, knowledge_path, max_bytes=MAX_UPLOAD_BYTES)
+            knowledge_text = load_knowledge_text(knowledge_path, knowledge_sha256, job_id)
+    except UploadTooLargeError:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise HTTPException(status_code=413, detail="ファイルサイズが大きすぎます（最大100MB）")
     
     # ジョブ情報を保存
     job_status = JobStatus(
@@ -195,24 +255,25 @@ async def upload_pdf(
         "speaker2": {"id": speaker2_id, "name": speaker2_name, "speed": speaker2_speed},
         "conversation_style": conversation_style,
         "conversation_style_prompt": conversation_style_prompt,
-        "additional_knowledge": knowledge_text
+        "additional_knowledge": knowledge_text,
+        "pdf_sha256": pdf_sha256,
+        "knowledge_sha256": knowledge_sha256
     }
     metadata_file = job_dir / "metadata.json"
     with open(metadata_file, "w", encoding="utf-8") as f:
         json.dump(metadata, f, ensure_ascii=False, indent=2)
     
+    # 抽出したナレッジテキストは metadata.json から再利用できる
+    if knowledge_text:
+        upload_index.register("knowledge", knowledge_sha256, job_id)
+    
     # 目安時間をファイルに保存（後方互換性のため）
     target_duration_file = job_dir / "target_duration.txt"
     with open(target_duration_file, "w") as f:
         f.write(str(target_duration))
     
     # バックグラウンドでPDF変換を実行（本番ではBatchジョブ起動）
-    def run_in_thread():
-        asyncio.run(convert_pdf_to_slides(job_id, str(pdf_path), target_duration, metadata))
-    
-    thread = threading.Thread(target=run_in_thread)
-    thread.daemon = True
-    thread.start()
+    job_scheduler.start_job(job_id, convert_pdf_to_slides, job_id, str(pdf_path), target_duration, metadata)
     
     return JobCreateResponse(
         job_id=job_id
@@ -227,11 +288,75 @@ async def get_job_status(job_id: str):
     
     return jobs_db[job_id]
 
+# 進捗イベントの送信がない間にキープアライブを送る間隔（秒）
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+def format_sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """Server-Sent Events の1件分のメッセージ"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """ジョブの進捗をServer-Sent Eventsで配信（ステータスのポーリングの代わり）
+    
+    接続時に現在の状態（status）を送り、以降は状態の変更（status）、工程の切り替え（stage）、
+    スライドごとの完了（slide）、発話の受信（utterance）を送る。ジョブが完了・失敗したら
+    end を送って接続を閉じる。
+    """
+    if job_id not in jobs_db:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    
+    async def event_stream():
+        # 購読してから現在の状態を送る（その間の変更を取りこぼさない）
+        subscription = progress_bus.subscribe(job_id)
+        try:
+            yield "retry: 3000\n\n"
+            job = jobs_db.get(job_id)
+            state = job.model_dump(mode="json") if job is not None else None
+            while state is not None:
+                yield format_sse("status", state)
+                if state["status"] in ("completed", "failed"):
+                    break
+                
+                # 次の状態の変更まで、工程・スライド・発話のイベントを送る
+                last_updated = state["updated_at"]
+                state = None
+                while state is None:
+                    event = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                    if event is None:
+                        if await request.is_disconnected():
+                            return
+                        # 他のAPIワーカーで実行中のジョブはバスに流れないので、ストアの更新も確認する
+                        job = jobs_db.get(job_id)
+                        if job is None:
+                            break
+                        current = job.model_dump(mode="json")
+                        if current["updated_at"] != last_updated:
+                            state = current
+                        else:
+                            yield ": keepalive\n\n"
+                    elif event["event"] == "status":
+                        state = event["data"]
+                    else:
+                        yield format_sse(event["event"], event["data"], event["id"])
+            yield format_sse("end", {"job_id": job_id})
+        finally:
+            progress_bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/jobs/{job_id}/generate-audio")
 async def generate_audio(
     job_id: str,
-    request: GenerateAudioRequest,
-    background_tasks: BackgroundTasks
+    request: GenerateAudioRequest
 ):
     """音声生成を開始"""
     
@@ -247,14 +372,18 @@ async def generate_audio(
         )
     
     # ステータス更新
-    job.status = "generating_audio"
-    job.status_code = StatusCode.AUDIO_GENERATING
-    job.progress = 30
-    job.updated_at = datetime.now()
+    jobs_db.update_job(
+        job,
+        status="generating_audio",
+        status_code=StatusCode.AUDIO_GENERATING,
+        progress=30,
+        updated_at=datetime.now()
+    )
     
     # バックグラウンドで音声生成（本番ではBatchジョブ）
-    background_tasks.add_task(
-        generate_audio_task, 
+    job_scheduler.start_job(
+        job_id,
+        generate_audio_task,
         job_id,
         request.speed_scale,
         request.pitch_scale,
@@ -267,8 +396,7 @@ async def generate_audio(
 @app.post("/api/jobs/{job_id}/create-video")
 async def create_video(
     job_id: str,
-    request: CreateVideoRequest,
-    background_tasks: BackgroundTasks
+    request: CreateVideoRequest
 ):
     """動画作成を開始"""
     
@@ -284,13 +412,17 @@ async def create_video(
         )
     
     # ステータス更新
-    job.status = "creating_video"
-    job.status_code = StatusCode.VIDEO_CREATING
-    job.progress = 70
-    job.updated_at = datetime.now()
+    jobs_db.update_job(
+        job,
+        status="creating_video",
+        status_code=StatusCode.VIDEO_CREATING,
+        progress=70,
+        updated_at=datetime.now()
+    )
     
     # バックグラウンドで動画作成（本番ではBatchジョブ）
-    background_tasks.add_task(
+    job_scheduler.start_job(
+        job_id,
         create_video_task,
         job_id,
         request.slide_numbers
@@ -298,9 +430,9 @@ async def create_video(
     
     return {"message": "動画作成を開始しました"}
 
-@app.get("/api/jobs/{job_id}/download")
+@app.api_route("/api/jobs/{job_id}/download", methods=["GET", "HEAD"])
 async def download_video(job_id: str):
-    """完成した動画をダウンロード"""
+    """完成した動画をダウンロード（Range・条件付きGETに対応、プレビューのシークやダウンロードの再開用）"""
     
     if job_id not in jobs_db:
         raise HTTPException(status_code=404, detail="ジョブが見つかりません")
@@ -321,7 +453,7 @@ async def download_video(job_id: str):
             detail="動画ファイルが見つかりません"
         )
     
-    return FileResponse(
+    return RangeFileResponse(
         path=video_path,
         media_type="video/mp4",
         filename=f"video_{job_id}.mp4"
@@ -375,10 +507,13 @@ async def generate_dialogue_only(
         )
     
     # ステータス更新
-    job.status = "generating_dialogue"
-    job.status_code = StatusCode.DIALOGUE_GENERATING
-    job.progress = 30
-    job.updated_at = datetime.now()
+    jobs_db.update_job(
+        job,
+        status="generating_dialogue",
+        status_code=StatusCode.DIALOGUE_GENERATING,
+        progress=30,
+        updated_at=datetime.now()
+    )
     
     # 非同期ワーカーで対話生成
     await async_worker.submit_task(
@@ -403,12 +538,26 @@ async def get_slides(job_id: str):
         slide_num = int(slide_path.stem.split("_")[1])
         slides.append({
             "slide_number": slide_num,
-            "url": f"/api/jobs/{job_id}/slides/{slide_num}"
+            "url": f"/api/jobs/{job_id}/slides/{slide_num}",
+            "thumbnail_url": f"/api/jobs/{job_id}/slides/{slide_num}/thumbnail"
         })
     
     return slides
 
-@app.get("/api/jobs/{job_id}/slides/{slide_number}")
+@app.api_route("/api/jobs/{job_id}/slides/{slide_number}/thumbnail", methods=["GET", "HEAD"])
+async def get_slide_thumbnail(job_id: str, slide_number: int):
+    """スライドのプレビュー用サムネイルを取得（サムネイルがない古いジョブは元の画像を返す）"""
+    
+    thumbnail_path = Path.cwd() / "slides" / job_id / "thumbnails" / f"slide_{slide_number:03d}.jpg"
+    if thumbnail_path.exists():
+        return RangeFileResponse(
+            path=thumbnail_path,
+            media_type="image/jpeg"
+        )
+    
+    return await get_slide_image(job_id, slide_number)
+
+@app.api_route("/api/jobs/{job_id}/slides/{slide_number}", methods=["GET", "HEAD"])
 async def get_slide_image(job_id: str, slide_number: int):
     """特定のスライド画像を取得"""
     
@@ -417,7 +566,7 @@ async def get_slide_image(job_id: str, slide_number: int):
     if not slide_path.exists():
         raise HTTPException(status_code=404, detail="スライド画像が見つかりません")
     
-    return FileResponse(
+    return RangeFileResponse(
         path=slide_path,
         media_type="image/png"
     )
@@ -667,7 +816,8 @@ async def upload_dialogue_csv(
     if not dialogue_data:
         raise HTTPException(status_code=400, detail="有効な対話データが含まれていません")
     
-    # データを保存
+    # データを保存（編集後の対話データは他のジョブで再利用しない）
+    upload_index.remove_job(job_id, kind="dialogue")
     data_dir = Path.cwd() / "data" / job_id
     data_dir.mkdir(exist_ok=True)
     
@@ -689,9 +839,12 @@ async def upload_dialogue_csv(
     
     # ジョブステータスを更新
     job = jobs_db[job_id]
-    job.status = "dialogue_ready"
-    job.status_code = StatusCode.DIALOGUE_COMPLETED  # 音声生成が必要なことを示す
-    job.updated_at = datetime.now()
+    jobs_db.update_job(
+        job,
+        status="dialogue_ready",
+        status_code=StatusCode.DIALOGUE_COMPLETED,  # 音声生成が必要なことを示す
+        updated_at=datetime.now()
+    )
     
     # 推定時間を再計算
     total_seconds = estimate_video_duration(dialogue_data)
@@ -715,7 +868,8 @@ async def update_dialogue(
     if job_id not in jobs_db:
         raise HTTPException(status_code=404, detail="ジョブが見つかりません")
     
-    # 対話データを保存
+    # 対話データを保存（編集後の対話データは他のジョブで再利用しない）
+    upload_index.remove_job(job_id, kind="dialogue")
     data_dir = Path.cwd() / "data" / job_id
     data_dir.mkdir(exist_ok=True)
     
@@ -739,9 +893,12 @@ async def update_dialogue(
     
     # ジョブステータスを更新
     job = jobs_db[job_id]
-    job.status = "dialogue_ready"
-    job.status_code = StatusCode.DIALOGUE_COMPLETED  # 音声生成が必要なことを示す
-    job.updated_at = datetime.now()
+    jobs_db.update_job(
+        job,
+        status="dialogue_ready",
+        status_code=StatusCode.DIALOGUE_COMPLETED,  # 音声生成が必要なことを示す
+        updated_at=datetime.now()
+    )
     
     # 推定時間を再計算
     total_seconds = estimate_video_duration(request.dialogue_data)
@@ -756,8 +913,7 @@ async def update_dialogue(
 
 @app.post("/api/jobs/{job_id}/generate-video")
 async def generate_video_complete(
-    job_id: str,
-    background_tasks: BackgroundTasks
+    job_id: str
 ):
     """ワンクリック動画生成（全工程を自動実行・非同期処理）"""
     
@@ -773,39 +929,80 @@ async def generate_video_complete(
         )
     
     # 既に同じジョブが実行中かチェック
-    if async_worker.is_task_running(f"complete_{job_id}"):
+    if job_scheduler.is_job_running(job_id):
         raise HTTPException(
             status_code=409, 
             detail="このジョブは既に処理中です"
         )
     
     # ステータス更新
-    job.status = "processing"
-    job.status_code = StatusCode.PROCESSING
-    job.progress = 5
-    job.updated_at = datetime.now()
+    jobs_db.update_job(
+        job,
+        status="processing",
+        status_code=StatusCode.PROCESSING,
+        progress=5,
+        updated_at=datetime.now()
+    )
     
-    # 非同期で全工程を実行（直接呼び出し）
-    asyncio.create_task(JobProcessor.process_complete_video_async(job_id, jobs_db))
+    # 非同期で全工程を実行
+    job_scheduler.start_job(job_id, JobProcessor.process_complete_video_async, job_id, jobs_db)
     
     return {"message": "動画生成を開始しました（非同期処理）", "job_id": job_id}
 
 @app.get("/api/jobs", response_model=List[JobStatus])
-async def list_jobs():
-    """全ジョブのリストを取得"""
-    return list(jobs_db.values())
+async def list_jobs(
+    response: Response,
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """ジョブのリストを取得（更新日時の新しい順、ステータスで絞り込み可能）"""
+    # 総件数はヘッダーで返す
+    response.headers["X-Total-Count"] = str(jobs_db.count(status=status))
+    return jobs_db.list(status=status, limit=limit, offset=offset)
 
 @app.get("/api/system/status")
 async def get_system_status():
     """システム状態を取得"""
+    from api.core.audio_generator import synthesis_cache
+    from api.core.pdf_processor import raster_cache
+    from api.core.llm_cache import llm_cache
+    
     running_tasks = async_worker.get_running_tasks()
     return {
         "running_tasks": running_tasks,
-        "active_jobs": len([job for job in jobs_db.values() if job.status == "processing"]),
-        "total_jobs": len(jobs_db),
-        "worker_capacity": async_worker.max_workers
+        "active_jobs": jobs_db.count(status="processing"),
+        "total_jobs": jobs_db.count(),
+        "worker_capacity": async_worker.max_workers,
+        "cpu_worker_capacity": async_worker.cpu_workers,
+        "synthesis_cache": synthesis_cache.stats(),
+        "raster_cache": raster_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "scheduler": job_scheduler.stats(),
+        "progress_bus": progress_bus.stats()
     }
 
+@app.get("/api/system/scheduler")
+async def get_scheduler_status():
+    """リソースごとのキューの深さ・待ち時間と実行中のジョブを取得"""
+    return job_scheduler.stats()
+
+@app.delete("/api/cache/raster")
+async def purge_raster_cache():
+    """スライド画像・サムネイル・テキストのキャッシュを削除（ジョブのスライド画像はコピーなので残る）"""
+    from api.core.pdf_processor import raster_cache, thumbnail_cache, slide_text_cache
+    
+    removed = raster_cache.purge() + thumbnail_cache.purge() + slide_text_cache.purge()
+    return {"message": "スライド画像のキャッシュを削除しました", "removed": removed}
+
+@app.delete("/api/cache/llm")
+async def purge_llm_cache():
+    """LLM応答のキャッシュを削除"""
+    from api.core.llm_cache import llm_cache
+    
+    removed = llm_cache.purge()
+    return {"message": "LLM応答のキャッシュを削除しました", "removed": removed}
+
 @app.get("/api/speakers")
 async def get_speakers():
     """利用可能なVOICEVOXスピーカー一覧を取得"""
@@ -908,6 +1105,7 @@ async def delete_job(job_id: str):
     
     # ジョブ情報削除
     del jobs_db[job_id]
+    upload_index.remove_job(job_id)
     
     return {"message": "ジョブを削除しました"}
 
@@ -1061,31 +1259,83 @@ async def update_settings(update: SettingsUpdate):
 from api.core.pdf_processor import PDFProcessor
 from api.core.audio_generator import AudioGenerator
 from api.core.video_creator import VideoCreator
+from api.core.pipeline import JobPipeline, pipeline_enabled
 from api.core.settings_manager import SettingsManager
 from api.core.llm_provider import LLMFactory, LLMProvider
 from api.core.auth import auth_manager, require_auth
 from api.core.knowledge_extractor import extract_text_from_knowledge_file
+from api.core.upload_store import save_upload_streaming, upload_index, UploadTooLargeError
+from api.core.disk_cache import make_cache_key
+from resolution_profiles import get_resolution_profile
 
 # バックグラウンドタスク（本番ではAWS Batchで実行）
+# ジョブの処理はすべてスケジューラーの1つのイベントループで動くので、
+# ファイルの読み書きやPDFの解析は asyncio.to_thread で実行してループを止めない
+
+def read_json_file(path: Path) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_json_file(path: Path, data: Any) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def active_llm_identity() -> Dict[str, Any]:
+    """対話の生成に使うLLM（設定中のプロバイダー・モデル・生成パラメータ）"""
+    settings = SettingsManager().get_settings()
+    provider = settings.get("default_provider", "openai")
+    return {
+        "provider": provider,
+        "model": settings.get("default_model", {}).get(provider),
+        "temperature": settings.get("temperature", 0.7),
+        "max_tokens": settings.get("max_tokens", 4000)
+    }
+
 async def convert_pdf_to_slides(job_id: str, pdf_path: str, target_duration: int = 10, metadata: dict = None):
     """PDFをスライド画像に変換"""
     try:
         job = jobs_db[job_id]
-        job.progress = 10
-        job.status_code = StatusCode.PDF_PROCESSING
+        jobs_db.update_job(job, progress=10, status_code=StatusCode.PDF_PROCESSING)
         
-        # PDFをスライドに変換
+        # PDFをスライドに変換（ページごとの進捗を10-15%の範囲で表示）
         processor = PDFProcessor(job_id, Path.cwd())
-        slide_count = processor.convert_pdf_to_slides(pdf_path)
+        pdf_sha256 = metadata.get("pdf_sha256") if metadata else None
+        resolution_profile = get_resolution_profile()
         
-        job.progress = 15
-        job.updated_at = datetime.now()
+        # 同じPDFを処理済みのジョブがあればスライド画像と抽出テキストを再利用
+        slide_count = 0
+        if pdf_sha256:
+            # スライド画像は解像度プロファイルごとに異なる
+            slides_key = make_cache_key(pdf_sha256, resolution_profile.name)
+            for source_job_id in upload_index.candidates("pdf", slides_key, exclude_job_id=job_id):
+                slide_count = await asyncio.to_thread(processor.reuse_slides, source_job_id)
+                if slide_count:
+                    print(f"スライド画像を再利用します: {source_job_id} ({slide_count}枚)")
+                    break
+                upload_index.remove("pdf", slides_key, source_job_id)
+        if not slide_count:
+            async with job_scheduler.aslot("rasterize", job_id):
+                slide_count = await async_worker.run(
+                    f"rasterize_{job_id}",
+                    JobProcessor.rasterize_slides_sync,
+                    job_id, pdf_path, jobs_db,
+                    progress_range=(10, 15),
+                    pdf_sha256=pdf_sha256,
+                    resolution_name=resolution_profile.name
+                )
+            if pdf_sha256:
+                upload_index.register("pdf", slides_key, job_id)
+        
+        jobs_db.update_job(job, progress=15, updated_at=datetime.now())
         
         # 進捗更新用のコールバック
         def update_progress(message: str, progress: float):
             # PDFからスライド変換が15%まで、対話生成が15-95%の範囲
-            job.progress = 15 + int(progress * 0.8)  # 15-95%の範囲で進捗表示
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                progress=15 + int(progress * 0.8),  # 15-95%の範囲で進捗表示
+                updated_at=datetime.now()
+            )
         
         # メタデータがある場合はスピーカー情報と会話スタイル、ナレッジを取得
         speaker_info = None
@@ -1108,21 +1358,68 @@ async def convert_pdf_to_slides(job_id: str, pdf_path: str, target_duration: int
             else:
                 combined_prompt = additional_knowledge
         
-        # 対話データを生成（目安時間とスピーカー情報、会話スタイルを渡す）
-        job.status_code = StatusCode.DIALOGUE_GENERATING
-        dialogue_path = await processor.generate_dialogue_from_pdf(
-            pdf_path, 
-            additional_prompt=combined_prompt,
-            progress_callback=update_progress, 
-            target_duration=target_duration,
-            speaker_info=speaker_info,
-            additional_knowledge=additional_knowledge
-        )
+        # 同じPDF・同じ生成条件の対話データがあれば再利用（LLMを呼ばない）
+        jobs_db.update_job(job, status_code=StatusCode.DIALOGUE_GENERATING)
+        dialogue_key = None
+        dialogue_path = ""
+        if pdf_sha256:
+            # プロバイダー・モデルや会話スタイルを変えた場合は作り直す
+            llm_identity = await asyncio.to_thread(active_llm_identity)
+            conversation_style = metadata.get('conversation_style') if metadata else None
+            dialogue_key = make_cache_key(pdf_sha256, target_duration, speaker_info, combined_prompt, additional_knowledge,
+                                          conversation_style, llm_identity)
+            for source_job_id in upload_index.candidates("dialogue", dialogue_key, exclude_job_id=job_id):
+                dialogue_path = await asyncio.to_thread(processor.reuse_dialogue, source_job_id)
+                if dialogue_path:
+                    print(f"対話データを再利用します: {source_job_id}")
+                    break
+                upload_index.remove("dialogue", dialogue_key, source_job_id)
+        
+        if not dialogue_path and pipeline_enabled():
+            # 対話生成・音声合成・映像セグメント作成をスライドごとに流して動画まで作成
+            jobs_db.update_job(job, status_code=StatusCode.PROCESSING)
+            pipeline = JobPipeline(job_id, Path.cwd(), progress_callback=update_progress)
+            await pipeline.run(
+                pdf_path,
+                additional_prompt=combined_prompt,
+                target_duration=target_duration,
+                speaker_info=speaker_info,
+                additional_knowledge=additional_knowledge
+            )
+            if dialogue_key:
+                upload_index.register("dialogue", dialogue_key, job_id)
+            
+            jobs_db.update_job(
+                job,
+                status="completed",
+                status_code=StatusCode.COMPLETED,
+                progress=100,
+                result_url=f"/api/jobs/{job_id}/download",
+                error_code=None,
+                updated_at=datetime.now()
+            )
+            return
         
-        job.status = "slides_ready"
-        job.status_code = StatusCode.DIALOGUE_COMPLETED
-        job.progress = 50
-        job.updated_at = datetime.now()
+        if not dialogue_path:
+            # 対話データを生成（目安時間とスピーカー情報、会話スタイルを渡す）
+            dialogue_path = await processor.generate_dialogue_from_pdf(
+                pdf_path, 
+                additional_prompt=combined_prompt,
+                progress_callback=update_progress, 
+                target_duration=target_duration,
+                speaker_info=speaker_info,
+                additional_knowledge=additional_knowledge
+            )
+            if dialogue_key:
+                upload_index.register("dialogue", dialogue_key, job_id)
+        
+        jobs_db.update_job(
+            job,
+            status="slides_ready",
+            status_code=StatusCode.DIALOGUE_COMPLETED,
+            progress=50,
+            updated_at=datetime.now()
+        )
         
         # 音声と動画生成を続ける
         await generate_complete_video(job_id)
@@ -1132,15 +1429,20 @@ async def convert_pdf_to_slides(job_id: str, pdf_path: str, target_duration: int
         error_msg = f"{str(e)}\n{traceback.format_exc()}"
         print(f"Error in convert_pdf_to_slides: {error_msg}")
         job = jobs_db[job_id]
-        job.status = "failed"
-        job.status_code = StatusCode.FAILED
-        job.error_code = StatusCode.PDF_PROCESSING_ERROR
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status="failed",
+            status_code=StatusCode.FAILED,
+            error_code=StatusCode.PDF_PROCESSING_ERROR,
+            updated_at=datetime.now()
+        )
 
 async def generate_dialogue_task(job_id: str, additional_prompt: Optional[str] = None, is_regeneration: bool = False):
     """対話スクリプトのみを生成するタスク"""
     try:
         job = jobs_db[job_id]
+        # 再生成した対話データは他のジョブで再利用しない
+        upload_index.remove_job(job_id, kind="dialogue")
         
         # PDFファイルパスを取得
         job_dir = UPLOAD_DIR / job_id
@@ -1154,14 +1456,12 @@ async def generate_dialogue_task(job_id: str, additional_prompt: Optional[str] =
         processor = PDFProcessor(job_id, Path.cwd())
         
         # 対話データ生成（追加プロンプトがあれば渡す）
-        job.progress = 50
-        job.updated_at = datetime.now()
+        jobs_db.update_job(job, progress=50, updated_at=datetime.now())
         
         # 進捗更新用のコールバック
         def update_progress(message: str, progress: float):
             # 再生成の場合は0-95%の範囲で進捗表示
-            job.progress = int(progress * 0.95)
-            job.updated_at = datetime.now()
+            jobs_db.update_job(job, progress=int(progress * 0.95), updated_at=datetime.now())
         
         # メタデータを読み込む
         metadata = None
@@ -1171,30 +1471,28 @@ async def generate_dialogue_task(job_id: str, additional_prompt: Optional[str] =
         
         metadata_file = job_dir / "metadata.json"
         if metadata_file.exists():
-            with open(metadata_file, "r", encoding="utf-8") as f:
-                metadata = json.load(f)
-                target_duration = metadata.get("target_duration", 10)
-                speaker_info = {
-                    'speaker1': metadata.get('speaker1'),
-                    'speaker2': metadata.get('speaker2')
-                }
-                additional_knowledge = metadata.get('additional_knowledge', '')
+            metadata = await asyncio.to_thread(read_json_file, metadata_file)
+            target_duration = metadata.get("target_duration", 10)
+            speaker_info = {
+                'speaker1': metadata.get('speaker1'),
+                'speaker2': metadata.get('speaker2')
+            }
+            additional_knowledge = metadata.get('additional_knowledge', '')
         else:
             # 互換性のため古い形式も確認
             target_duration_file = job_dir / "target_duration.txt"
             if target_duration_file.exists():
-                with open(target_duration_file, "r") as f:
-                    target_duration = int(f.read().strip())
+                target_duration = int((await asyncio.to_thread(target_duration_file.read_text)).strip())
         
         if is_regeneration and additional_prompt:
             from api.core.text_extractor import TextExtractor
             from api.core.dialogue_generator import DialogueGenerator
             from api.core.instruction_history import InstructionHistory
             
-            # 再生成の場合、どのスライドを再生成するか判断
-            dialogue_generator = DialogueGenerator()
+            # 再生成の場合、どのスライドを再生成するか判断（同じ指示でも新しい応答にするためキャッシュは使わない）
+            dialogue_generator = DialogueGenerator(use_cache=False)
             text_extractor = TextExtractor()
-            slide_texts = text_extractor.extract_text_from_pdf(pdf_path)
+            slide_texts = await asyncio.to_thread(text_extractor.extract_text_from_pdf, pdf_path)
             
             # AIに判断させる
             target_slides = await dialogue_generator.analyze_regeneration_request(
@@ -1203,14 +1501,13 @@ async def generate_dialogue_task(job_id: str, additional_prompt: Optional[str] =
             )
             
             # 指示履歴を管理
-            history = InstructionHistory(job_id, Path.cwd())
-            history.add_instruction(target_slides, additional_prompt)
+            history = await asyncio.to_thread(InstructionHistory, job_id, Path.cwd())
+            await asyncio.to_thread(history.add_instruction, target_slides, additional_prompt)
             
             # 既存の対話データを読み込む
             existing_dialogue_path = Path.cwd() / "data" / job_id / "dialogue_narration_original.json"
             if existing_dialogue_path.exists():
-                with open(existing_dialogue_path, 'r', encoding='utf-8') as f:
-                    existing_dialogues = json.load(f)
+                existing_dialogues = await asyncio.to_thread(read_json_file, existing_dialogue_path)
             else:
                 existing_dialogues = {}
             
@@ -1232,17 +1529,15 @@ async def generate_dialogue_task(job_id: str, additional_prompt: Optional[str] =
             data_dir.mkdir(exist_ok=True)
             
             dialogue_path = data_dir / "dialogue_narration_original.json"
-            with open(dialogue_path, 'w', encoding='utf-8') as f:
-                json.dump(dialogue_data, f, ensure_ascii=False, indent=2)
+            await asyncio.to_thread(write_json_file, dialogue_path, dialogue_data)
             
             # 互換性のためkatakanaファイルも同じ内容で保存
             katakana_path = data_dir / "dialogue_narration_katakana.json"
-            with open(katakana_path, 'w', encoding='utf-8') as f:
-                json.dump(dialogue_data, f, ensure_ascii=False, indent=2)
+            await asyncio.to_thread(write_json_file, katakana_path, dialogue_data)
             
             # 推定時間を計算して保存
             total_seconds = estimate_video_duration(dialogue_data)
-            job.estimated_duration = total_seconds
+            jobs_db.update_job(job, estimated_duration=total_seconds)
         else:
             # 通常の生成
             # メタデータから会話スタイルプロンプトを取得
@@ -1263,24 +1558,29 @@ async def generate_dialogue_task(job_id: str, additional_prompt: Optional[str] =
             )
             
             # 推定時間を計算して保存
-            with open(dialogue_path, 'r', encoding='utf-8') as f:
-                dialogue_data = json.load(f)
+            dialogue_data = await asyncio.to_thread(read_json_file, dialogue_path)
             total_seconds = estimate_video_duration(dialogue_data)
-            job.estimated_duration = total_seconds
+            jobs_db.update_job(job, estimated_duration=total_seconds)
         
         # 完了
-        job.status = "dialogue_ready"
-        job.status_code = StatusCode.COMPLETED
-        job.progress = 100
-        job.error_code = None  # エラーコードをクリアして過去のエラー表示を防ぐ
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status="dialogue_ready",
+            status_code=StatusCode.COMPLETED,
+            progress=100,
+            error_code=None,  # エラーコードをクリアして過去のエラー表示を防ぐ
+            updated_at=datetime.now()
+        )
         
     except Exception as e:
         job = jobs_db[job_id]
-        job.status = "failed"
-        job.status_code = StatusCode.FAILED
-        job.error_code = StatusCode.DIALOGUE_GENERATION_ERROR
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status="failed",
+            status_code=StatusCode.FAILED,
+            error_code=StatusCode.DIALOGUE_GENERATION_ERROR,
+            updated_at=datetime.now()
+        )
 
 async def generate_complete_video(job_id: str):
     """完全な動画生成フロー（全工程を自動実行）"""
@@ -1290,9 +1590,12 @@ async def generate_complete_video(job_id: str):
         # 1. PDFをスライドに変換（必要な場合のみ）
         slides_dir = Path.cwd() / "slides" / job_id
         if not slides_dir.exists() or not list(slides_dir.glob("slide_*.png")):
-            job.status_code = StatusCode.PDF_PROCESSING
-            job.progress = 10
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.PDF_PROCESSING,
+                progress=10,
+                updated_at=datetime.now()
+            )
             
             # PDFファイルパスを取得
             job_dir = UPLOAD_DIR / job_id
@@ -1303,16 +1606,30 @@ async def generate_complete_video(job_id: str):
             pdf_path = str(pdf_files[0])
             
             # PDFを処理
-            job.status_code = StatusCode.PDF_GENERATING_SLIDES
-            job.progress = 15
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.PDF_GENERATING_SLIDES,
+                progress=15,
+                updated_at=datetime.now()
+            )
+            
+            metadata_path = job_dir / "metadata.json"
+            pdf_sha256 = None
+            if metadata_path.exists():
+                pdf_sha256 = (await asyncio.to_thread(read_json_file, metadata_path)).get("pdf_sha256")
             
             processor = PDFProcessor(job_id, Path.cwd())
-            slide_count = processor.convert_pdf_to_slides(pdf_path)
+            async with job_scheduler.aslot("rasterize", job_id):
+                # 15-20%の範囲で進捗表示
+                slide_count = await async_worker.run(
+                    f"rasterize_{job_id}",
+                    JobProcessor.rasterize_slides_sync,
+                    job_id, pdf_path, jobs_db,
+                    progress_range=(15, 20), pdf_sha256=pdf_sha256
+                )
         else:
             # 既存のスライドを使用
-            job.progress = 20
-            job.updated_at = datetime.now()
+            jobs_db.update_job(job, progress=20, updated_at=datetime.now())
             slide_count = len(list(slides_dir.glob("slide_*.png")))
             print(f"既存のスライドを使用: {slide_count}枚")
         
@@ -1322,16 +1639,22 @@ async def generate_complete_video(job_id: str):
         
         # 既に対話データが存在するかチェック
         if not dialogue_path.exists():
-            job.status_code = StatusCode.DIALOGUE_GENERATING
-            job.progress = 25
-            job.updated_at = datetime.now()
+            jobs_db.update_job(
+                job,
+                status_code=StatusCode.DIALOGUE_GENERATING,
+                progress=25,
+                updated_at=datetime.now()
+            )
             
             # 進捗更新用のコールバック
             def update_progress(message: str, progress: float):
                 if "生成中" in message:
-                    job.status_code = StatusCode.DIALOGUE_PROCESSING
-                job.progress = 25 + int(progress * 0.35)  # 25-60%の範囲で進捗表示
-                job.updated_at = datetime.now()
+                    jobs_db.update_job(job, status_code=StatusCode.DIALOGUE_PROCESSING)
+                jobs_db.update_job(
+                    job,
+                    progress=25 + int(progress * 0.35),  # 25-60%の範囲で進捗表示
+                    updated_at=datetime.now()
+                )
             
             # ジョブから目標時間を取得
             target_duration = job.target_duration or 10  # デフォルト10分
@@ -1341,9 +1664,8 @@ async def generate_complete_video(job_id: str):
             metadata = None
             speaker_info = None
             if metadata_path.exists():
-                with open(metadata_path, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                    speaker_info = metadata.get('speakers', {})
+                metadata = await asyncio.to_thread(read_json_file, metadata_path)
+                speaker_info = metadata.get('speakers', {})
             
             dialogue_path = processor.generate_dialogue_from_pdf(
                 pdf_path, 
@@ -1353,32 +1675,35 @@ async def generate_complete_video(job_id: str):
             )
         else:
             # 既存の対話データを使用
-            job.progress = 60
-            job.updated_at = datetime.now()
+            jobs_db.update_job(job, progress=60, updated_at=datetime.now())
             print(f"既存の対話データを使用: {dialogue_path}")
         
         # 3. 音声生成
-        job.status_code = StatusCode.AUDIO_GENERATING
-        job.progress = 60
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status_code=StatusCode.AUDIO_GENERATING,
+            progress=60,
+            updated_at=datetime.now()
+        )
         
         # 音声生成の進捗を細かく更新
         audio_generator = AudioGenerator(job_id, Path.cwd())
         
         # スライド数を取得して進捗計算用に使用
-        with open(dialogue_path, 'r', encoding='utf-8') as f:
-            dialogue_data = json.load(f)
+        dialogue_data = await asyncio.to_thread(read_json_file, dialogue_path)
         total_slides = len(dialogue_data)
         
         # 各スライドの処理前に進捗を更新するためのラッパー
         original_generate = audio_generator.generate_audio_files
         def generate_with_progress(*args, **kwargs):
             # 内部で各スライドを処理する際に進捗を更新
-            job.status_code = StatusCode.AUDIO_PROCESSING_SLIDE
+            jobs_db.update_job(job, status_code=StatusCode.AUDIO_PROCESSING_SLIDE)
             result = original_generate(*args, **kwargs)
             return result
         
-        audio_count = generate_with_progress(
+        # VOICEVOXへのリクエストは発話ごとに tts キューに並ぶ
+        audio_count = await asyncio.to_thread(
+            generate_with_progress,
             speed_scale=1.0,
             pitch_scale=0.0,
             intonation_scale=1.2,
@@ -1386,41 +1711,58 @@ async def generate_complete_video(job_id: str):
         )
         
         # 4. 動画作成
-        job.status_code = StatusCode.VIDEO_CREATING
-        job.progress = 80
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status_code=StatusCode.VIDEO_CREATING,
+            progress=80,
+            updated_at=datetime.now()
+        )
         
-        video_creator = VideoCreator(job_id, Path.cwd())
         
         # 動画エンコーディング中のステータス更新
-        job.status_code = StatusCode.VIDEO_ENCODING
-        job.progress = 85
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status_code=StatusCode.VIDEO_ENCODING,
+            progress=85,
+            updated_at=datetime.now()
+        )
         
-        video_path = video_creator.create_video()
+        async with job_scheduler.aslot("encode", job_id):
+            video_path = await async_worker.run(
+                f"video_{job_id}", JobProcessor.render_video_sync, job_id, str(Path.cwd())
+            )
         
         # 動画ファイナライズ
-        job.status_code = StatusCode.VIDEO_FINALIZING
-        job.progress = 95
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status_code=StatusCode.VIDEO_FINALIZING,
+            progress=95,
+            updated_at=datetime.now()
+        )
         
         # 5. 完了
-        job.status = "completed"
-        job.status_code = StatusCode.COMPLETED
-        job.progress = 100
-        job.result_url = f"/api/jobs/{job_id}/download"
-        job.error_code = None  # エラーコードをクリアして過去のエラー表示を防ぐ
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status="completed",
+            status_code=StatusCode.COMPLETED,
+            progress=100,
+            result_url=f"/api/jobs/{job_id}/download",
+            error_code=None,  # エラーコードをクリアして過去のエラー表示を防ぐ
+            updated_at=datetime.now()
+        )
         
     except Exception as e:
         import traceback
         error_msg = f"Error in generate_complete_video: {str(e)}\n{traceback.format_exc()}"
         print(error_msg)  # コンソールにエラーを出力
         job = jobs_db[job_id]
-        job.status = "failed"
-        job.status_code = StatusCode.FAILED
-        job.error_code = StatusCode.VIDEO_CREATION_ERROR
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status="failed",
+            status_code=StatusCode.FAILED,
+            error_code=StatusCode.VIDEO_CREATION_ERROR,
+            updated_at=datetime.now()
+        )
 
 async def generate_audio_task(
     job_id: str,
@@ -1432,56 +1774,71 @@ async def generate_audio_task(
     """音声を生成"""
     try:
         job = jobs_db[job_id]
-        job.progress = 40
+        jobs_db.update_job(job, progress=40)
         
         # 音声生成
         generator = AudioGenerator(job_id, Path.cwd())
-        audio_count = generator.generate_audio_files(
+        audio_count = await asyncio.to_thread(
+            generator.generate_audio_files,
             speed_scale=speed_scale,
             pitch_scale=pitch_scale,
             intonation_scale=intonation_scale,
             volume_scale=volume_scale
         )
         
-        job.status = "audio_ready"
-        job.status_code = StatusCode.COMPLETED
-        job.progress = 60
-        job.error_code = None  # エラーコードをクリアして過去のエラー表示を防ぐ
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status="audio_ready",
+            status_code=StatusCode.COMPLETED,
+            progress=60,
+            error_code=None,  # エラーコードをクリアして過去のエラー表示を防ぐ
+            updated_at=datetime.now()
+        )
         
     except Exception as e:
         job = jobs_db[job_id]
-        job.status = "failed"
-        job.status_code = StatusCode.FAILED
-        job.error_code = StatusCode.AUDIO_GENERATION_ERROR
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status="failed",
+            status_code=StatusCode.FAILED,
+            error_code=StatusCode.AUDIO_GENERATION_ERROR,
+            updated_at=datetime.now()
+        )
 
 async def create_video_task(job_id: str, slide_numbers: Optional[List[int]]):
     """動画を作成"""
     try:
         job = jobs_db[job_id]
-        job.progress = 80
+        jobs_db.update_job(job, progress=80)
         
         # 動画作成
-        creator = VideoCreator(job_id, Path.cwd())
-        video_path = creator.create_video(slide_numbers)
+        async with job_scheduler.aslot("encode", job_id):
+            video_path = await async_worker.run(
+                f"video_{job_id}", JobProcessor.render_video_sync, job_id, str(Path.cwd()), slide_numbers
+            )
         
-        job.status = "completed"
-        job.status_code = StatusCode.COMPLETED
-        job.progress = 100
-        job.result_url = f"/api/jobs/{job_id}/download"
-        job.error_code = None  # エラーコードをクリアして過去のエラー表示を防ぐ
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status="completed",
+            status_code=StatusCode.COMPLETED,
+            progress=100,
+            result_url=f"/api/jobs/{job_id}/download",
+            error_code=None,  # エラーコードをクリアして過去のエラー表示を防ぐ
+            updated_at=datetime.now()
+        )
         
     except Exception as e:
         import traceback
         error_msg = f"Error in generate_complete_video: {str(e)}\n{traceback.format_exc()}"
         print(error_msg)  # コンソールにエラーを出力
         job = jobs_db[job_id]
-        job.status = "failed"
-        job.status_code = StatusCode.FAILED
-        job.error_code = StatusCode.VIDEO_CREATION_ERROR
-        job.updated_at = datetime.now()
+        jobs_db.update_job(
+            job,
+            status="failed",
+            status_code=StatusCode.FAILED,
+            error_code=StatusCode.VIDEO_CREATION_ERROR,
+            updated_at=datetime.now()
+        )
 
 # 動画時間の概算関数
 def estimate_video_duration(dialogue_data: Dict[str, List[Dict]]) -> float:
@@ -1518,7 +1875,7 @@ def format_duration(seconds: float) -> str:
     return f"{minutes}分{remaining_seconds}秒"
 
 @app.post("/api/jobs/{job_id}/generate-video")
-async def generate_video_directly(job_id: str, background_tasks: BackgroundTasks):
+async def generate_video_directly(job_id: str):
     """スライド準備完了後、動画生成を直接実行"""
     if job_id not in jobs_db:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -1533,11 +1890,14 @@ async def generate_video_directly(job_id: str, background_tasks: BackgroundTasks
         )
     
     # 動画生成タスクを開始
-    job.status = "processing"
-    job.status_code = StatusCode.VIDEO_CREATING
-    job.updated_at = datetime.now()
+    jobs_db.update_job(
+        job,
+        status="processing",
+        status_code=StatusCode.VIDEO_CREATING,
+        updated_at=datetime.now()
+    )
     
-    background_tasks.add_task(generate_complete_video, job_id)
+    job_scheduler.start_job(job_id, generate_complete_video, job_id)
     
     return {"message": "Video generation started", "job_id": job_id}
 
@@ -35,6 +35,7 @@ export const ja = {
     AUDIO_GENERATION_ERROR: "音声生成中にエラーが発生しました",
     VIDEO_CREATION_ERROR: "動画作成中にエラーが発生しました",
     UNKNOWN_ERROR: "不明なエラーが発生しました",
+    JOB_INTERRUPTED: "サーバーの再起動によりジョブが中断されました。もう一度実行してください",
     NO_TEXT_EXTRACTED: "PDFからテキストを抽出できませんでした",
     NO_SLIDES_EXTRACTED: "スライドを抽出できませんでした",
     INVALID_TARGET_DURATION: "無効な目標時間です",
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+クリック音除去（ImprovedAudioProcessor.remove_click_noise）のベンチマーク
+
+旧実装（検出したサンプルごとにPythonでループ）とベクトル化版の処理時間を比較する。
+WAVファイルを指定した場合はそのファイルを、指定しない場合はVOICEVOX出力に近い
+24kHzの合成音声（クリック入り）を使う。
+
+使い方:
+    python scripts/benchmark_declicker.py
+    python scripts/benchmark_declicker.py audio/slide_001_001_speaker1.wav ...
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.io import wavfile
+
+sys.path.append(str(Path(__file__).parent.parent / "api"))
+
+from core.audio_generator import ImprovedAudioProcessor
+
+SAMPLE_RATE = 24000
+
+def remove_click_noise_loop(audio_data):
+    """旧実装（比較用にそのまま残している）"""
+    if len(audio_data) == 0:
+        return audio_data
+
+    audio_diff = np.diff(audio_data)
+    if len(audio_diff) > 0:
+        sudden_changes = np.abs(audio_diff) > np.std(audio_diff) * 5
+
+        for i in np.where(sudden_changes)[0]:
+            if i > 5 and i < len(audio_data) - 5:
+                audio_data[i] = np.mean(audio_data[i-5:i+5])
+
+    return audio_data
+
+def remove_click_noise_loop_reference(audio_data):
+    """旧実装と同じ計算を補間前の値だけで行うループ版（ベクトル化版の正解データ）"""
+    original = audio_data.copy()
+    audio_diff = np.diff(original)
+    sudden_changes = np.abs(audio_diff) > np.std(audio_diff) * 5
+    for i in np.where(sudden_changes)[0]:
+        if i > 5 and i < len(original) - 5:
+            audio_data[i] = np.mean(original[i-5:i+5], dtype=np.float64)
+    return audio_data
+
+def synthesize_utterance(seconds, clicks_per_second, rng):
+    """VOICEVOXの発話に近い合成音声（有声音の倍音＋音節ごとの包絡＋クリック）"""
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    # 基本周波数を揺らした倍音（120〜250Hz）
+    f0 = 180 + 60 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    # 1秒あたり約7音節の包絡
+    envelope = np.clip(np.sin(2 * np.pi * 3.5 * t), 0, None) ** 0.5
+    audio = 0.3 * voiced * envelope + 0.003 * rng.standard_normal(n)
+    # クリック（1サンプルのインパルス）
+    click_positions = rng.integers(0, n, int(seconds * clicks_per_second))
+    audio[click_positions] += rng.choice([-0.8, 0.8], len(click_positions))
+    return audio.astype(np.float32)
+
+def load_wav(path):
+    sr, data = wavfile.read(path)
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    if data.dtype == np.int16:
+        data = data / 32768.0
+    return sr, data.astype(np.float32)
+
+def benchmark(func, audio, repeat):
+    """repeat回実行して最短時間（秒）と結果を返す"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        data = audio.copy()
+        start = time.perf_counter()
+        result = func(data)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="クリック音除去のベンチマーク")
+    parser.add_argument("wav_files", nargs="*", help="測定に使うWAVファイル（省略時は合成音声）")
+    parser.add_argument("--seconds", type=float, default=8.0, help="合成音声の長さ（秒）")
+    parser.add_argument("--clicks", type=float, default=200.0, help="合成音声の1秒あたりのクリック数")
+    parser.add_argument("--repeat", type=int, default=5, help="繰り返し回数")
+    args = parser.parse_args()
+
+    if args.wav_files:
+        samples = [(path, *load_wav(path)) for path in args.wav_files]
+    else:
+        rng = np.random.default_rng(0)
+        samples = [
+            (f"合成音声 {args.seconds}秒 / クリック{clicks:g}回/秒", SAMPLE_RATE,
+             synthesize_utterance(args.seconds, clicks, rng))
+            for clicks in (0, args.clicks / 10, args.clicks)
+        ]
+
+    processor = ImprovedAudioProcessor(sample_rate=SAMPLE_RATE)
+    for name, sr, audio in samples:
+        diff = np.diff(audio)
+        flagged = int(np.count_nonzero(np.abs(diff) > np.std(diff) * 5))
+
+        loop_time, _ = benchmark(remove_click_noise_loop, audio, args.repeat)
+        vector_time, vector_result = benchmark(processor.remove_click_noise, audio, args.repeat)
+        _, reference = benchmark(remove_click_noise_loop_reference, audio, 1)
+
+        print(f"{name} ({len(audio) / sr:.1f}秒, {sr}Hz, 検出サンプル数: {flagged})")
+        print(f"  ループ版:     {loop_time * 1000:9.2f} ms")
+        print(f"  ベクトル化版: {vector_time * 1000:9.2f} ms  ({loop_time / vector_time:.1f}倍)")
+        print(f"  参照実装との最大誤差: {np.max(np.abs(vector_result - reference)):.2e}")
+
+if __name__ == "__main__":
+    main()
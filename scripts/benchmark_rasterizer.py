@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+スライド画像化バックエンド（pymupdf / pdftoppm）のベンチマーク
+
+同じPDFを各バックエンドで画像化し、テキスト抽出を含めたページ処理速度（ページ/秒）を比較する。
+pymupdf は1回開いたドキュメントで描画とテキスト抽出を行い、pdftoppm は
+ページごとにpopplerを起動したうえでテキストをPyMuPDFで別に抽出する（従来の処理と同じ）。
+PDFを指定しない場合は図形とテキストを含む16:9の合成PDFを使う。
+
+使い方:
+    python scripts/benchmark_rasterizer.py
+    python scripts/benchmark_rasterizer.py slides.pdf --profiles 1080p original
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from pdf_converter import PDFConverter
+from resolution_profiles import RESOLUTION_PROFILES
+
+def synthesize_pdf(path, pages):
+    """タイトル・箇条書き・図形を含むスライド風のPDF（960x540pt）を作成"""
+    document = fitz.open()
+    for page_num in range(1, pages + 1):
+        page = document.new_page(width=960, height=540)
+        page.draw_rect(fitz.Rect(0, 0, 960, 80), color=None, fill=(0.1, 0.3, 0.6))
+        page.insert_text((40, 55), f"Slide {page_num}: Benchmark", fontsize=32, color=(1, 1, 1))
+        for line in range(6):
+            page.insert_text((60, 140 + line * 50), f"- Bullet point {line + 1} with some text", fontsize=24)
+        page.draw_circle(fitz.Point(780, 320), 110, color=(0.8, 0.2, 0.2), width=6)
+        page.draw_line(fitz.Point(600, 480), fitz.Point(920, 160), color=(0.2, 0.6, 0.2), width=4)
+    document.save(path)
+    document.close()
+
+def benchmark(backend, pdf_path, profile, repeat):
+    """repeat回実行して最短時間（秒）を返す"""
+    best = float("inf")
+    for _ in range(repeat):
+        output_dir = Path(tempfile.mkdtemp())
+        try:
+            converter = PDFConverter(str(output_dir), backend=backend)
+            start = time.perf_counter()
+            converter.render_document(pdf_path, profile, extract_text=True)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="スライド画像化バックエンドのベンチマーク")
+    parser.add_argument("pdf", nargs="?", help="測定に使うPDF（省略時は合成PDF）")
+    parser.add_argument("--pages", type=int, default=20, help="合成PDFのページ数")
+    parser.add_argument("--profiles", nargs="+", default=["1080p", "original"],
+                        choices=list(RESOLUTION_PROFILES), help="測定する解像度プロファイル")
+    parser.add_argument("--repeat", type=int, default=3, help="繰り返し回数")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp())
+    try:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = str(work_dir / "synthetic.pdf")
+            synthesize_pdf(pdf_path, args.pages)
+        with fitz.open(pdf_path) as document:
+            page_count = document.page_count
+        print(f"{pdf_path} ({page_count}ページ)")
+
+        for name in args.profiles:
+            profile = RESOLUTION_PROFILES[name]
+            print(f"解像度プロファイル: {name}")
+            results = {}
+            for backend in PDFConverter.RASTER_BACKENDS:
+                try:
+                    results[backend] = benchmark(backend, pdf_path, profile, args.repeat)
+                except Exception as e:
+                    print(f"  {backend:9s}: 実行できませんでした ({e})")
+                    continue
+                elapsed = results[backend]
+                print(f"  {backend:9s}: {elapsed:7.2f} 秒  {page_count / elapsed:7.1f} ページ/秒")
+            if len(results) == 2:
+                print(f"  pymupdf は pdftoppm の {results['pdftoppm'] / results['pymupdf']:.1f}倍")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
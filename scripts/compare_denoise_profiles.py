@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+ノイズ除去プロファイル（two_stage / cached_gate）の処理時間と音質の比較
+
+同じ話者の発話をまとめて処理し、従来の2段階処理（two_stage）に対する
+cached_gate の出力の差（SNR・対数スペクトル距離）と、無音区間に残るノイズ量を表示する。
+WAVファイルを指定しない場合は、ビープ音とノイズを加えた24kHzの合成音声を使う。
+
+使い方:
+    python scripts/compare_denoise_profiles.py
+    python scripts/compare_denoise_profiles.py audio/<job_id>/slide_*_speaker1.wav
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.io import wavfile
+from scipy.signal import stft
+
+sys.path.append(str(Path(__file__).parent.parent / "api"))
+
+import core.audio_generator as audio_generator
+from core.audio_generator import ImprovedAudioProcessor
+from core.spectral_gate import NoiseProfileStore
+
+SAMPLE_RATE = 24000
+
+def synthesize_utterance(seconds, rng):
+    """前後0.1秒の無音を含む合成発話（倍音＋音節の包絡）に350Hzのビープ音とノイズを加える"""
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = 180 + 60 * np.sin(2 * np.pi * rng.uniform(0.5, 1.0) * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 3.5 * t), 0, None) ** 0.5
+    silence = int(0.1 * SAMPLE_RATE)
+    envelope[:silence] = 0
+    envelope[-silence:] = 0
+    speech = 0.3 * voiced * envelope
+    noise = 0.01 * np.sin(2 * np.pi * 350 * t) + 0.005 * rng.standard_normal(n)
+    return (speech + noise).astype(np.float32)
+
+def load_wav(path):
+    sr, data = wavfile.read(path)
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    if data.dtype == np.int16:
+        data = data / 32768.0
+    return sr, data.astype(np.float32)
+
+def snr_db(reference, estimate):
+    """reference に対する estimate の差をSNR（dB）で表す"""
+    length = min(len(reference), len(estimate))
+    error = reference[:length] - estimate[:length]
+    return 10 * np.log10(np.sum(reference[:length] ** 2) / (np.sum(error ** 2) + 1e-12))
+
+def log_spectral_distance(reference, estimate, sr):
+    """対数パワースペクトルの平均距離（dB）"""
+    length = min(len(reference), len(estimate))
+    _, _, ref_spec = stft(reference[:length], fs=sr, nperseg=1024)
+    _, _, est_spec = stft(estimate[:length], fs=sr, nperseg=1024)
+    ref_db = 10 * np.log10(np.abs(ref_spec) ** 2 + 1e-10)
+    est_db = 10 * np.log10(np.abs(est_spec) ** 2 + 1e-10)
+    return np.mean(np.sqrt(np.mean((ref_db - est_db) ** 2, axis=0)))
+
+def edge_noise_rms(audio, sr):
+    """先頭・末尾0.1秒（VOICEVOXの前後の無音）のRMS"""
+    edge = int(0.1 * sr)
+    return np.sqrt(np.mean(np.concatenate([audio[:edge], audio[-edge:]]) ** 2))
+
+def main():
+    parser = argparse.ArgumentParser(description="ノイズ除去プロファイルの比較")
+    parser.add_argument("wav_files", nargs="*", help="同じ話者のWAVファイル（省略時は合成音声）")
+    parser.add_argument("--utterances", type=int, default=20, help="合成音声の発話数")
+    args = parser.parse_args()
+
+    if args.wav_files:
+        samples = [load_wav(path) for path in args.wav_files]
+    else:
+        rng = np.random.default_rng(0)
+        samples = [(SAMPLE_RATE, synthesize_utterance(rng.uniform(2.0, 6.0), rng)) for _ in range(args.utterances)]
+
+    # 比較用に一時ディレクトリでノイズプロファイルを学習させる
+    profile_dir = Path(tempfile.mkdtemp())
+    audio_generator.noise_profile_store = NoiseProfileStore(profile_dir)
+    two_stage = ImprovedAudioProcessor(sample_rate=SAMPLE_RATE, profile="two_stage")
+    cached_gate = ImprovedAudioProcessor(sample_rate=SAMPLE_RATE, profile="cached_gate")
+
+    times = {"two_stage": 0.0, "cached_gate": 0.0}
+    snrs, distances, noise_in, noise_two_stage, noise_cached = [], [], [], [], []
+    try:
+        for sr, audio in samples:
+            start = time.perf_counter()
+            reference = two_stage.apply_spectral_gating(audio.copy(), sr)
+            times["two_stage"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            estimate = cached_gate.apply_cached_profile_gating(audio.copy(), sr, speaker_id=0, engine_version="compare")
+            times["cached_gate"] += time.perf_counter() - start
+
+            snrs.append(snr_db(reference, estimate))
+            distances.append(log_spectral_distance(reference, estimate, sr))
+            noise_in.append(edge_noise_rms(audio, sr))
+            noise_two_stage.append(edge_noise_rms(reference, sr))
+            noise_cached.append(edge_noise_rms(estimate, sr))
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+    print(f"発話数: {len(samples)}")
+    print(f"処理時間 two_stage:   {times['two_stage']:.2f} 秒")
+    print(f"処理時間 cached_gate: {times['cached_gate']:.2f} 秒 ({times['two_stage'] / times['cached_gate']:.1f}倍)")
+    print(f"two_stage に対するSNR: 平均 {np.mean(snrs):.1f} dB / 最小 {np.min(snrs):.1f} dB")
+    print(f"対数スペクトル距離:     平均 {np.mean(distances):.2f} dB")
+    print(f"無音区間のノイズRMS:    入力 {np.mean(noise_in):.5f} / two_stage {np.mean(noise_two_stage):.5f} / cached_gate {np.mean(noise_cached):.5f}")
+
+if __name__ == "__main__":
+    main()
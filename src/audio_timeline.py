@@ -0,0 +1,143 @@
+import numpy as np
+from pathlib import Path
+from scipy.io import wavfile
+from scipy import signal
+
+class AudioTimeline:
+    """結合済みの音声トラックとスライドごとのオフセット表"""
+
+    def __init__(self, track, sample_rate, slides):
+        self.track = track
+        self.sample_rate = sample_rate
+        # [{"slide_key", "start", "duration", "start_sample", "num_samples"}, ...]
+        self.slides = slides
+
+    @property
+    def durations(self):
+        """各スライドの表示時間（秒）"""
+        return [slide["duration"] for slide in self.slides]
+
+    @property
+    def duration(self):
+        return len(self.track) / self.sample_rate
+
+    def write_wav(self, output_path):
+        """float32のWAVとして書き出す"""
+        wavfile.write(output_path, self.sample_rate, self.track)
+
+class AudioTimelineAssembler:
+    """ジョブの全WAVを1つの事前確保バッファに並べて音声トラックを作成
+
+    DialogueVideoCreator.build_slide_audio と同じ間隔・フェード・音量で並べるが、
+    MoviePyのクリップを連結せずにベクトル演算だけで処理する。
+    """
+
+    def __init__(self, sample_rate=24000, fade_ms=50, gap_seconds=0.2,
+                 tail_seconds=0.3, no_audio_seconds=5.0, gain=0.95):
+        self.sample_rate = sample_rate
+        self.fade_samples = int(fade_ms * sample_rate / 1000)
+        self.gap_samples = int(round(gap_seconds * sample_rate))
+        self.tail_samples = int(round(tail_seconds * sample_rate))
+        self.no_audio_samples = int(round(no_audio_seconds * sample_rate))
+        self.gain = gain
+        # フェードカーブ（コサイン）は共通なので一度だけ作る
+        self.fade_in_curve = (0.5 * (1 - np.cos(np.linspace(0, np.pi, self.fade_samples)))).astype(np.float32)
+        self.fade_out_curve = self.fade_in_curve[::-1].copy()
+
+    def _open_wav(self, path):
+        """WAVをメモリマップで開き、モノラル・目標サンプリングレートの配列を返す"""
+        sr, data = wavfile.read(path, mmap=True)
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        if sr != self.sample_rate:
+            data = signal.resample_poly(np.asarray(data, dtype=np.float32), self.sample_rate, sr)
+        return data
+
+    def _to_float32(self, data):
+        """PCMの整数型を[-1, 1]のfloat32に変換"""
+        if data.dtype == np.int16:
+            return data.astype(np.float32) / 32768.0
+        if data.dtype == np.int32:
+            return data.astype(np.float32) / 2147483648.0
+        if data.dtype == np.uint8:
+            return (data.astype(np.float32) - 128.0) / 128.0
+        return data.astype(np.float32)
+
+    def _plan_slide(self, audio_infos):
+        """スライド内の配置（読み込んだ音声と開始位置）とスライド長（サンプル数）を計算"""
+        placements = []
+        position = 0
+        for i, info in enumerate(audio_infos or []):
+            audio_path = info.get("audio_path")
+            if not audio_path or not Path(audio_path).exists():
+                continue
+            data = self._open_wav(audio_path)
+            placements.append((position, data))
+            position += len(data)
+            # 話者交代の間を追加（最後の音声以外）
+            if i < len(audio_infos) - 1:
+                position += self.gap_samples
+
+        if not placements:
+            return [], self.no_audio_samples
+        # 最後に短い余白を追加
+        return placements, position + self.tail_samples
+
+    def _write_clip(self, buffer, start, data):
+        """音声をバッファに書き込み、フェードと音量調整を適用"""
+        length = len(data)
+        segment = buffer[start:start + length]
+        segment[:] = self._to_float32(np.asarray(data))
+        # 50msの2倍より長い音声のみ前後にフェードを適用（ビーン音防止）
+        if length > self.fade_samples * 2:
+            segment[:self.fade_samples] *= self.fade_in_curve
+            segment[-self.fade_samples:] *= self.fade_out_curve
+        segment *= self.gain
+
+    def _align(self, length, align_samples):
+        """長さを align_samples の倍数に切り上げる"""
+        return -(-length // align_samples) * align_samples
+
+    def slide_length(self, audio_infos, align_samples=None):
+        """1スライド分の長さ（サンプル数）を計算（assemble と同じ配置・切り上げ）"""
+        _, length = self._plan_slide(audio_infos)
+        return self._align(length, align_samples) if align_samples else length
+
+    def assemble(self, slide_keys, dialogue_audio_info, align_samples=None):
+        """スライドキーの順に音声を並べてAudioTimelineを作成
+
+        align_samples を指定した場合は各スライドの長さをその倍数に切り上げる
+        （末尾の無音を延ばして、スライドの境界を動画のフレーム境界に揃える）。
+        """
+        plans = [self._plan_slide(dialogue_audio_info.get(slide_key, [])) for slide_key in slide_keys]
+        if align_samples:
+            plans = [(placements, self._align(length, align_samples)) for placements, length in plans]
+        total_samples = sum(length for _, length in plans)
+
+        # 無音で初期化したバッファを一度だけ確保する
+        track = np.zeros(total_samples, dtype=np.float32)
+        slides = []
+        offset = 0
+        for slide_key, (placements, length) in zip(slide_keys, plans):
+            for position, data in placements:
+                self._write_clip(track, offset + position, data)
+            slides.append({
+                "slide_key": slide_key,
+                "start": offset / self.sample_rate,
+                "duration": length / self.sample_rate,
+                "start_sample": offset,
+                "num_samples": length
+            })
+            offset += length
+
+        return AudioTimeline(track, self.sample_rate, slides)
+
+    def assemble_slide(self, audio_infos):
+        """1スライド分の音声を作成（音声がない場合はNone）"""
+        placements, length = self._plan_slide(audio_infos)
+        if not placements:
+            return None
+        track = np.zeros(length, dtype=np.float32)
+        for position, data in placements:
+            self._write_clip(track, position, data)
+        return track
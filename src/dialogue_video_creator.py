@@ -6,10 +6,20 @@ from scipy.io import wavfile
 from scipy import signal
 import os
 import tempfile
+from audio_timeline import AudioTimelineAssembler
+from resolution_profiles import get_resolution_profile
 
 class DialogueVideoCreator:
-    def __init__(self):
+    # 音声がないスライドの表示時間（秒）
+    NO_AUDIO_SLIDE_DURATION = 5.0
+    
+    def __init__(self, resolution_profile=None):
         self.temp_files = []
+        self.resolution_profile = resolution_profile or get_resolution_profile()
+        self.audio_assembler = AudioTimelineAssembler(
+            sample_rate=24000,
+            no_audio_seconds=self.NO_AUDIO_SLIDE_DURATION
+        )
     
     def create_silence(self, duration):
         """無音クリップを作成"""
@@ -38,6 +48,16 @@ class DialogueVideoCreator:
                 print(f"一時ファイル削除エラー: {e}")
         self.temp_files.clear()
     
+    def build_slide_audio(self, audio_infos):
+        """スライドの対話音声を無音・フェード付きで1本の音声クリップに結合（音声がない場合はNone）"""
+        # クリップを順に連結すると入れ子の合成クリップが増えていくため、NumPyバッファ上で組み立てる
+        track = self.audio_assembler.assemble_slide(audio_infos)
+        if track is None:
+            return None
+        
+        from moviepy.audio.AudioClip import AudioArrayClip
+        return AudioArrayClip(np.column_stack([track, track]), fps=self.audio_assembler.sample_rate)
+    
     def create_dialogue_slide(self, image_path, audio_infos):
         """対話形式の音声を持つスライドから動画クリップを作成（改善版）"""
         # 画像クリップを作成
@@ -50,74 +70,14 @@ class DialogueVideoCreator:
             new_height = image_clip.h if image_clip.h % 2 == 0 else image_clip.h - 1
             image_clip = image_clip.crop(x1=0, y1=0, x2=new_width, y2=new_height)
         
-        if audio_infos and any(info.get("audio_path") for info in audio_infos):
-            audio_clips = []
-            
-            for i, info in enumerate(audio_infos):
-                if info.get("audio_path") and Path(info["audio_path"]).exists():
-                    # 音声ファイルに高周波フィルタを適用
-                    filtered_audio_path = self.apply_highfreq_filter(info["audio_path"])
-                    
-                    # 音声クリップを読み込み（24kHzに統一）
-                    audio_clip = AudioFileClip(filtered_audio_path, fps=24000)
-                    
-                    # 音声の開始と終了に改善されたフェードを適用（ビーン音防止）
-                    fade_duration = 0.05  # 50ms（ビーン音除去の最適値）
-                    if audio_clip.duration > fade_duration * 2:
-                        from moviepy.audio.fx.audio_fadein import audio_fadein
-                        from moviepy.audio.fx.audio_fadeout import audio_fadeout
-                        audio_clip = audio_fadein(audio_clip, fade_duration)
-                        audio_clip = audio_fadeout(audio_clip, fade_duration)
-                    
-                    # 音量を正規化（クリッピング防止）
-                    audio_clip = audio_clip.volumex(0.95)
-                    
-                    # 音声をリストに追加
-                    audio_clips.append(audio_clip)
-                    
-                    # 話者交代の間を追加（最後の音声以外）テンポアップ版
-                    if i < len(audio_infos) - 1:
-                        silence_duration = 0.2  # 200ms（テンポ向上・自然な会話リズム）
-                        silence = self.create_silence(silence_duration)
-                        audio_clips.append(silence)
-            
-            if audio_clips:
-                # 音声クリップを改善された方法で連結（クロスフェード付き）
-                if len(audio_clips) == 1:
-                    combined_audio = audio_clips[0]
-                else:
-                    # 最初のクリップから始める
-                    combined_audio = audio_clips[0]
-                    
-                    # 残りのクリップを順次結合（音声のみクロスフェード適用）
-                    for i in range(1, len(audio_clips)):
-                        current_clip = audio_clips[i]
-                        
-                        # 音声クリップ（無音ではない）の場合のみクロスフェード
-                        if i % 2 == 1:  # 奇数インデックスは音声クリップ
-                            # 短いクロスフェードで滑らかに接続
-                            crossfade_duration = min(0.05, combined_audio.duration/10, current_clip.duration/10)
-                            if crossfade_duration > 0.01:  # 10ms以上の場合のみ適用
-                                from moviepy.audio.fx.audio_fadein import audio_fadein
-                                current_clip = audio_fadein(current_clip, crossfade_duration)
-                        
-                        # クリップを結合
-                        combined_audio = concatenate_audioclips([combined_audio, current_clip])
-                
-                # 全体の最後に短い余白を追加（テンポ重視版）
-                final_silence_duration = 0.3  # 0.3秒（テンポ向上）
-                final_silence = self.create_silence(final_silence_duration)
-                combined_audio = concatenate_audioclips([combined_audio, final_silence])
-                
-                duration = combined_audio.duration
-                image_clip = image_clip.set_duration(duration)
-                image_clip = image_clip.set_audio(combined_audio)
-            else:
-                # 音声がない場合
-                image_clip = image_clip.set_duration(5.0)
+        combined_audio = self.build_slide_audio(audio_infos)
+        if combined_audio is not None:
+            duration = combined_audio.duration
+            image_clip = image_clip.set_duration(duration)
+            image_clip = image_clip.set_audio(combined_audio)
         else:
-            # 音声情報がない場合
-            image_clip = image_clip.set_duration(5.0)
+            # 音声がない場合
+            image_clip = image_clip.set_duration(self.NO_AUDIO_SLIDE_DURATION)
         
         return image_clip
     
@@ -164,7 +124,7 @@ class DialogueVideoCreator:
             audio_fps=24000,  # 音声サンプリングレートを24kHzに統一
             preset='faster',  # 処理速度を優先しつつ品質も維持
             threads=16,  # スレッド数を増やして並列処理を強化
-            bitrate='1500k',  # ビットレートを少し下げて処理速度改善
+            bitrate=self.resolution_profile.video_bitrate,  # 解像度プロファイルに合わせたビットレート
             audio_bitrate='192k',  # 音声品質は維持
             temp_audiofile=temp_audiofile,
             remove_temp=True,
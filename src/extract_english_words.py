@@ -2,18 +2,19 @@
 import json
 import re
 
+# 英語の単語・フレーズを検出するパターン
+# 日本語の文字も\wに含まれるため、\bではなく英数字だけを境界として扱う
+ENGLISH_WORD_PATTERNS = [
+    r'(?<![A-Za-z0-9])[A-Za-z]+\.[A-Za-z]+(?![A-Za-z0-9])',  # node.js のようなドット付き
+    r'(?<![A-Za-z0-9])[A-Z][a-z]*[A-Z][a-zA-Z]*(?![A-Za-z0-9])',  # CamelCase
+    r'(?<![A-Za-z0-9])[A-Z]{2,}(?![A-Za-z0-9])',  # 全部大文字（API, AWS, etc.）
+    r'(?<![A-Za-z0-9])[A-Za-z]+(?![A-Za-z0-9])',  # 通常の英単語
+]
+
 def extract_english_words(text):
     """テキストから英語単語を抽出する"""
-    # 英語の単語・フレーズを検出するパターン
-    patterns = [
-        r'\b[A-Za-z]+\.[A-Za-z]+\b',  # node.js のようなドット付き
-        r'\b[A-Z][a-z]*[A-Z][a-zA-Z]*\b',  # CamelCase
-        r'\b[A-Z]{2,}\b',  # 全部大文字（API, AWS, etc.）
-        r'\b[A-Za-z]+\b',  # 通常の英単語
-    ]
-    
     english_words = set()
-    for pattern in patterns:
+    for pattern in ENGLISH_WORD_PATTERNS:
         matches = re.findall(pattern, text)
         english_words.update(matches)
     
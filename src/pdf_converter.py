@@ -1,23 +1,225 @@
-from pdf2image import convert_from_path
 import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import fitz  # PyMuPDF
+
+def _save_thumbnail(page, width, thumbnail_path):
+    scale = width / page.rect.width
+    pixmap = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+    pixmap.save(str(thumbnail_path), jpg_quality=80)
+
+def render_page_range(pdf_path, page_nums, output_dir, profile, render_pages, extract_text=False,
+                      thumbnail_width=None, thumbnail_dir=None, on_rendered=None):
+    """ページ範囲のテキスト抽出・サムネイル描画と、render_pages に含まれるページの描画（PyMuPDF）
+
+    プロセスプールのワーカーで実行できるよう、ドキュメントはここで開く。
+    戻り値は [(ページ番号, 画像のパス（描画しなかった場合は None）, テキスト), ...]
+    """
+    results = []
+    with fitz.open(pdf_path) as document:
+        for page_num in page_nums:
+            page = document[page_num - 1]
+            text = page.get_text() if extract_text else None
+            if thumbnail_width:
+                _save_thumbnail(page, thumbnail_width, Path(thumbnail_dir) / f"slide_{page_num:03d}.jpg")
+            image_path = None
+            if page_num in render_pages:
+                # ページの表示領域（page.rect）を縦横それぞれの倍率で変換し、fit_page() のサイズちょうどに描画
+                width, height = profile.fit_page(page.rect.width, page.rect.height)
+                matrix = fitz.Matrix(width / page.rect.width, height / page.rect.height)
+                pixmap = page.get_pixmap(matrix=matrix, alpha=False)
+                image_path = str(Path(output_dir) / f"slide_{page_num:03d}.png")
+                pixmap.save(image_path)
+                if on_rendered:
+                    on_rendered(page_num, image_path)
+            results.append((page_num, image_path, text))
+    return results
 
 class PDFConverter:
-    def __init__(self, output_dir="slides"):
+    # 画像化のバックエンド（pymupdf: プロセス内で描画, pdftoppm: pdf2image経由でpopplerを起動）
+    RASTER_BACKENDS = ("pymupdf", "pdftoppm")
+
+    def __init__(self, output_dir="slides", backend=None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
-    
-    def convert_pdf_to_images(self, pdf_path, dpi=300):
-        """PDFファイルを画像に変換"""
+        self.backend = backend or os.getenv("PDF_RASTER_BACKEND", "pymupdf")
+        if self.backend not in self.RASTER_BACKENDS:
+            raise ValueError(f"不明な画像化バックエンドです: {self.backend}")
+
+    def page_count(self, pdf_path):
+        """PDFのページ数"""
+        with fitz.open(pdf_path) as document:
+            return document.page_count
+
+    def convert_pdf_to_images(self, pdf_path, dpi=300, parallel=False, max_workers=None, progress_callback=None, pages=None):
+        """PDFファイルを画像に変換（pdftoppm）
+
+        parallel=True の場合はページ単位でpdftoppmを並列起動し、
+        描画したページをそのままディスクへ書き出す（全ページをメモリに保持しない）。
+        progress_callback(完了ページ数, 総ページ数) で進捗を通知する。
+        pages（1始まりのページ番号のリスト）を指定した場合はそのページだけを変換する。
+        """
+        if parallel or pages is not None:
+            return self._convert_parallel(pdf_path, dpi, max_workers, progress_callback, pages)
+
+        from pdf2image import convert_from_path
+
         print(f"PDFを変換中: {pdf_path}")
-        
+
         images = convert_from_path(pdf_path, dpi=dpi)
-        
+
         image_paths = []
         for i, image in enumerate(images):
             image_path = self.output_dir / f"slide_{i+1:03d}.png"
             image.save(image_path, "PNG")
             image_paths.append(str(image_path))
             print(f"  スライド {i+1} を保存: {image_path}")
-        
-        return image_paths
\ No newline at end of file
+            if progress_callback:
+                progress_callback(i + 1, len(images))
+
+        return image_paths
+
+    def _render_page(self, pdf_path, page_num, dpi, size=None):
+        """1ページをpdftoppmで直接PNGファイルに書き出す（PILを経由しない）"""
+        from pdf2image import convert_from_path
+
+        convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=page_num,
+            last_page=page_num,
+            fmt="png",
+            output_folder=str(self.output_dir),
+            output_file=f"slide_{page_num:03d}",
+            single_file=True,
+            paths_only=True,
+            size=size
+        )
+        return str(self.output_dir / f"slide_{page_num:03d}.png")
+
+    def _convert_parallel(self, pdf_path, dpi, max_workers, progress_callback, pages=None, page_sizes=None):
+        """ページ単位のワーカープールでPDFを並列に画像化
+
+        page_sizes（ページ番号 → (幅, 高さ)）を指定した場合はDPIではなくそのピクセルサイズで描画する。
+        """
+        if pages is None:
+            pages = range(1, self.page_count(pdf_path) + 1)
+        pages = list(pages)
+        page_sizes = page_sizes or {}
+        total_pages = len(pages)
+        if total_pages == 0:
+            return []
+        if max_workers is None:
+            max_workers = int(os.getenv("PDF_RASTER_WORKERS", os.cpu_count() or 4))
+        max_workers = max(1, min(max_workers, total_pages))
+
+        print(f"PDFを並列変換中: {pdf_path} ({total_pages}ページ, ワーカー数: {max_workers})")
+
+        # 同時に描画されるのは最大 max_workers ページのみなのでメモリ使用量はページ数に依存しない
+        image_paths = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._render_page, pdf_path, page_num, dpi, page_sizes.get(page_num)): page_num
+                for page_num in pages
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                page_num = futures[future]
+                image_paths[page_num] = future.result()
+                print(f"  スライド {page_num} を保存: {image_paths[page_num]}")
+                if progress_callback:
+                    progress_callback(completed, total_pages)
+
+        return [image_paths[page_num] for page_num in sorted(image_paths)]
+
+    def render_document(self, pdf_path, profile, pages=None, progress_callback=None,
+                        extract_text=False, thumbnail_width=None, thumbnail_dir=None, executor=None):
+        """解像度プロファイルに合わせてスライド画像を描画
+
+        pymupdfバックエンドではページごとのテキスト抽出とサムネイル描画、pages（省略時は全ページ）の
+        描画を同じパスで行う。executor（プロセスプール）を指定した場合はページ範囲ごとに分けて
+        ワーカーで並列に処理する（PyMuPDFの描画はGILを解放しないため、スレッドでは並列にならない）。
+        pdftoppmバックエンドでは描画をpdftoppmで行い、テキストとサムネイルはPyMuPDFで別に処理する。
+        戻り値は {"image_paths": [...], "texts": [...]}（texts は extract_text=False の場合は空）
+        """
+        if self.backend == "pdftoppm":
+            return self._render_document_pdftoppm(pdf_path, profile, pages, progress_callback,
+                                                  extract_text, thumbnail_width, thumbnail_dir)
+
+        if thumbnail_width:
+            thumbnail_dir = Path(thumbnail_dir) if thumbnail_dir else self.output_dir / "thumbnails"
+            thumbnail_dir.mkdir(parents=True, exist_ok=True)
+
+        total_pages = self.page_count(pdf_path)
+        render_pages = set(pages) if pages is not None else set(range(1, total_pages + 1))
+        # テキストとサムネイルは全ページ分作るので、その場合は全ページを担当に割り振る
+        page_nums = list(range(1, total_pages + 1)) if extract_text or thumbnail_width else sorted(render_pages)
+        pages_per_task = max(1, int(os.getenv("PDF_RASTER_PAGES_PER_TASK", "4")))
+        page_ranges = [page_nums[i:i + pages_per_task] for i in range(0, len(page_nums), pages_per_task)]
+        task_args = (str(self.output_dir), profile, render_pages, extract_text, thumbnail_width,
+                     str(thumbnail_dir) if thumbnail_width else None)
+
+        completed = 0
+
+        def on_rendered(page_num, image_path):
+            nonlocal completed
+            completed += 1
+            print(f"  スライド {page_num} を保存: {image_path}")
+            if progress_callback:
+                progress_callback(completed, len(render_pages))
+
+        results = []
+        if executor is None or len(page_ranges) <= 1:
+            print(f"PDFを{profile.name}で変換中（PyMuPDF）: {pdf_path} ({len(render_pages)}ページ)")
+            results = render_page_range(pdf_path, page_nums, *task_args, on_rendered=on_rendered)
+        else:
+            print(f"PDFを{profile.name}で並列変換中（PyMuPDF）: {pdf_path} "
+                  f"({len(render_pages)}ページ, {len(page_ranges)}タスク)")
+            futures = [executor.submit(render_page_range, pdf_path, page_range, *task_args)
+                       for page_range in page_ranges]
+            for future in as_completed(futures):
+                range_results = future.result()
+                results.extend(range_results)
+                for page_num, image_path, _ in range_results:
+                    if image_path:
+                        on_rendered(page_num, image_path)
+
+        results.sort(key=lambda result: result[0])
+        return {
+            "image_paths": [image_path for _, image_path, _ in results if image_path],
+            "texts": [text for _, _, text in results] if extract_text else []
+        }
+
+    def _render_document_pdftoppm(self, pdf_path, profile, pages, progress_callback,
+                                  extract_text, thumbnail_width, thumbnail_dir):
+        page_sizes = {}
+        texts = []
+        with fitz.open(pdf_path) as document:
+            if pages is None:
+                pages = range(1, document.page_count + 1)
+            pages = list(pages)
+            if not profile.is_original:
+                for page_num in pages:
+                    rect = document[page_num - 1].rect
+                    page_sizes[page_num] = profile.fit_page(rect.width, rect.height)
+            if extract_text:
+                texts = [page.get_text() for page in document]
+
+        image_paths = self._convert_parallel(pdf_path, profile.dpi, None, progress_callback, pages, page_sizes)
+        if thumbnail_width:
+            self.render_thumbnails(pdf_path, thumbnail_width, thumbnail_dir=thumbnail_dir)
+        return {"image_paths": image_paths, "texts": texts}
+
+    def render_thumbnails(self, pdf_path, width, pages=None, thumbnail_dir=None):
+        """プレビュー用のサムネイル（JPEG）をPDFから直接小さく描画"""
+        thumbnail_dir = Path(thumbnail_dir) if thumbnail_dir else self.output_dir / "thumbnails"
+        thumbnail_dir.mkdir(parents=True, exist_ok=True)
+        thumbnail_paths = []
+        with fitz.open(pdf_path) as document:
+            if pages is None:
+                pages = range(1, document.page_count + 1)
+            for page_num in pages:
+                thumbnail_path = thumbnail_dir / f"slide_{page_num:03d}.jpg"
+                _save_thumbnail(document[page_num - 1], width, thumbnail_path)
+                thumbnail_paths.append(str(thumbnail_path))
+        return thumbnail_paths
@@ -0,0 +1,46 @@
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+@dataclass(frozen=True)
+class ResolutionProfile:
+    """出力解像度プロファイル（スライドの描画サイズとエンコード設定をまとめて決める）
+
+    width/height が None の場合は従来どおり dpi でPDFを描画し、画像サイズのまま動画にする。
+    """
+    name: str
+    width: Optional[int]
+    height: Optional[int]
+    video_bitrate: str
+    dpi: int = 300
+
+    @property
+    def is_original(self) -> bool:
+        return self.width is None or self.height is None
+
+    def fit_page(self, page_width: float, page_height: float) -> Tuple[int, int]:
+        """ページのアスペクト比を保ったまま枠内に収まる描画サイズ（幅・高さとも偶数）"""
+        if self.is_original:
+            scale = self.dpi / 72
+        else:
+            scale = min(self.width / page_width, self.height / page_height)
+        width = max(2, int(page_width * scale) // 2 * 2)
+        height = max(2, int(page_height * scale) // 2 * 2)
+        return width, height
+
+RESOLUTION_PROFILES = {
+    "720p": ResolutionProfile("720p", 1280, 720, video_bitrate="1000k"),
+    "1080p": ResolutionProfile("1080p", 1920, 1080, video_bitrate="1500k"),
+    "1440p": ResolutionProfile("1440p", 2560, 1440, video_bitrate="3000k"),
+    "original": ResolutionProfile("original", None, None, video_bitrate="1500k"),
+}
+
+# スライド一覧のプレビュー用サムネイルの幅（ピクセル）
+THUMBNAIL_WIDTH = 320
+
+def get_resolution_profile(name=None):
+    """プロファイルを取得（省略時は環境変数 VIDEO_RESOLUTION、デフォルト: 1080p）"""
+    name = name or os.getenv("VIDEO_RESOLUTION", "1080p")
+    if name not in RESOLUTION_PROFILES:
+        raise ValueError(f"不明な解像度プロファイルです: {name}")
+    return RESOLUTION_PROFILES[name]
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from slideshow_renderer import FFmpegSlideshowRenderer
+
+class SegmentedSlideshowRenderer(FFmpegSlideshowRenderer):
+    """スライドごとに映像セグメントをエンコードしてキャッシュし、ストリームコピーで結合するレンダラー
+
+    セグメントのキーはスライド画像の内容・フレーム数・エンコード設定のハッシュなので、
+    対話を1スライドだけ編集した場合は、そのスライド（と表示時間が変わったスライド）の
+    セグメントだけを再エンコードする。各スライドの音声はフレーム境界まで無音で延ばして
+    映像と長さを揃え、音声トラックは全体を1本にまとめて最後にエンコードする
+    （AACをセグメントごとに分けると境界にプライミングの無音が入るため）。
+    """
+
+    # エンコード設定を変更した場合は上げる（古いセグメントを使わないようにする）
+    SEGMENT_FORMAT_VERSION = 1
+
+    def __init__(self, ffmpeg_binary="ffmpeg", resolution_profile=None, segment_dir="segments", max_workers=None):
+        super().__init__(ffmpeg_binary=ffmpeg_binary, resolution_profile=resolution_profile)
+        self.segment_dir = Path(segment_dir)
+        self.max_workers = max_workers or int(os.getenv("VIDEO_SEGMENT_WORKERS", "2"))
+
+    def _file_hash(self, path):
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def segment_key(self, image_hash, frames, fps, fade_frames):
+        """セグメントの入力（画像・フレーム数・エンコード設定）から作るキー"""
+        profile = self.resolution_profile
+        payload = json.dumps([
+            self.SEGMENT_FORMAT_VERSION, image_hash, frames, fps, fade_frames,
+            profile.name, profile.width, profile.height, profile.video_bitrate
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def build_segment_command(self, image_path, output_path, frames, fps, fade_frames=0):
+        """1スライド分の映像セグメント（音声なし）をエンコードするffmpegコマンド"""
+        video_filters = self.frame_filters() + ["format=yuv420p"]
+        if fade_frames:
+            # 動画全体の最後のフェードアウトは最後のセグメントに含める
+            video_filters.append(f"fade=t=out:s={frames - fade_frames}:n={fade_frames}")
+
+        return [
+            self.ffmpeg_binary, "-y",
+            "-loop", "1", "-framerate", str(fps), "-i", str(image_path),
+            "-frames:v", str(frames),
+            "-vf", ",".join(video_filters),
+            "-c:v", "libx264",
+            "-preset", "faster",
+            "-b:v", self.resolution_profile.video_bitrate,
+            "-threads", "4",
+            "-pix_fmt", "yuv420p",
+            "-video_track_timescale", str(fps * 512),
+            "-an",
+            str(output_path)
+        ]
+
+    def build_concat_command(self, list_path, audio_path, output_path, total_duration):
+        """セグメントをストリームコピーで結合し、音声トラックだけをエンコードするffmpegコマンド"""
+        return [
+            self.ffmpeg_binary, "-y",
+            "-f", "concat", "-safe", "0", "-i", str(list_path),
+            "-i", str(audio_path),
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c:v", "copy",
+            "-c:a", "aac",
+            "-b:a", "192k",
+            "-ar", "24000",
+            "-ac", "2",
+            "-t", f"{total_duration:.6f}",
+            "-max_muxing_queue_size", "1024",
+            "-movflags", "+faststart",  # Web再生に最適化（moov atomを先頭に配置）
+            str(output_path)
+        ]
+
+    def _encode_segment(self, segment):
+        tmp_path = segment["path"].with_suffix(".tmp.mp4")
+        command = self.build_segment_command(segment["image_path"], tmp_path, segment["frames"],
+                                             segment["fps"], segment["fade_frames"])
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            tmp_path.unlink(missing_ok=True)
+            raise Exception(f"ffmpegによるセグメント作成に失敗しました: {result.stderr[-2000:]}")
+        os.replace(tmp_path, segment["path"])
+
+    def _frame_samples(self, fps):
+        sample_rate = self.audio_assembler.sample_rate
+        if sample_rate % fps != 0:
+            raise ValueError(f"サンプリングレート {sample_rate} がフレームレート {fps} で割り切れません")
+        return sample_rate // fps
+
+    def _segment_spec(self, image_path, frames, fps, is_last):
+        """セグメントのエンコード条件と保存先（最後のスライドにはフェードアウトを含める）"""
+        fade_frames = fps  # 1秒のフェードアウト
+        slide_fade = fade_frames if is_last and frames > fade_frames else 0
+        key = self.segment_key(self._file_hash(image_path), frames, fps, slide_fade)
+        return {
+            "image_path": image_path,
+            "frames": frames,
+            "fps": fps,
+            "fade_frames": slide_fade,
+            "path": self.segment_dir / f"{key}.mp4"
+        }
+
+    def render_slide_segment(self, image_path, audio_infos, fps=24, is_last=False):
+        """1スライド分のセグメントを先にエンコードしておく（作成済みの場合はそのまま）
+
+        スライドの音声が揃った時点で呼ぶと、create_dialogue_video では
+        このセグメントを再利用して結合するだけになる。
+        """
+        frame_samples = self._frame_samples(fps)
+        frames = self.audio_assembler.slide_length(audio_infos, align_samples=frame_samples) // frame_samples
+        segment = self._segment_spec(image_path, frames, fps, is_last)
+        if not segment["path"].exists():
+            self.segment_dir.mkdir(parents=True, exist_ok=True)
+            self._encode_segment(segment)
+        return segment["path"]
+
+    def create_dialogue_video(self, image_paths, dialogue_audio_info, output_path="dialogue_output.mp4", fps=24):
+        """対話形式の動画を作成（DialogueVideoCreator.create_dialogue_videoと同じインターフェース）"""
+        if not image_paths:
+            raise ValueError("スライド画像が指定されていません")
+
+        frame_samples = self._frame_samples(fps)
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            audio_path = os.path.join(temp_dir, "audio.wav")
+            list_path = os.path.join(temp_dir, "segments.txt")
+
+            # スライドの長さをフレーム境界に揃えた音声トラック
+            slide_keys = [f"slide_{int(Path(image_path).stem.split('_')[1])}" for image_path in image_paths]
+            timeline = self.audio_assembler.assemble(slide_keys, dialogue_audio_info, align_samples=frame_samples)
+            timeline.write_wav(audio_path)
+            print(f"最終動画の長さ: {timeline.duration} 秒")
+
+            segments = []
+            for i, (image_path, slide) in enumerate(zip(image_paths, timeline.slides)):
+                frames = slide["num_samples"] // frame_samples
+                segments.append(self._segment_spec(image_path, frames, fps, i == len(image_paths) - 1))
+
+            pending = [segment for segment in segments if not segment["path"].exists()]
+            print(f"セグメント: {len(segments)}個中{len(segments) - len(pending)}個を再利用、"
+                  f"{len(pending)}個をエンコードします")
+            if pending:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    list(executor.map(self._encode_segment, pending))
+
+            with open(list_path, "w", encoding="utf-8") as f:
+                for segment in segments:
+                    f.write(f"file '{self._escape(segment['path'].resolve())}'\n")
+
+            print(f"動画を出力中（セグメント結合）: {output_path}")
+            command = self.build_concat_command(list_path, audio_path, output_path, timeline.duration)
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise Exception(f"ffmpegによる動画の結合に失敗しました: {result.stderr[-2000:]}")
+
+        # 今回使わなかった古いセグメントを削除
+        used = {segment["path"].name for segment in segments}
+        for path in self.segment_dir.glob("*.mp4"):
+            if path.name not in used and not path.name.endswith(".tmp.mp4"):
+                path.unlink(missing_ok=True)
+
+        print(f"動画出力完了: {output_path}")
+        return output_path
@@ -0,0 +1,117 @@
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from audio_timeline import AudioTimelineAssembler
+from dialogue_video_creator import DialogueVideoCreator
+from resolution_profiles import get_resolution_profile
+
+class FFmpegSlideshowRenderer:
+    """静止画スライドをffmpegのconcatデマルチプレクサで直接エンコードするレンダラー
+
+    音声トラックは最初に一度だけNumPyで結合して書き出し、映像はスライド画像と
+    表示時間のリストをffmpegに渡すだけなので、Python側でフレームを生成しない。
+    出力設定はDialogueVideoCreator（MoviePy版）と揃えている。
+    フレームサイズとビットレートは解像度プロファイルで決める。
+    """
+
+    def __init__(self, ffmpeg_binary="ffmpeg", resolution_profile=None):
+        self.ffmpeg_binary = ffmpeg_binary
+        self.resolution_profile = resolution_profile or get_resolution_profile()
+        self.audio_assembler = AudioTimelineAssembler(
+            sample_rate=24000,
+            no_audio_seconds=DialogueVideoCreator.NO_AUDIO_SLIDE_DURATION
+        )
+
+    def mix_audio_track(self, image_paths, dialogue_audio_info, output_audio_path):
+        """全スライドの音声を1本のWAVに書き出し、各スライドの表示時間（秒）を返す"""
+        slide_keys = [f"slide_{int(Path(image_path).stem.split('_')[1])}" for image_path in image_paths]
+        for slide_key in slide_keys:
+            print(f"{slide_key} の音声: {len(dialogue_audio_info.get(slide_key, []))} 個")
+
+        timeline = self.audio_assembler.assemble(slide_keys, dialogue_audio_info)
+        timeline.write_wav(output_audio_path)
+
+        return timeline.durations
+
+    def write_concat_list(self, image_paths, durations, list_path):
+        """ffmpeg concatデマルチプレクサ用のリストファイルを作成"""
+        with open(list_path, "w", encoding="utf-8") as f:
+            for image_path, duration in zip(image_paths, durations):
+                f.write(f"file '{self._escape(Path(image_path).resolve())}'\n")
+                f.write(f"duration {duration:.6f}\n")
+            # 最後のエントリの表示時間を有効にするため、最後の画像をもう一度指定する
+            f.write(f"file '{self._escape(Path(image_paths[-1]).resolve())}'\n")
+
+    def _escape(self, path):
+        return str(path).replace("'", "'\\''")
+
+    def frame_filters(self):
+        """スライド画像を解像度プロファイルのフレームに合わせるフィルタ"""
+        profile = self.resolution_profile
+        if profile.is_original:
+            # H.264エンコーディングのため、幅と高さを偶数にする（MoviePy版と同じく右端・下端をクロップ）
+            return ["crop=trunc(iw/2)*2:trunc(ih/2)*2:0:0"]
+        # スライドはプロファイルの枠内のサイズで描画済み。縦横比が異なるページだけ余白を付けて枠に揃える
+        return [
+            f"scale={profile.width}:{profile.height}:force_original_aspect_ratio=decrease",
+            f"pad={profile.width}:{profile.height}:(ow-iw)/2:(oh-ih)/2"
+        ]
+
+    def build_ffmpeg_command(self, list_path, audio_path, output_path, total_duration, fps=24):
+        """エンコード用のffmpegコマンドを組み立てる"""
+        profile = self.resolution_profile
+        video_filters = self.frame_filters() + [
+            f"fps={fps}",
+            "format=yuv420p"
+        ]
+        # 動画全体の最後にフェードアウトを追加
+        fade_duration = 1.0
+        if total_duration > fade_duration:
+            video_filters.append(f"fade=t=out:st={total_duration - fade_duration:.6f}:d={fade_duration}")
+
+        return [
+            self.ffmpeg_binary, "-y",
+            "-f", "concat", "-safe", "0", "-i", str(list_path),
+            "-i", str(audio_path),
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-vf", ",".join(video_filters),
+            "-c:v", "libx264",
+            "-preset", "faster",
+            "-b:v", profile.video_bitrate,
+            "-threads", "16",
+            "-c:a", "aac",
+            "-b:a", "192k",
+            "-ar", "24000",
+            "-ac", "2",
+            "-t", f"{total_duration:.6f}",
+            "-max_muxing_queue_size", "1024",
+            "-pix_fmt", "yuv420p",  # QuickTime互換のピクセルフォーマット
+            "-movflags", "+faststart",  # Web再生に最適化（moov atomを先頭に配置）
+            str(output_path)
+        ]
+
+    def create_dialogue_video(self, image_paths, dialogue_audio_info, output_path="dialogue_output.mp4", fps=24):
+        """対話形式の動画を作成（DialogueVideoCreator.create_dialogue_videoと同じインターフェース）"""
+        if not image_paths:
+            raise ValueError("スライド画像が指定されていません")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            audio_path = os.path.join(temp_dir, "audio.wav")
+            list_path = os.path.join(temp_dir, "slides.txt")
+
+            durations = self.mix_audio_track(image_paths, dialogue_audio_info, audio_path)
+            total_duration = sum(durations)
+            print(f"最終動画の長さ: {total_duration} 秒")
+
+            self.write_concat_list(image_paths, durations, list_path)
+
+            print(f"動画を出力中（ffmpeg）: {output_path}")
+            command = self.build_ffmpeg_command(list_path, audio_path, output_path, total_duration, fps)
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise Exception(f"ffmpegによる動画作成に失敗しました: {result.stderr[-2000:]}")
+
+        print(f"動画出力完了: {output_path}")
+        return output_path